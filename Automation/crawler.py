@@ -0,0 +1,279 @@
+import argparse
+import asyncio
+import csv
+import json
+import logging
+import os
+import time
+from urllib.parse import urljoin, urlsplit
+
+import aiohttp
+from lxml import etree, html
+
+logger = logging.getLogger("crawler")
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+}
+
+FIELDS = ['Title', 'Article', 'Category', 'URL']
+
+
+class SiteConfig:
+    def __init__(self, name, listing_url, categories, page_limit, link_xpath, title_xpath, article_xpath, output):
+        self.name = name
+        self.listing_url = listing_url
+        self.categories = categories
+        self.page_limit = page_limit
+        self.link_xpath = link_xpath
+        self.title_xpath = title_xpath
+        self.article_xpath = article_xpath
+        self.output = output
+
+
+# The selectors of the old ok.py and ratopati.py scripts
+SITES = {
+    'onlinekhabar': SiteConfig(
+        name='onlinekhabar',
+        listing_url='https://english.onlinekhabar.com/category/{category}/page/{page}',
+        categories=['political', 'economy', 'lifestyle', 'travel', 'sports'],
+        page_limit=50,
+        link_xpath="//div[@class='ok-news-post ltr-post']//a/@href",
+        title_xpath="//div[@class='ok-post-header']/h1/text()",
+        article_xpath='//div[@class="post-content-wrap"]//p/text() | //div[@class="post-content-wrap"]//a/text()'
+                      ' | //div[@class="post-content-wrap"]//h2/text()',
+        output='ok.csv'
+    ),
+    'ratopati': SiteConfig(
+        name='ratopati',
+        listing_url='https://www.ratopati.com/category/{category}?page={page}',
+        categories=['news'],
+        page_limit=200,
+        link_xpath="//div[@class='columnnews mbl-col col3']//a/@href",
+        title_xpath="//div[@class='news-detail-header']//h2/text()",
+        article_xpath="//div[@class='news-contentarea']//p/text()",
+        output='ratopati.csv'
+    ),
+}
+
+
+def extract_links(page_url, content, site):
+    root = html.fromstring(content)
+    links = []
+    for href in root.xpath(site.link_xpath):
+        link = urljoin(page_url, href.strip())
+        if link not in links:
+            links.append(link)
+    return links
+
+
+def extract_news(content, site):
+    root = html.fromstring(content)
+    title = ' '.join(root.xpath(site.title_xpath)).strip()
+    article = ' '.join(root.xpath(site.article_xpath)).strip().replace('\n', '')
+    return title, article
+
+
+# Buffers rows and appends them in batches, to CSV or to Parquet part files in a directory
+class RowWriter:
+    def __init__(self, path, batch_size=100):
+        self.path = path
+        self.batch_size = batch_size
+        self.rows = []
+        self.parquet = path.endswith('.parquet')
+
+    def add(self, row):
+        self.rows.append(row)
+        return len(self.rows) >= self.batch_size
+
+    def flush(self):
+        if not self.rows:
+            return
+        if self.parquet:
+            import pandas as pd
+            os.makedirs(self.path, exist_ok=True)
+            part = len([name for name in os.listdir(self.path) if name.endswith('.parquet')])
+            pd.DataFrame(self.rows, columns=FIELDS).to_parquet(os.path.join(self.path, f"part-{part:05d}.parquet"), index=False)
+        else:
+            new_file = not os.path.exists(self.path)
+            with open(self.path, 'a', newline='', encoding='utf-8') as f:
+                writer = csv.DictWriter(f, fieldnames=FIELDS)
+                if new_file:
+                    writer.writeheader()
+                writer.writerows(self.rows)
+        self.rows = []
+
+
+# URLs already saved and listing pages already finished, kept next to the output so
+# an interrupted or repeated run skips them
+class CrawlState:
+    def __init__(self, state_dir, site_name):
+        os.makedirs(state_dir, exist_ok=True)
+        self.seen_path = os.path.join(state_dir, f"{site_name}.seen")
+        self.checkpoint_path = os.path.join(state_dir, f"{site_name}.checkpoint.json")
+        self.seen = set()
+        if os.path.exists(self.seen_path):
+            with open(self.seen_path, encoding='utf-8') as f:
+                self.seen = {line.strip() for line in f if line.strip()}
+        self.done_pages = {}
+        if os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path, encoding='utf-8') as f:
+                self.done_pages = {category: set(pages) for category, pages in json.load(f).items()}
+        self._new_seen = []
+        self._new_pages = []
+
+    def is_done(self, category, page):
+        return page in self.done_pages.get(category, ())
+
+    def add_seen(self, url):
+        self.seen.add(url)
+        self._new_seen.append(url)
+
+    def add_done(self, category, page):
+        self._new_pages.append((category, page))
+
+    # Called right after the writer flushed; a URL is marked seen only once its row was
+    # buffered, so the saved state never gets ahead of the saved rows
+    def save(self):
+        if self._new_seen:
+            with open(self.seen_path, 'a', encoding='utf-8') as f:
+                f.writelines(url + '\n' for url in self._new_seen)
+            self._new_seen = []
+        if self._new_pages:
+            for category, page in self._new_pages:
+                self.done_pages.setdefault(category, set()).add(page)
+            self._new_pages = []
+            tmp_path = self.checkpoint_path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({category: sorted(pages) for category, pages in self.done_pages.items()}, f)
+            os.replace(tmp_path, self.checkpoint_path)
+
+
+class Crawler:
+    def __init__(self, site, writer, state, per_host_limit=4, delay=1.0, timeout=20):
+        self.site = site
+        self.writer = writer
+        self.state = state
+        self.per_host_limit = per_host_limit
+        self.delay = delay
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self._hosts = {}
+        self._in_flight = set()
+        self.saved = 0
+        self.errors = 0
+
+    def _host(self, url):
+        host = urlsplit(url).netloc
+        if host not in self._hosts:
+            self._hosts[host] = (asyncio.Semaphore(self.per_host_limit), asyncio.Lock(), [0.0])
+        return self._hosts[host]
+
+    # At most per_host_limit requests in flight per host, started at least delay seconds apart
+    async def fetch(self, session, url):
+        semaphore, lock, last_start = self._host(url)
+        async with semaphore:
+            async with lock:
+                wait = last_start[0] + self.delay - time.monotonic()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                last_start[0] = time.monotonic()
+            async with session.get(url) as response:
+                response.raise_for_status()
+                return await response.read()
+
+    async def crawl_article(self, session, url, category):
+        content = await self.fetch(session, url)
+        try:
+            title, article = extract_news(content, self.site)
+        except etree.ParserError as e:
+            # An empty or unparseable page will not get better on a retry, so it is marked seen
+            logger.warning(f"Article {url} could not be parsed: {e}")
+            self.errors += 1
+            self.state.add_seen(url)
+            return
+        self.state.add_seen(url)
+        if not title or not article:
+            return
+        self.saved += 1
+        if self.writer.add({'Title': title, 'Article': article, 'Category': category, 'URL': url}):
+            self.flush()
+
+    async def crawl_page(self, session, category, page):
+        page_url = self.site.listing_url.format(category=category, page=page)
+        try:
+            links = extract_links(page_url, await self.fetch(session, page_url), self.site)
+        except (aiohttp.ClientError, asyncio.TimeoutError, etree.ParserError) as e:
+            logger.warning(f"Listing {page_url} failed: {e}")
+            self.errors += 1
+            return
+        links = [link for link in links if link not in self.state.seen and link not in self._in_flight]
+        self._in_flight.update(links)
+        results = await asyncio.gather(
+            *(self.crawl_article(session, link, category) for link in links), return_exceptions=True
+        )
+        self._in_flight.difference_update(links)
+        failed = [(link, result) for link, result in zip(links, results) if isinstance(result, Exception)]
+        for link, error in failed:
+            logger.warning(f"Article {link} failed: {error}")
+            self.errors += 1
+        if not failed:
+            self.state.add_done(category, page)
+        logger.info(f"{self.site.name} {category} page {page}: {len(links) - len(failed)} new articles")
+
+    def flush(self):
+        self.writer.flush()
+        self.state.save()
+
+    async def run(self, categories=None, page_limit=None):
+        pages = [
+            (category, page)
+            for category in (categories or self.site.categories)
+            for page in range(1, (page_limit or self.site.page_limit) + 1)
+            if not self.state.is_done(category, page)
+        ]
+        connector = aiohttp.TCPConnector(limit_per_host=self.per_host_limit)
+        async with aiohttp.ClientSession(headers=HEADERS, timeout=self.timeout, connector=connector) as session:
+            try:
+                results = await asyncio.gather(
+                    *(self.crawl_page(session, category, page) for category, page in pages), return_exceptions=True
+                )
+                # Anything a page did not handle itself is logged so the other pages still finish
+                for (category, page), result in zip(pages, results):
+                    if isinstance(result, Exception):
+                        logger.error(f"{self.site.name} {category} page {page} failed: {result}")
+                        self.errors += 1
+            finally:
+                self.flush()
+        return {"site": self.site.name, "pages": len(pages), "saved": self.saved, "errors": self.errors}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Crawl news portals into a CSV or Parquet dataset")
+    parser.add_argument('site', choices=sorted(SITES))
+    parser.add_argument('--categories', nargs='+', default=None)
+    parser.add_argument('--pages', type=int, default=None, help="Listing pages per category")
+    parser.add_argument('--output', default=None, help="CSV file, or a directory ending in .parquet")
+    parser.add_argument('--state-dir', default='.crawl-state')
+    parser.add_argument('--per-host-limit', type=int, default=4)
+    parser.add_argument('--delay', type=float, default=1.0, help="Seconds between requests to the same host")
+    parser.add_argument('--batch-size', type=int, default=100, help="Rows buffered per write")
+    parser.add_argument('--base-url', default=None, help="Replace the portal host, e.g. a local fixture server")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    site = SITES[args.site]
+    if args.base_url:
+        parts = urlsplit(site.listing_url)
+        site.listing_url = args.base_url.rstrip('/') + site.listing_url[len(f"{parts.scheme}://{parts.netloc}"):]
+    crawler = Crawler(
+        site,
+        RowWriter(args.output or site.output, batch_size=args.batch_size),
+        CrawlState(args.state_dir, site.name),
+        per_host_limit=args.per_host_limit,
+        delay=args.delay
+    )
+    print(json.dumps(asyncio.run(crawler.run(args.categories, args.pages))))
+
+
+if __name__ == "__main__":
+    main()
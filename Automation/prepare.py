@@ -0,0 +1,187 @@
+import argparse
+import csv
+import itertools
+import json
+import multiprocessing
+import os
+import re
+import sys
+
+# A sentence ends at . ? ! or a danda followed by whitespace (or the end of the text)
+SENTENCE_END = re.compile(r'[.?!।॥]+(?:\s+|$)')
+
+FIELDS = ['id', 'title', 'category', 'chunks']
+
+# The near-duplicate index is the server's (Backend/dedup.py), so both agree on what counts as a copy
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Backend')
+
+
+def split_sentences(text):
+    sentences = []
+    start = 0
+    for match in SENTENCE_END.finditer(text):
+        sentence = text[start:match.end()].strip()
+        if sentence:
+            sentences.append(sentence)
+        start = match.end()
+    rest = text[start:].strip()
+    if rest:
+        sentences.append(rest)
+    return sentences
+
+
+# Pack whole sentences into chunks of at most max_chars characters in one pass;
+# a sentence longer than max_chars is cut at the last space that fits
+def split_paragraph(paragraph, max_chars=800):
+    chunks = []
+    current = []
+    size = 0
+    for sentence in split_sentences(paragraph):
+        while len(sentence) > max_chars:
+            cut = sentence.rfind(' ', 0, max_chars)
+            if cut <= 0:
+                cut = max_chars
+            if current:
+                chunks.append(' '.join(current))
+                current, size = [], 0
+            chunks.append(sentence[:cut].strip())
+            sentence = sentence[cut:].strip()
+        extra = len(sentence) + (1 if current else 0)
+        if current and size + extra > max_chars:
+            chunks.append(' '.join(current))
+            current, size = [], 0
+            extra = len(sentence)
+        current.append(sentence)
+        size += extra
+    if current:
+        chunks.append(' '.join(current))
+    return chunks
+
+
+def iter_rows(path, article_column):
+    csv.field_size_limit(sys.maxsize)
+    with open(path, newline='', encoding='utf-8') as f:
+        for index, row in enumerate(csv.DictReader(f)):
+            if row.get(article_column):
+                yield index, row
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def prepare_batch(args):
+    rows, article_column, max_chars = args
+    return [{
+        'id': index,
+        'title': row.get('Title', ''),
+        'category': row.get('Category', ''),
+        'chunks': split_paragraph(row[article_column], max_chars),
+    } for index, row in rows]
+
+
+class JsonlWriter:
+    def __init__(self, path):
+        self.file = open(path, 'w', encoding='utf-8')
+
+    def write(self, records):
+        self.file.writelines(json.dumps(record, ensure_ascii=False) + '\n' for record in records)
+
+    def close(self):
+        self.file.close()
+
+
+# Arrow IPC file with one record batch per input batch; readers can open it with pyarrow.memory_map
+class ArrowWriter:
+    def __init__(self, path):
+        import pyarrow as pa
+        self.pa = pa
+        self.schema = pa.schema([
+            ('id', pa.int64()), ('title', pa.string()), ('category', pa.string()), ('chunks', pa.list_(pa.string()))
+        ])
+        self.writer = pa.ipc.new_file(path, self.schema)
+
+    def write(self, records):
+        columns = {field: [record[field] for record in records] for field in FIELDS}
+        self.writer.write_batch(self.pa.record_batch(columns, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+# Function to load (or start) the MinHash index used to drop near-duplicate articles
+def load_dedup_index(threshold, path=None):
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+    from dedup import MinHashIndex
+    if path and os.path.exists(path):
+        return MinHashIndex.load(path, threshold=threshold)
+    return MinHashIndex(threshold=threshold)
+
+
+# Function to drop the records whose article is a near-duplicate of one already indexed (an earlier
+# row, or an earlier run with a saved index) and index the rest under source:id
+def drop_near_duplicates(records, index, source):
+    kept = []
+    for record in records:
+        signature = index.signature(' '.join(record['chunks']))
+        if signature is not None:
+            if index.query(signature=signature):
+                continue
+            index.add(f"{source}:{record['id']}", signature=signature)
+        kept.append(record)
+    return kept
+
+
+# Stream the CSV in batches of rows through a process pool; results keep the input order,
+# so memory use is bounded by the pool's in-flight batches rather than the file size.
+# With dedup_index, near-duplicate articles are dropped in the main process before writing.
+# Returns the number of articles written and dropped.
+def prepare(path, output, article_column='Article', max_chars=800, batch_size=256, processes=None, dedup_index=None):
+    writer = ArrowWriter(output) if output.endswith('.arrow') else JsonlWriter(output)
+    count = dropped = 0
+    try:
+        tasks = ((rows, article_column, max_chars) for rows in batched(iter_rows(path, article_column), batch_size))
+        with multiprocessing.Pool(processes) as pool:
+            for records in pool.imap(prepare_batch, tasks):
+                if dedup_index is not None:
+                    kept = drop_near_duplicates(records, dedup_index, os.path.basename(path))
+                    dropped += len(records) - len(kept)
+                    records = kept
+                if records:
+                    writer.write(records)
+                count += len(records)
+    finally:
+        writer.close()
+    return count, dropped
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Split crawled articles into translation-sized chunks")
+    parser.add_argument('input', help="CSV with an article column, e.g. the crawler output")
+    parser.add_argument('output', help="Line-delimited JSON, or an Arrow IPC file if it ends in .arrow")
+    parser.add_argument('--article-column', default='Article')
+    parser.add_argument('--max-chars', type=int, default=800)
+    parser.add_argument('--batch-size', type=int, default=256, help="Rows per task sent to the process pool")
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--dedup', action='store_true', help="Drop near-duplicate articles (needs numpy)")
+    parser.add_argument('--dedup-threshold', type=float, default=0.9,
+                        help="Estimated Jaccard similarity at which two articles count as near-duplicates")
+    parser.add_argument('--dedup-index', default=None,
+                        help="Index (.npz) kept between runs so later crawls are checked against earlier ones; implies --dedup")
+    args = parser.parse_args(argv)
+    dedup_index = load_dedup_index(args.dedup_threshold, args.dedup_index) if args.dedup or args.dedup_index else None
+    count, dropped = prepare(args.input, args.output, args.article_column, args.max_chars, args.batch_size,
+                             args.processes, dedup_index)
+    if dedup_index is not None and args.dedup_index:
+        dedup_index.save(args.dedup_index)
+    print(json.dumps({"articles": count, "dropped": dropped, "output": args.output}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+import csv
+import json
+
+import prepare
+
+
+def article(topic):
+    return " ".join(f"{topic} शब्द{index}।" for index in range(60))
+
+
+def write_csv(path, articles):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=['Title', 'Article', 'Category'])
+        writer.writeheader()
+        for index, text in enumerate(articles):
+            writer.writerow({'Title': f"title {index}", 'Article': text, 'Category': 'news'})
+
+
+def read_ids(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line)['id'] for line in f]
+
+
+def test_near_duplicates_are_dropped_across_runs(tmp_path):
+    first = str(tmp_path / "first.csv")
+    second = str(tmp_path / "second.csv")
+    index_path = str(tmp_path / "ingest.npz")
+    write_csv(first, [article("क"), article("ख"), article("क") + " थप"])
+    write_csv(second, [article("ख"), article("ग")])
+
+    prepare.main([first, str(tmp_path / "first.jsonl"), '--processes', '1', '--dedup-index', index_path])
+    assert read_ids(tmp_path / "first.jsonl") == [0, 1]
+
+    prepare.main([second, str(tmp_path / "second.jsonl"), '--processes', '1', '--dedup-index', index_path])
+    assert read_ids(tmp_path / "second.jsonl") == [1]
+
+
+def test_without_dedup_every_article_is_kept(tmp_path):
+    source = str(tmp_path / "articles.csv")
+    write_csv(source, [article("क"), article("क")])
+    assert prepare.prepare(source, str(tmp_path / "out.jsonl"), processes=1) == (2, 0)
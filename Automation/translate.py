@@ -10,6 +10,7 @@ import time
 import pyperclip
 import pandas as pd
 import multiprocessing 
+import json
 
 options = Options()
 options.add_experimental_option("detach", True)
@@ -71,7 +72,7 @@ def translate_article(file,outputfile):
     time.sleep(2)
     with open(file,"r") as f:
         for line in f:
-            items=eval(line)
+            items=json.loads(line)['chunks']
             time.sleep(2)
             translated=[translate(item) for item in items]
             translated_line=' '.join(translated)
@@ -84,7 +85,7 @@ def translate_article(file,outputfile):
    
 
 selectNepali()
-translate_article("republica.txt","republica-npart.txt")
+translate_article("republica.jsonl","republica-npart.txt")
 # translate_summary()
    
 
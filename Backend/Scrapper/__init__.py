@@ -0,0 +1,8 @@
+from Scrapper.base import BaseScraper, SCRAPERS_BY_PORTAL, SCRAPERS_BY_DOMAIN, get_scraper_class
+# Importing the portal modules registers their scrapers
+from Scrapper.onlinekhabar import OnlinekhabarScraper
+from Scrapper.ekantipur import EkantipurScraper
+from Scrapper.nayapatrika import NayaPatrikaScraper
+from Scrapper.ratopati import RatopatiScraper
+from Scrapper.setopati import SetopatiScraper
+from Scrapper.gorkhapatra import GorkhapatraScraper
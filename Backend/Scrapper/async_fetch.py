@@ -0,0 +1,115 @@
+import asyncio
+import json
+from collections import OrderedDict
+from urllib.parse import urlsplit
+
+import aiohttp
+import requests
+
+from Scrapper.fetch import RETRY_STATUSES, HostBusy
+from deadline import clamp_timeout
+
+
+# asyncio counterpart of Fetcher for the ASGI server: one aiohttp session per event loop,
+# the same connect/read timeouts, retries with backoff on connection errors and 429/5xx,
+# per-host concurrency limit and ETag/Last-Modified revalidation of recently fetched pages.
+# Proxy settings are taken from the environment, like requests does.
+class AsyncFetcher:
+    def __init__(self, connect_timeout=3.05, read_timeout=10, retries=2, backoff_factor=0.5,
+                 per_host_limit=4, max_cached_pages=256, headers=None):
+        self.timeout = aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout)
+        self.wait_timeout = connect_timeout + read_timeout
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.per_host_limit = per_host_limit
+        self.max_cached_pages = max_cached_pages
+        self.headers = dict(headers or {})
+        self._session = None
+        self._semaphores = {}
+        self._pages = OrderedDict()
+
+    # Function to create the session inside the running loop on first use
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit_per_host=self.per_host_limit)
+            self._session = aiohttp.ClientSession(
+                headers=self.headers, timeout=self.timeout, connector=connector, trust_env=True
+            )
+        return self._session
+
+    def _semaphore(self, url):
+        host = urlsplit(url).netloc.lower()
+        if host not in self._semaphores:
+            self._semaphores[host] = asyncio.Semaphore(self.per_host_limit)
+        return self._semaphores[host]
+
+    def _store_page(self, key, response, content):
+        validators = {}
+        if response.headers.get('ETag'):
+            validators['If-None-Match'] = response.headers['ETag']
+        if response.headers.get('Last-Modified'):
+            validators['If-Modified-Since'] = response.headers['Last-Modified']
+        if not validators:
+            return
+        self._pages[key] = (validators, content)
+        self._pages.move_to_end(key)
+        while len(self._pages) > self.max_cached_pages:
+            self._pages.popitem(last=False)
+
+    # Function to get the backoff before a retry; a deadline shortens it rather than letting a
+    # Retry-After sleep past the end of the request
+    def _retry_delay(self, attempt, response=None):
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return clamp_timeout(float(retry_after), 'retry')
+        return clamp_timeout(self.backoff_factor * (2 ** attempt), 'retry')
+
+    async def _get_once(self, key, headers, semaphore):
+        # Inside a request with a deadline, no fetch may outlast it
+        wait_timeout = clamp_timeout(self.wait_timeout)
+        try:
+            await asyncio.wait_for(semaphore.acquire(), wait_timeout)
+        except asyncio.TimeoutError:
+            raise HostBusy(f"Too many concurrent requests to {urlsplit(key).netloc}")
+        timeout = self.timeout
+        if wait_timeout < self.wait_timeout:
+            timeout = aiohttp.ClientTimeout(total=clamp_timeout(wait_timeout), sock_connect=self.timeout.sock_connect,
+                                            sock_read=self.timeout.sock_read)
+        try:
+            async with self._get_session().get(key, headers=headers, timeout=timeout) as response:
+                return response, await response.read()
+        finally:
+            semaphore.release()
+
+    # Function to GET a url and return the body bytes, revalidating a cached copy when possible
+    async def get_content(self, url, params=None):
+        key = requests.Request('GET', url, params=params).prepare().url
+        cached = self._pages.get(key)
+        if cached is not None:
+            self._pages.move_to_end(key)
+        headers = dict(cached[0]) if cached is not None else {}
+        semaphore = self._semaphore(url)
+        for attempt in range(self.retries + 1):
+            try:
+                response, content = await self._get_once(key, headers, semaphore)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if attempt == self.retries:
+                    raise
+                await asyncio.sleep(self._retry_delay(attempt))
+                continue
+            if response.status in RETRY_STATUSES and attempt < self.retries:
+                await asyncio.sleep(self._retry_delay(attempt, response))
+                continue
+            if response.status == 304 and cached is not None:
+                return cached[1]
+            response.raise_for_status()
+            self._store_page(key, response, content)
+            return content
+
+    async def get_json(self, url, params=None):
+        return json.loads(await self.get_content(url, params=params))
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
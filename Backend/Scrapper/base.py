@@ -1,24 +1,98 @@
-import requests
 from bs4 import BeautifulSoup
+from lxml import etree, html
 import re
 import json
+import threading
+from urllib.parse import urlsplit
+from Scrapper.fetch import get_default_fetcher
+
+PORTAL_NAME_PATTERN = re.compile(r"https?://(?:www\.)?(\w+)\.")
+
+# Registries filled in by every subclass that declares a portal, see BaseScraper.__init_subclass__
+SCRAPERS_BY_PORTAL = {}
+SCRAPERS_BY_DOMAIN = {}
+
+_parsers = threading.local()
+
+
+# Function to parse a page with lxml directly; the portals all serve UTF-8
+def parse_html(content):
+    parser = getattr(_parsers, 'parser', None)
+    if parser is None:
+        parser = _parsers.parser = html.HTMLParser(encoding='utf-8')
+    return html.document_fromstring(content, parser=parser)
+
+
+# Function to build an XPath for the <p> tags of the first div with the given class,
+# matching BeautifulSoup's find('div', class_=...) semantics
+def div_paragraphs_xpath(class_name):
+    if ' ' in class_name:
+        condition = f"@class='{class_name}'"
+    else:
+        condition = f"contains(concat(' ', normalize-space(@class), ' '), ' {class_name} ')"
+    return f"(//div[{condition}])[1]//p"
+
+
+# Function to find the scraper class for a url: by domain first, then by portal name
+def get_scraper_class(url):
+    host = urlsplit(url).netloc.lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    scraper_class = SCRAPERS_BY_DOMAIN.get(host)
+    if scraper_class is None:
+        match = PORTAL_NAME_PATTERN.search(url)
+        if match:
+            scraper_class = SCRAPERS_BY_PORTAL.get(match.group(1))
+    return scraper_class
+
 
 class BaseScraper:
-    def __init__(self, url):
+    # Declared by each portal subclass
+    portal = None
+    domain = None
+    content_xpath = None
+    not_found_message = "No news found"
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.content_xpath is not None:
+            cls._content_xpath = etree.XPath(cls.content_xpath)
+        if cls.portal is not None:
+            SCRAPERS_BY_PORTAL[cls.portal] = cls
+        if cls.domain is not None:
+            SCRAPERS_BY_DOMAIN[cls.domain] = cls
+
+    def __init__(self, url, fetcher=None):
         self.url = url
+        self.fetcher = fetcher or get_default_fetcher()
         self.portal_name = self.extract_portal_name()
 
+    def get_content(self):
+        return self.fetcher.get_content(self.url)
+
     def get_soup(self):
-        resp = requests.get(self.url)
-        soup = BeautifulSoup(resp.content, 'lxml')
+        soup = BeautifulSoup(self.get_content(), 'lxml')
         return soup
 
     def get_news(self):
-        soup = self.get_soup()
-        raise NotImplementedError("Subclasses should implement this method.")
+        return self.parse_news(self.get_content())
+
+    # Function to pull the article paragraphs out of the page with the subclass's content_xpath
+    def parse_news(self, content):
+        if self.content_xpath is None:
+            raise NotImplementedError("Subclasses should declare content_xpath or implement this method.")
+        root = parse_html(content)
+        news_content = []
+        for p in self._content_xpath(root):
+            paragraph = p.text_content().strip()  # Strip to remove extra whitespace
+            if paragraph:  # Exclude empty paragraphs
+                news_content.append(paragraph)
+        if news_content:
+            return ' '.join(news_content)
+        return self.not_found_message
 
     def extract_portal_name(self):
-        portal_name = re.search(r"https?://(?:www\.)?(\w+)\.", self.url)
+        portal_name = PORTAL_NAME_PATTERN.search(self.url)
         if portal_name:
             return portal_name.group(1)
         return "Unknown"
@@ -28,4 +102,12 @@ class BaseScraper:
         return {
             "portal_name": self.portal_name,
             "news_content": news_content
-        }
\ No newline at end of file
+        }
+
+    # Function to fetch the page with an AsyncFetcher (see Scrapper/async_fetch.py) and parse it
+    async def get_news_json_async(self, fetcher):
+        news_content = self.parse_news(await fetcher.get_content(self.url))
+        return {
+            "portal_name": self.portal_name,
+            "news_content": news_content
+        }
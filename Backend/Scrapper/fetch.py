@@ -0,0 +1,137 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from deadline import clamp_timeout
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class HostBusy(requests.exceptions.RequestException):
+    pass
+
+
+# Shared HTTP layer for the scrapers: one pooled keep-alive session per host,
+# connect/read timeouts, bounded retries with backoff, a per-host concurrency
+# limit and ETag/Last-Modified revalidation of recently fetched pages. Retries are
+# made here rather than by urllib3, so every attempt and every backoff (including a
+# Retry-After) is clamped to the request's deadline.
+class Fetcher:
+    def __init__(self, connect_timeout=3.05, read_timeout=10, retries=2, backoff_factor=0.5,
+                 per_host_limit=4, max_cached_pages=256, headers=None):
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.per_host_limit = per_host_limit
+        self.max_cached_pages = max_cached_pages
+        self.headers = dict(headers or {})
+        self._sessions = {}
+        self._semaphores = {}
+        self._pages = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _new_session(self):
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.per_host_limit, max_retries=0)
+        session = requests.Session()
+        session.headers.update(self.headers)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def _host_state(self, url):
+        host = urlsplit(url).netloc.lower()
+        with self._lock:
+            if host not in self._sessions:
+                self._sessions[host] = self._new_session()
+                self._semaphores[host] = threading.BoundedSemaphore(self.per_host_limit)
+            return self._sessions[host], self._semaphores[host]
+
+    def _cached_page(self, key):
+        with self._lock:
+            page = self._pages.get(key)
+            if page is not None:
+                self._pages.move_to_end(key)
+            return page
+
+    def _store_page(self, key, response):
+        validators = {}
+        if response.headers.get('ETag'):
+            validators['If-None-Match'] = response.headers['ETag']
+        if response.headers.get('Last-Modified'):
+            validators['If-Modified-Since'] = response.headers['Last-Modified']
+        if not validators:
+            return
+        with self._lock:
+            self._pages[key] = (validators, response.content)
+            self._pages.move_to_end(key)
+            while len(self._pages) > self.max_cached_pages:
+                self._pages.popitem(last=False)
+
+    # Function to get the backoff before a retry; a deadline shortens it rather than letting a
+    # Retry-After sleep past the end of the request
+    def _retry_delay(self, attempt, response=None):
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return clamp_timeout(float(retry_after), 'retry')
+        return clamp_timeout(self.backoff_factor * (2 ** attempt), 'retry')
+
+    def _get_once(self, session, semaphore, url, params, headers, timeout):
+        # Inside a request with a deadline, no fetch may outlast it
+        timeout = clamp_timeout(timeout)
+        if not semaphore.acquire(timeout=sum(timeout) if isinstance(timeout, tuple) else timeout):
+            raise HostBusy(f"Too many concurrent requests to {urlsplit(url).netloc}")
+        try:
+            return session.get(url, params=params, headers=headers, timeout=timeout)
+        finally:
+            semaphore.release()
+
+    # Function to GET a url and return the body bytes, revalidating a cached copy when possible
+    def get_content(self, url, params=None, timeout=None):
+        session, semaphore = self._host_state(url)
+        key = requests.Request('GET', url, params=params).prepare().url
+        cached = self._cached_page(key)
+        headers = dict(cached[0]) if cached is not None else {}
+        for attempt in range(self.retries + 1):
+            try:
+                response = self._get_once(session, semaphore, url, params, headers, timeout or self.timeout)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if attempt == self.retries:
+                    raise
+                time.sleep(self._retry_delay(attempt))
+                continue
+            if response.status_code in RETRY_STATUSES and attempt < self.retries:
+                time.sleep(self._retry_delay(attempt, response))
+                continue
+            if response.status_code == 304 and cached is not None:
+                return cached[1]
+            response.raise_for_status()
+            self._store_page(key, response)
+            return response.content
+
+    def get_json(self, url, params=None, timeout=None):
+        return json.loads(self.get_content(url, params=params, timeout=timeout))
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+            self._semaphores.clear()
+
+
+_default_fetcher = Fetcher()
+
+
+def get_default_fetcher():
+    return _default_fetcher
+
+
+# Function to replace the fetcher used by every scraper, e.g. with timeouts from the environment
+def set_default_fetcher(fetcher):
+    global _default_fetcher
+    _default_fetcher = fetcher
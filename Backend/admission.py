@@ -0,0 +1,238 @@
+import asyncio
+import contextlib
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+from batching import WAIT_SAMPLE_SIZE, wait_percentiles
+from tracing import Counter, Histogram, current_trace, register_metric
+
+# Lanes in priority order: a free slot always goes to the first lane with a request waiting,
+# so short and extractive summaries never queue behind long ones
+LANES = ('short', 'long')
+
+# Weight of the latest request in the per-lane service time average
+SERVICE_EWMA_ALPHA = 0.2
+
+SHED_REQUESTS = register_metric(Counter(
+    "summarizer_shed_requests_total", "Requests rejected by admission control, by lane and reason"
+))
+ADMISSION_WAIT = register_metric(Histogram(
+    "summarizer_admission_wait_seconds", "Time admitted requests waited for a summarization slot"
+))
+
+
+# Raised when a request is rejected before it gets a slot; status_code is 429 (queue full)
+# or 503 (the wait would not fit the request's deadline), retry_after is in seconds
+class Overloaded(Exception):
+    def __init__(self, message, status_code, retry_after):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = max(1, int(math.ceil(retry_after)))
+
+
+class _Ticket:
+    __slots__ = ("lane", "deadline", "future", "enqueued_at", "granted_at", "trace")
+
+    def __init__(self, lane, deadline):
+        self.lane = lane
+        self.deadline = deadline
+        self.future = Future()
+        self.enqueued_at = time.monotonic()
+        self.granted_at = None
+        self.trace = current_trace()
+
+
+# Bounded queue in front of summarization. At most max_concurrent requests summarize at once,
+# long ones in at most lane_limits['long'] of those slots, and at most max_queue wait. A request
+# is turned away at once when the queue is full or when its estimated wait (the queued work ahead
+# of it at the lane's average service time) is longer than what is left of its deadline.
+class AdmissionController:
+    def __init__(self, max_concurrent=4, max_queue=16, lane_limits=None):
+        if max_concurrent < 1:
+            raise ValueError("max_concurrent must be at least 1")
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        limits = dict(lane_limits or {})
+        self.lane_limits = {lane: max(1, min(limits.get(lane, max_concurrent), max_concurrent)) for lane in LANES}
+        self._queues = {lane: deque() for lane in LANES}
+        self._in_flight = {lane: 0 for lane in LANES}
+        self._service_seconds = {lane: 0.0 for lane in LANES}
+        self._admitted = {lane: 0 for lane in LANES}
+        self._shed = {lane: {"queue_full": 0, "over_budget": 0, "expired": 0} for lane in LANES}
+        self._wait_ms = {lane: deque(maxlen=WAIT_SAMPLE_SIZE) for lane in LANES}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def lane_for(selected_length):
+        return 'long' if selected_length == 'long' else 'short'
+
+    def _lanes_ahead(self, lane):
+        return LANES[:LANES.index(lane) + 1]
+
+    def _can_start(self, lane):
+        return sum(self._in_flight.values()) < self.max_concurrent and self._in_flight[lane] < self.lane_limits[lane]
+
+    # Function to estimate how long a new request of the lane would wait: the queued work of
+    # its lane and the lanes before it, plus one in-flight request, spread over the lane's slots
+    def _estimated_wait(self, lane):
+        queued = sum(len(self._queues[ahead]) * self._service_seconds[ahead] for ahead in self._lanes_ahead(lane))
+        return (queued + self._service_seconds[lane]) / self.lane_limits[lane]
+
+    def _shed_request(self, lane, reason):
+        self._shed[lane][reason] += 1
+        SHED_REQUESTS.inc(lane=lane, reason=reason)
+
+    def _grant(self, ticket):
+        ticket.granted_at = time.monotonic()
+        self._in_flight[ticket.lane] += 1
+        self._admitted[ticket.lane] += 1
+        wait = ticket.granted_at - ticket.enqueued_at
+        self._wait_ms[ticket.lane].append(wait * 1000.0)
+        ADMISSION_WAIT.observe(wait, lane=ticket.lane)
+        if ticket.trace is not None:
+            ticket.trace.add_span('admission_wait', wait)
+
+    # Function to hand free slots to queued requests in lane order; returns the futures to
+    # resolve once the lock is released
+    def _dispatch(self):
+        resolved = []
+        for lane in LANES:
+            queue = self._queues[lane]
+            while queue and self._can_start(lane):
+                ticket = queue.popleft()
+                if ticket.deadline is not None and ticket.deadline.expired():
+                    self._shed_request(lane, 'expired')
+                    resolved.append((ticket.future, False))
+                    continue
+                self._grant(ticket)
+                resolved.append((ticket.future, True))
+        return resolved
+
+    @staticmethod
+    def _resolve(resolved):
+        for future, granted in resolved:
+            if granted:
+                future.set_result(True)
+            else:
+                future.set_exception(Overloaded("Deadline passed while queued", 503, 1))
+
+    def _startable(self, lane):
+        return self._can_start(lane) and not any(self._queues[ahead] for ahead in self._lanes_ahead(lane))
+
+    # Function to decide whether a request of the lane that cannot start now has to be turned away;
+    # returns the Overloaded error to raise, or None when it may queue
+    def _rejection(self, lane, deadline):
+        wait = self._estimated_wait(lane)
+        if sum(len(queue) for queue in self._queues.values()) >= self.max_queue:
+            self._shed_request(lane, 'queue_full')
+            return Overloaded("Too many requests waiting, try again later", 429, wait)
+        if deadline is not None and wait > deadline.remaining():
+            self._shed_request(lane, 'over_budget')
+            return Overloaded(
+                f"Estimated wait of {wait:.1f}s exceeds the remaining deadline of {deadline.remaining():.1f}s",
+                503, wait
+            )
+        return None
+
+    # Function to reject a request at once when it could not get a slot in time, before any work
+    # (e.g. the Gemini reference call) is started for it
+    def check(self, lane, deadline=None):
+        with self._lock:
+            error = None if self._startable(lane) else self._rejection(lane, deadline)
+        if error is not None:
+            raise error
+
+    def _admit(self, lane, deadline):
+        ticket = _Ticket(lane, deadline)
+        with self._lock:
+            if self._startable(lane):
+                self._grant(ticket)
+                ticket.future.set_result(True)
+                return ticket
+            error = self._rejection(lane, deadline)
+            if error is None:
+                self._queues[lane].append(ticket)
+        if error is not None:
+            raise error
+        return ticket
+
+    # Function to give up on a ticket whose deadline passed while it waited
+    def _abandon(self, ticket):
+        with self._lock:
+            if ticket in self._queues[ticket.lane]:
+                self._queues[ticket.lane].remove(ticket)
+                self._shed_request(ticket.lane, 'expired')
+                return
+            granted = ticket.granted_at is not None
+        # Granted in the meantime: hand the slot straight back
+        if granted:
+            self._release(ticket, record_service=False)
+
+    def _release(self, ticket, record_service=True):
+        with self._lock:
+            self._in_flight[ticket.lane] -= 1
+            if record_service:
+                seconds = time.monotonic() - ticket.granted_at
+                previous = self._service_seconds[ticket.lane]
+                self._service_seconds[ticket.lane] = seconds if not previous else \
+                    previous + SERVICE_EWMA_ALPHA * (seconds - previous)
+            resolved = self._dispatch()
+        self._resolve(resolved)
+
+    def _wait_timeout(self, ticket):
+        return ticket.deadline.remaining() if ticket.deadline is not None else None
+
+    # Function to wait for a slot of the lane, or be rejected, and keep it for the duration of the with block
+    @contextlib.contextmanager
+    def slot(self, lane, deadline=None):
+        ticket = self._admit(lane, deadline)
+        try:
+            ticket.future.result(timeout=self._wait_timeout(ticket))
+        except FutureTimeout:
+            self._abandon(ticket)
+            raise Overloaded("Deadline passed while queued", 503, self._service_seconds[ticket.lane])
+        try:
+            yield
+        finally:
+            self._release(ticket)
+
+    # Event-loop version of slot()
+    @contextlib.asynccontextmanager
+    async def slot_async(self, lane, deadline=None):
+        ticket = self._admit(lane, deadline)
+        try:
+            await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(ticket.future)), self._wait_timeout(ticket))
+        except asyncio.TimeoutError:
+            self._abandon(ticket)
+            raise Overloaded("Deadline passed while queued", 503, self._service_seconds[ticket.lane])
+        try:
+            yield
+        finally:
+            self._release(ticket)
+
+    def queue_depth(self):
+        with self._lock:
+            return sum(len(queue) for queue in self._queues.values())
+
+    def stats(self):
+        with self._lock:
+            return {
+                "max_concurrent": self.max_concurrent,
+                "max_queue": self.max_queue,
+                "lanes": {
+                    lane: {
+                        "limit": self.lane_limits[lane],
+                        "in_flight": self._in_flight[lane],
+                        "queued": len(self._queues[lane]),
+                        "admitted": self._admitted[lane],
+                        "shed": dict(self._shed[lane]),
+                        "service_seconds": self._service_seconds[lane],
+                        "estimated_wait_seconds": self._estimated_wait(lane),
+                        "queue_wait_ms": wait_percentiles(list(self._wait_ms[lane])),
+                    }
+                    for lane in LANES
+                },
+            }
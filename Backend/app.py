@@ -1,19 +1,36 @@
-from flask import Flask, request, jsonify
-import requests
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 from flask_cors import CORS
 import os
 import re
+from contextlib import closing
 from dotenv import load_dotenv
-from transformers import MT5ForConditionalGeneration, MT5Tokenizer
-import google.generativeai as genai
-from rouge import Rouge
-from Scrapper.onlinekhabar import OnlinekhabarScraper
-from Scrapper.ekantipur import EkantipurScraper
-from Scrapper.nayapatrika import NayaPatrikaScraper
-from Scrapper.ratopati import RatopatiScraper
-from Scrapper.setopati import SetopatiScraper
-from Scrapper.gorkhapatra import GorkhapatraScraper
+from Scrapper import get_scraper_class
+from Scrapper.fetch import Fetcher, get_default_fetcher, set_default_fetcher
+from batching import MicroBatcher, generate_batch, set_draft_model
+from summarizer import (
+    LONG_GENERATE_KWARGS, SHORT_GENERATE_KWARGS, format_paragraph, summary_nepali, mt5Summary, calculate_rouge_scores,
+    stream_summary_nepali, stream_mt5Summary, submit_summary_nepali, join_summaries, submit_mt5Summary,
+    summary_hierarchical, GENERATION_PROFILES
+)
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from cache import SummaryCache, make_cache_key
+from normalize import NepaliNormalizer, set_default_normalizer
+from inference import ModelHolder, ModelNotReady, load_model, load_tokenizer
+from chunking import get_token_cache, set_token_cache_size
+from reference import REFERENCE_MODES, ReferenceJobStore, get_reference_client
+from extractive import DEFAULT_IDF_PATH, ExtractiveSummarizer, IdfTable
+from dedup import MinHashIndex
+from admission import AdmissionController, Overloaded
+from deadline import DeadlineExceeded, clamp_timeout, end_deadline, resume_deadline, start_deadline
+from jobqueue import callback_allowed, get_job_queue, public_job
+from tracing import (
+    REQUEST_SECONDS, Gauge, SamplingProfiler, current_trace, end_trace, metrics_text, register_metric, run_in_context, span,
+    start_trace
+)
+import atexit
+import json
 import logging
+import threading
 import time
 
 
@@ -35,20 +52,286 @@ if not API_KEY:
 if not GEMINI_API_KEY:
     raise ValueError("GEMINI_API_KEY not found in environment variables")
 
-# Configure Gemini API
-genai.configure(api_key=GEMINI_API_KEY)
+# Shared HTTP layer for the scrapers and the extractor API
+set_default_fetcher(Fetcher(
+    connect_timeout=float(os.getenv("SCRAPER_CONNECT_TIMEOUT", "3.05")),
+    read_timeout=float(os.getenv("SCRAPER_READ_TIMEOUT", "10")),
+    retries=int(os.getenv("SCRAPER_RETRIES", "2")),
+    per_host_limit=int(os.getenv("SCRAPER_PER_HOST_LIMIT", "4"))
+))
 
-# Load the mT5 models and tokenizers once at startup
-tokenizer = MT5Tokenizer.from_pretrained("Saurav20/mt5_old_train")
-model = MT5ForConditionalGeneration.from_pretrained("Saurav20/mt5_old_train")
+# Text normalization policies used by format_paragraph
+set_default_normalizer(NepaliNormalizer(
+    digits=os.getenv("NORMALIZE_DIGITS", "devanagari"),
+    nfc=os.getenv("NORMALIZE_NFC", "1") == "1",
+    zero_width=os.getenv("NORMALIZE_ZERO_WIDTH", "keep")
+))
+
+# Configure the reference summarizer; REFERENCE_CLIENT=stub runs offline without Gemini
+# (REFERENCE_STUB_DELAY makes the stub take as long as a Gemini call, for load tests)
+reference_client = get_reference_client(
+    os.getenv("REFERENCE_CLIENT", "gemini"),
+    api_key=GEMINI_API_KEY,
+    delay=float(os.getenv("REFERENCE_STUB_DELAY", "0"))
+)
+reference_jobs = ReferenceJobStore(max_workers=int(os.getenv("REFERENCE_WORKERS", "4")))
+
+# Load the mT5 models and tokenizers once per process.
+# MODEL_LOAD_MODE=eager loads at import; with gunicorn --preload that happens once in the master and
+# the workers share its pages copy-on-write. MODEL_SHARE_MEMORY=1 also moves the torch backend's
+# weights into /dev/shm so they stay shared; only worth it when the master forks workers, and /dev/shm
+# must hold them. lazy loads in a background thread of each worker, which then holds its own copy,
+# and reports progress on /readyz
+MODEL_ID = "Saurav20/mt5_old_train"
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "torch")
+MODEL_LOAD_MODE = os.getenv("MODEL_LOAD_MODE", "eager")
+MODEL_LOAD_TIMEOUT = float(os.getenv("MODEL_LOAD_TIMEOUT", "60"))
+MODEL_SHARE_MEMORY = os.getenv("MODEL_SHARE_MEMORY", "0") == "1" and MODEL_LOAD_MODE == 'eager'
+
+# JOB_QUEUE (sqlite:///<path> or redis://<host>, see jobqueue.py) takes mT5 out of the web process:
+# '/' and /batch enqueue summary jobs that worker.py processes claim in batches, so inference
+# scales apart from the HTTP workers. Extractive summaries are still made here. Poll requests may
+# name a callback URL, but only on a host listed in JOB_CALLBACK_HOSTS.
+JOB_QUEUE = os.getenv("JOB_QUEUE") or None
+job_queue = get_job_queue(
+    JOB_QUEUE,
+    claim_timeout=float(os.getenv("JOB_CLAIM_TIMEOUT", "300")),
+    result_ttl=float(os.getenv("JOB_RESULT_TTL", "3600"))
+) if JOB_QUEUE else None
+if job_queue is not None and job_queue.in_process:
+    raise ValueError(f"JOB_QUEUE={JOB_QUEUE} only lives inside this process, so worker.py could never claim its jobs; "
+                     "use sqlite:///<path> or redis://<host>")
+JOB_QUEUE_MAX_DEPTH = int(os.getenv("JOB_QUEUE_MAX_DEPTH", "256"))
+JOB_CALLBACK_HOSTS = frozenset(host.strip().lower() for host in os.getenv("JOB_CALLBACK_HOSTS", "").split(',') if host.strip())
+
+# Decoding profile used when a request does not name one (see summarizer.GENERATION_PROFILES).
+# DRAFT_MODEL_ID enables the 'assisted' profile; the draft model must share the mT5 vocabulary.
+GENERATION_PROFILE = os.getenv("GENERATION_PROFILE", "quality")
+if GENERATION_PROFILE not in GENERATION_PROFILES:
+    raise ValueError(f"Unknown GENERATION_PROFILE: {GENERATION_PROFILE}")
+DRAFT_MODEL_ID = os.getenv("DRAFT_MODEL_ID") or None
+
+# TOKENIZER_FAST=1 uses the Rust-backed tokenizer; token ids of recent texts are cached (see chunking.TokenCache)
+TOKENIZER_FAST = os.getenv("TOKENIZER_FAST", "1") == "1"
+set_token_cache_size(int(os.getenv("TOKEN_CACHE_SIZE", "1024")))
+
+def load_mt5():
+    tokenizer = load_tokenizer(MODEL_ID, fast=TOKENIZER_FAST)
+    model = load_model(
+        MODEL_ID, INFERENCE_BACKEND,
+        onnx_dir=os.getenv("ONNX_MODEL_DIR") or None,
+        safetensors_dir=os.getenv("SAFETENSORS_DIR") or None,
+        share_memory=MODEL_SHARE_MEMORY
+    )
+    if DRAFT_MODEL_ID:
+        set_draft_model(load_model(DRAFT_MODEL_ID, 'torch', share_memory=MODEL_SHARE_MEMORY))
+    return model, tokenizer
+
+def warmup_mt5(model, tokenizer):
+    generate_batch(model, tokenizer, ["summarize: नमस्ते ।"], 32, max_length=8)
+
+model_holder = ModelHolder(load_mt5, warmup_fn=warmup_mt5)
+if job_queue is not None:
+    logger.info(f"Summaries are made by the workers of {JOB_QUEUE}; worker.py loads the model itself")
+elif MODEL_LOAD_MODE == 'eager':
+    model_holder.load()
+elif MODEL_LOAD_MODE == 'lazy':
+    model_holder.start()
+else:
+    raise ValueError(f"Unknown MODEL_LOAD_MODE: {MODEL_LOAD_MODE}")
+
+# Gather concurrent requests into padded generate calls (see batching.py).
+# The batcher thread is created on first use so it is started inside each worker, not the preloading master
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "8"))
+BATCH_WINDOW_MS = float(os.getenv("BATCH_WINDOW_MS", "10"))
+batcher = None
+batcher_lock = threading.Lock()
+
+def get_batcher(model, tokenizer):
+    global batcher
+    with batcher_lock:
+        if batcher is None:
+            batcher = MicroBatcher(model, tokenizer, max_batch_size=BATCH_MAX_SIZE, max_wait_ms=BATCH_WINDOW_MS)
+        return batcher
+
+# Input tokens per long-mode chunk; sentences are packed up to this budget (see chunking.py)
+CHUNK_TOKEN_BUDGET = int(os.getenv("CHUNK_TOKEN_BUDGET", "512"))
+
+# SUMMARY_STRATEGY=concat joins the chunk summaries (long mode) or summarizes the text once (short mode).
+# hierarchical summarizes the chunks and re-summarizes the joined result until it fits the target
+# length of the selectedLength; the map stage is cached so both lengths share it.
+SUMMARY_STRATEGY = os.getenv("SUMMARY_STRATEGY", "concat")
+if SUMMARY_STRATEGY not in ('concat', 'hierarchical'):
+    raise ValueError(f"Unknown SUMMARY_STRATEGY: {SUMMARY_STRATEGY}")
+SUMMARY_TARGET_LENGTHS = {
+    'short': int(os.getenv("SUMMARY_TARGET_SHORT", "128")),
+    'long': int(os.getenv("SUMMARY_TARGET_LONG", "512"))
+}
+HIERARCHICAL_MAP_LENGTH = int(os.getenv("HIERARCHICAL_MAP_LENGTH", "128"))
+HIERARCHICAL_MAX_DEPTH = int(os.getenv("HIERARCHICAL_MAX_DEPTH", "3"))
+
+# Extractive stage (see extractive.py): selectedLength=extractive returns the top TextRank sentences
+# without running mT5, and EXTRACTIVE_PREFILTER=1 trims short-mode input to the best sentences
+# that fit in EXTRACTIVE_PREFILTER_TOKENS instead of letting the tokenizer truncate it
+SELECTED_LENGTHS = ('short', 'long', 'extractive')
+EXTRACTIVE_IDF_PATH = os.getenv("EXTRACTIVE_IDF_PATH", DEFAULT_IDF_PATH)
+EXTRACTIVE_SUMMARY_WORDS = int(os.getenv("EXTRACTIVE_SUMMARY_WORDS", "120"))
+EXTRACTIVE_PREFILTER = os.getenv("EXTRACTIVE_PREFILTER", "0") == "1"
+EXTRACTIVE_PREFILTER_TOKENS = int(os.getenv("EXTRACTIVE_PREFILTER_TOKENS", "500"))
+extractive_summarizer = ExtractiveSummarizer(IdfTable.load(EXTRACTIVE_IDF_PATH))
+
+# Limits for the /batch endpoint; URLs in a batch are fetched concurrently
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "32"))
+fetch_executor = ThreadPoolExecutor(max_workers=int(os.getenv("BATCH_FETCH_WORKERS", "8")), thread_name_prefix="fetch")
+
+# Summary cache; set SUMMARY_CACHE_DB to a sqlite path to share it across workers
+summary_cache = SummaryCache(
+    max_entries=int(os.getenv("SUMMARY_CACHE_SIZE", "1024")),
+    ttl_seconds=float(os.getenv("SUMMARY_CACHE_TTL", "86400")),
+    disk_path=os.getenv("SUMMARY_CACHE_DB") or None
+)
+
+# Near-duplicate lookup for '/': every computed summary is indexed by its cache key, and a request
+# whose text is at least DEDUP_THRESHOLD Jaccard-similar to an indexed one with the same settings
+# reuses that summary. The index keeps at most DEDUP_INDEX_SIZE entries for as long as the cache
+# keeps summaries, and DEDUP_INDEX_PATH keeps it across restarts; every process that indexed
+# something (e.g. each gunicorn worker) merges its entries into that file on exit.
+DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "1") == "1"
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.9"))
+DEDUP_INDEX_SIZE = int(os.getenv("DEDUP_INDEX_SIZE", str(summary_cache.max_entries)))
+DEDUP_INDEX_PATH = os.getenv("DEDUP_INDEX_PATH") or None
+if DEDUP_INDEX_PATH and os.path.exists(DEDUP_INDEX_PATH):
+    dedup_index = MinHashIndex.load(DEDUP_INDEX_PATH, max_entries=DEDUP_INDEX_SIZE, ttl_seconds=summary_cache.ttl,
+                                    threshold=DEDUP_THRESHOLD)
+else:
+    dedup_index = MinHashIndex(threshold=DEDUP_THRESHOLD, max_entries=DEDUP_INDEX_SIZE, ttl_seconds=summary_cache.ttl)
+if DEDUP_INDEX_PATH:
+    atexit.register(lambda: dedup_index.save(DEDUP_INDEX_PATH))
+
+# Per-stage timings of each request (see tracing.py). '/' adds them to the response as "timings"
+# when the request sets "timings": true, or for every request with TIMING_BREAKDOWN=1.
+# PROFILE_SAMPLE_RATE=N profiles 1 in N requests into PROFILE_DIR with PROFILER (cprofile or pyinstrument).
+TIMING_BREAKDOWN = os.getenv("TIMING_BREAKDOWN", "0") == "1"
+profiler = SamplingProfiler(
+    sample_every=int(os.getenv("PROFILE_SAMPLE_RATE", "0")),
+    directory=os.getenv("PROFILE_DIR", "profiles"),
+    engine=os.getenv("PROFILER", "cprofile")
+)
+register_metric(Gauge(
+    "summarizer_batcher_queue_depth", "Prompts waiting for the batcher",
+    lambda: batcher.stats()["queue_depth"] if batcher is not None else 0
+))
+register_metric(Gauge("summarizer_cache_hit_ratio", "Summary cache hit ratio", lambda: summary_cache.stats()["hit_ratio"]))
+register_metric(Gauge("summarizer_model_ready", "1 once the model is loaded and warmed up", lambda: int(model_holder.state == 'ready')))
+
+# Every '/' request gets a deadline: its "deadline" field in seconds (capped at REQUEST_DEADLINE_MAX,
+# which should stay below gunicorn's --timeout) or REQUEST_DEADLINE. Scraping, the model-load wait and
+# generation are cut short at the deadline. Summaries that are not cached then wait for one of
+# ADMISSION_CONCURRENCY slots, long ones for at most ADMISSION_LONG_SLOTS of them, in a queue of
+# ADMISSION_QUEUE_SIZE; short/extractive requests are served first (see admission.py).
+REQUEST_DEADLINE = float(os.getenv("REQUEST_DEADLINE", "60"))
+REQUEST_DEADLINE_MAX = float(os.getenv("REQUEST_DEADLINE_MAX", "110"))
+ADMISSION_CONCURRENCY = int(os.getenv("ADMISSION_CONCURRENCY", "4"))
+admission = AdmissionController(
+    max_concurrent=ADMISSION_CONCURRENCY,
+    max_queue=int(os.getenv("ADMISSION_QUEUE_SIZE", "16")),
+    lane_limits={'long': int(os.getenv("ADMISSION_LONG_SLOTS", str(max(1, ADMISSION_CONCURRENCY // 2))))}
+)
+register_metric(Gauge("summarizer_admission_queue_depth", "Requests waiting for a summarization slot", admission.queue_depth))
+if job_queue is not None:
+    register_metric(Gauge("summarizer_job_queue_depth", "Summary jobs waiting for an inference worker", job_queue.depth))
+
+# Function to find a cached summary of a near-identical text; returns (entry, similarity, signature)
+def find_near_duplicate(formatted_text, cache_key):
+    signature = dedup_index.signature(formatted_text)
+    if signature is None:
+        return None, None, None
+    settings = cache_key.split(':', 1)[1]
+    for key, similarity in dedup_index.query(signature=signature, threshold=DEDUP_THRESHOLD):
+        if key != cache_key and key.split(':', 1)[1] == settings:
+            cached = summary_cache.peek(key)
+            if cached is not None:
+                return cached, similarity, signature
+            # The cache evicted or expired this summary, so the entry can never match again
+            dedup_index.discard(key)
+    return None, None, signature
+
+# Function to build the cache key for a summary; it covers everything that changes the output
+def summary_cache_key(formatted_text, selected_length, profile=GENERATION_PROFILE):
+    if selected_length == 'extractive':
+        generation_params = dict(max_words=EXTRACTIVE_SUMMARY_WORDS, idf=EXTRACTIVE_IDF_PATH)
+    elif SUMMARY_STRATEGY == 'hierarchical':
+        generation_params = dict(
+            SHORT_GENERATE_KWARGS if selected_length == 'short' else LONG_GENERATE_KWARGS,
+            strategy=SUMMARY_STRATEGY,
+            target_length=SUMMARY_TARGET_LENGTHS[selected_length],
+            token_budget=CHUNK_TOKEN_BUDGET,
+            map_length=HIERARCHICAL_MAP_LENGTH,
+            max_depth=HIERARCHICAL_MAX_DEPTH
+        )
+    elif selected_length == 'short':
+        generation_params = dict(SHORT_GENERATE_KWARGS, prefilter_tokens=EXTRACTIVE_PREFILTER_TOKENS) \
+            if EXTRACTIVE_PREFILTER else SHORT_GENERATE_KWARGS
+    else:
+        generation_params = dict(LONG_GENERATE_KWARGS, token_budget=CHUNK_TOKEN_BUDGET)
+    if selected_length != 'extractive' and profile != 'quality':
+        generation_params = dict(generation_params, profile=profile, draft_model=DRAFT_MODEL_ID)
+    return make_cache_key(formatted_text, selected_length, f"{MODEL_ID}:{INFERENCE_BACKEND}", generation_params)
+
+# Function to check the decoding profile of a request; returns an error message or None
+def profile_error(profile):
+    if profile not in GENERATION_PROFILES:
+        return f"Invalid profile, expected one of {', '.join(GENERATION_PROFILES)}"
+    if profile == 'assisted' and not DRAFT_MODEL_ID:
+        return "The assisted profile needs DRAFT_MODEL_ID to be set"
+    return None
+
+# Function to apply the optional extractive pre-filter to short-mode input
+def short_input(formatted_text, tokenizer):
+    if EXTRACTIVE_PREFILTER:
+        return extractive_summarizer.extract(formatted_text, EXTRACTIVE_PREFILTER_TOKENS, tokenizer)
+    return formatted_text
+
+# Function to summarize formatted text with the configured strategy
+def summarize_text(formatted_text, selected_length, model, tokenizer, batcher, profile=GENERATION_PROFILE):
+    with span('summarize', length=selected_length):
+        return _summarize_text(formatted_text, selected_length, model, tokenizer, batcher, profile)
+
+def _summarize_text(formatted_text, selected_length, model, tokenizer, batcher, profile):
+    if selected_length == 'extractive':
+        return extractive_summarizer.extract(formatted_text, EXTRACTIVE_SUMMARY_WORDS)
+    if SUMMARY_STRATEGY == 'hierarchical':
+        return summary_hierarchical(
+            formatted_text, model, tokenizer, SUMMARY_TARGET_LENGTHS[selected_length],
+            final_kwargs=SHORT_GENERATE_KWARGS if selected_length == 'short' else LONG_GENERATE_KWARGS,
+            batcher=batcher,
+            token_budget=CHUNK_TOKEN_BUDGET,
+            map_length=HIERARCHICAL_MAP_LENGTH,
+            max_depth=HIERARCHICAL_MAX_DEPTH,
+            map_cache=summary_cache,
+            cache_namespace=f"{MODEL_ID}:{INFERENCE_BACKEND}",
+            profile=profile
+        )
+    if selected_length == 'short':
+        return mt5Summary(short_input(formatted_text, tokenizer), model, tokenizer, batcher=batcher, profile=profile)
+    return summary_nepali(
+        formatted_text, model, tokenizer, batcher=batcher, token_budget=CHUNK_TOKEN_BUDGET, profile=profile
+    )
+
+# Function to get the model, tokenizer and batcher for a summary; extractive summaries need none
+# of them, so they are served even while the model is still loading
+def get_summarizer_state(selected_length):
+    if selected_length == 'extractive':
+        return None, None, None
+    model, tokenizer = model_holder.get(timeout=clamp_timeout(MODEL_LOAD_TIMEOUT, 'model load'))
+    return model, tokenizer, get_batcher(model, tokenizer)
 
 # Function to extract news from the API
 def get_newsfrom_api(url):
     endpoint = "https://extractorapi.com/api/v1/extractor"
     params = {"apikey": API_KEY, "url": url}
     try:
-        r = requests.get(endpoint, params=params)
-        resp = r.json()
+        resp = get_default_fetcher().get_json(endpoint, params=params)
         news = resp.get('text', 'Error')
     except Exception as e:
         logger.error(f"Error in get_newsfrom_api: {e}")
@@ -63,91 +346,23 @@ def extract_portal_name(url):
         return portal_name_match.group(1)
     return "Unknown"
 
-# Function to scrape news from different portals
+# Function to scrape news from different portals; portals register themselves in Scrapper
 def get_newsfrom_url(url):
-    portal_name = extract_portal_name(url)
     news = "Couldn't find url"
-    scraper = None
     try:
-        if portal_name == "onlinekhabar":
-            scraper = OnlinekhabarScraper(url)
-        elif portal_name == "ratopati":
-            scraper = RatopatiScraper(url)
-        elif portal_name == "setopati":
-            scraper = SetopatiScraper(url)
-        elif portal_name == "nayapatrikadaily":
-            scraper = NayaPatrikaScraper(url)
-        elif portal_name == "ekantipur":
-            scraper = EkantipurScraper(url)
-        elif portal_name == "gorkhapatra":
-            scraper = GorkhapatraScraper(url)
-        if scraper is not None:
-            news_json = scraper.get_news_json()
-            news = news_json.get("news_content", "News content not found")
-        else:
-            news_data = get_newsfrom_api(url)
-            news = news_data.get("news_content", "News content not found")
+        scraper_class = get_scraper_class(url)
+        with span('scrape', portal=extract_portal_name(url)):
+            if scraper_class is not None:
+                news_json = scraper_class(url).get_news_json()
+                news = news_json.get("news_content", "News content not found")
+            else:
+                news_data = get_newsfrom_api(url)
+                news = news_data.get("news_content", "News content not found")
     except Exception as e:
         logger.error(f"Error in get_newsfrom_url: {e}")
         news = f"Error: {e}"
     return news
 
-# Function to format the input paragraph
-def format_paragraph(text):
-    pattern = r'[a-zA-Z0-9!#@_$%^&*]'
-    text_without_chars = re.sub(pattern, '', text)
-    lines = [line.strip() for line in text_without_chars.splitlines() if line.strip()]
-    formatted_text = ' '.join(lines)
-    return formatted_text
-
-# Function to split text into chunks by sentence
-def split_text_by_sentence_end_in_range(text, min_chunk_size, max_chunk_size, delimiter='।'):
-    words = text.split()
-    chunks = []
-    current_chunk = []
-    current_word_count = 0
-    for word in words:
-        current_chunk.append(word)
-        current_word_count += 1
-        if min_chunk_size <= current_word_count <= max_chunk_size and word.endswith(delimiter):
-            chunks.append(" ".join(current_chunk))
-            current_chunk = []
-            current_word_count = 0
-        elif current_word_count > max_chunk_size:
-            chunk_text = " ".join(current_chunk)
-            last_delimiter_index = chunk_text.rfind(delimiter)
-            if last_delimiter_index != -1:
-                split_point = last_delimiter_index + len(delimiter)
-                chunks.append(chunk_text[:split_point])
-                remaining_text = chunk_text[split_point:].strip()
-                current_chunk = remaining_text.split()
-                current_word_count = len(current_chunk)
-            else:
-                chunks.append(chunk_text)
-                current_chunk = []
-                current_word_count = 0
-    if current_chunk:
-        chunks.append(" ".join(current_chunk))
-    return chunks
-
-# Function to generate a summary with mT5
-def summary(text, model, tokenizer, max_summary_length):
-    inputs = tokenizer("summarize: " + text, return_tensors="pt", max_length=1024, truncation=True)
-    summary_ids = model.generate(inputs.input_ids.to(model.device), max_length=max_summary_length, num_beams=4, length_penalty=0.1, early_stopping=True)
-    return tokenizer.decode(summary_ids[0], skip_special_tokens=True)
-
-# Function to generate long summaries with mT5
-def summary_nepali(text, model, tokenizer, max_summary_length=512):
-    chunks = split_text_by_sentence_end_in_range(text, 100, 150)
-    summaries = [summary(chunk, model, tokenizer, max_summary_length) for chunk in chunks]
-    return ' '.join(summaries)
-
-# Function to generate short summaries using mT5
-def mt5Summary(text, model, tokenizer, max_summary_length=512):
-    inputs = tokenizer("summarize: " + text, return_tensors="pt", max_length=max_summary_length, truncation=True)
-    summary_ids = model.generate(inputs.input_ids.to(model.device), max_length=max_summary_length, num_beams=5, length_penalty=0.1, early_stopping=True)
-    return tokenizer.decode(summary_ids[0], skip_special_tokens=True)
-
 # def geminiReferenceSummary(text, target_word_count):
 #     try:
 #         model = genai.GenerativeModel("gemini-1.5-pro")
@@ -168,43 +383,172 @@ def mt5Summary(text, model, tokenizer, max_summary_length=512):
 # Function to generate reference summary using Gemini
 def geminiReferenceSummary(text):
     try:
-        model = genai.GenerativeModel("gemini-1.5-pro")
-        response = model.generate_content(
-            "तपाईं एक पेशेवर पाठ संक्षेपक हुनुहुन्छ। तपाईंलाई दिइएको पाठको संक्षिप्त सारांश प्रदान गर्नुहोस्।\n\n" + text
-        )
-        return response.text
+        with span('reference'):
+            return reference_client.summarize(text)
     except Exception as e:
         logger.error(f"Error with Gemini API: {str(e)}")
         raise Exception(f"Error with Gemini API: {str(e)}")
 
-# Updated ROUGE score calculator using rouge.Rouge
-def calculate_rouge_scores(reference, hypothesis):
-    logger.info("Gemini Reference: %s", reference)
-    logger.info("mT5 Hypothesis: %s", hypothesis)
-    rouge = Rouge()
-    scores = rouge.get_scores(hypothesis, reference)  # Note: hypothesis first, then reference
-    logger.info("Raw ROUGE Scores: %s", scores)
-    
-    # Extract scores from the list (scores is a list of dicts, we take the first item)
-    score_dict = scores[0]
+
+# Function to read the optional 'deadline' of a request body; returns (seconds, error message)
+def request_deadline(data):
+    deadline = data.get('deadline', REQUEST_DEADLINE)
+    if isinstance(deadline, bool) or not isinstance(deadline, (int, float)) or deadline <= 0:
+        return None, "Invalid deadline, expected a positive number of seconds"
+    return min(float(deadline), REQUEST_DEADLINE_MAX), None
+
+
+# Function to read and check the fields of a '/' request; returns (fields, error message)
+def summary_request_fields(data):
+    selected_length = data.get('selectedLength')
+    if not selected_length:
+        return None, "Missing required parameter: selectedLength"
+    mode = data.get('mode', 'sync')
+    if mode not in ('sync', 'poll'):
+        return None, "Invalid mode, expected sync or poll"
+    if mode == 'poll' and job_queue is None:
+        return None, "mode poll needs the server to run with a JOB_QUEUE"
+    # A poll request is answered before there is a summary to score, so it makes no reference
+    reference_mode = data.get('reference', 'none' if mode == 'poll' else 'sync')
+    if reference_mode not in REFERENCE_MODES:
+        return None, f"Invalid reference mode, expected one of {', '.join(REFERENCE_MODES)}"
+    if mode == 'poll' and reference_mode != 'none':
+        return None, "mode poll makes no reference summary, send reference none or use mode sync"
+    if selected_length not in SELECTED_LENGTHS:
+        return None, "Invalid length"
+    profile = data.get('profile', GENERATION_PROFILE)
+    error = profile_error(profile)
+    if error:
+        return None, error
+    callback = data.get('callback') or None
+    if callback is not None and (mode != 'poll' or not callback_allowed(callback, JOB_CALLBACK_HOSTS)):
+        return None, "callback must be an http(s) URL on a host in JOB_CALLBACK_HOSTS and needs mode poll"
+    deadline, error = request_deadline(data)
+    if error:
+        return None, error
+    return {
+        'text': data.get('text', ''),
+        'url': data.get('url', ''),
+        'selected_length': selected_length,
+        'reference_mode': reference_mode,
+        'profile': profile,
+        'timings': bool(data.get('timings', TIMING_BREAKDOWN)),
+        'deadline': deadline,
+        'mode': mode,
+        'callback': callback
+    }, None
+
+# Function to look a summary up in the cache, then among near-duplicates.
+# Returns (cache_key, cached entry or None, cache status, signature to index on a miss, extra response fields)
+def lookup_summary(formatted_text, selected_length, profile):
+    with span('cache'):
+        cache_key = summary_cache_key(formatted_text, selected_length, profile)
+        # Only the outcome of the whole lookup counts towards the hit ratio, not every key tried
+        cached = summary_cache.peek(cache_key)
+        cache_status = 'hit'
+        duplicate_similarity = None
+        signature = None
+        if cached is None and DEDUP_ENABLED:
+            cached, duplicate_similarity, signature = find_near_duplicate(formatted_text, cache_key)
+            cache_status = 'near-duplicate'
+        summary_cache.record(cached is not None)
+    if cached is None:
+        cache_status = 'miss'
+    extra = {'duplicate_similarity': duplicate_similarity} if duplicate_similarity is not None else {}
+    return cache_key, cached, cache_status, signature, extra
+
+# Function to check whether a cached entry answers the request; a hypothesis without a
+# reference is enough unless the caller waits for the reference
+def cached_answer(cached, reference_mode):
+    return cached is not None and (cached.get('reference_summary') is not None or reference_mode != 'sync')
+
+# Function to store a computed summary and index it for near-duplicate lookups
+def store_summary(cache_key, cache_status, signature, reference_summary, hypothesis_summary, rouge_scores):
+    summary_cache.set(cache_key, {
+        'reference_summary': reference_summary,
+        'hypothesis_summary': hypothesis_summary,
+        'rouge_scores': rouge_scores
+    })
+    if signature is not None and cache_status == 'miss':
+        dedup_index.add(cache_key, signature=signature)
+
+# Function to score the hypothesis in the background once the reference is ready; returns the job id
+def track_reference(reference_future, cache_key, hypothesis_summary):
+    def store_reference(reference_summary, rouge_scores):
+        summary_cache.set(cache_key, {
+            'reference_summary': reference_summary,
+            'hypothesis_summary': hypothesis_summary,
+            'rouge_scores': rouge_scores
+        })
+    return reference_jobs.track(reference_future, hypothesis_summary, calculate_rouge_scores, on_complete=store_reference)
+
+# Function to check whether a summary of this length is made by the JOB_QUEUE workers
+def uses_job_queue(selected_length):
+    return job_queue is not None and selected_length != 'extractive'
+
+# Function to queue a summary job for the workers; rejected with 429 when JOB_QUEUE_MAX_DEPTH jobs
+# are already waiting. A job with a deadline expires unstarted once it has passed.
+def enqueue_summary(formatted_text, selected_length, profile, cache_key, deadline=None, callback=None):
+    if job_queue.depth() >= JOB_QUEUE_MAX_DEPTH:
+        raise Overloaded("Too many summary jobs waiting, try again later", 429, 1)
+    payload = {'text': formatted_text, 'selected_length': selected_length, 'profile': profile, 'cache_key': cache_key}
+    deadline_at = time.time() + deadline.remaining() if deadline is not None else None
+    return job_queue.enqueue(payload, lane=admission.lane_for(selected_length), deadline_at=deadline_at, callback=callback)
+
+# Function to wait up to timeout seconds for a queued summary; returns it or raises the job's error
+def queued_summary(job_id, timeout):
+    job = job_queue.wait(job_id, timeout)
+    if job is None:
+        raise Exception(f"Summary job {job_id} disappeared from the queue")
+    if job['status'] == 'done':
+        return job['result']['hypothesis_summary']
+    if job['status'] == 'failed':
+        raise Exception(job['error'])
+    raise DeadlineExceeded(f"Summary job {job_id} is still {job['status']} after {timeout:.1f}s")
+
+# Function to build the 202 answer of a '/' request in poll mode
+def queued_response(job_id, formatted_text, cache_status, start_time):
     return {
-        "rouge1": {
-            "precision": score_dict['rouge-1']['p'],
-            "recall": score_dict['rouge-1']['r'],
-            "fmeasure": score_dict['rouge-1']['f']
-        },
-        "rouge2": {
-            "precision": score_dict['rouge-2']['p'],
-            "recall": score_dict['rouge-2']['r'],
-            "fmeasure": score_dict['rouge-2']['f']
-        },
-        "rougeL": {
-            "precision": score_dict['rouge-l']['p'],
-            "recall": score_dict['rouge-l']['r'],
-            "fmeasure": score_dict['rouge-l']['f']
-        }
+        'job_id': job_id,
+        'status': 'queued',
+        'formatted_text': formatted_text,
+        'processing_time': time.time() - start_time,
+        'cache': cache_status
     }
 
+# Function to build the body, status and headers of a request that was shed or ran out of time
+def overload_error(error):
+    if isinstance(error, Overloaded):
+        return {"error": str(error)}, error.status_code, {'Retry-After': str(error.retry_after)}
+    return {"error": str(error)}, 504, {}
+
+# Function to add the request's per-stage timings to a '/' response when asked for
+def with_timings(response, fields):
+    trace = current_trace()
+    if fields['timings'] and trace is not None:
+        response['timings'] = trace.breakdown()
+    return response
+
+@app.before_request
+def begin_trace():
+    g.trace, g.trace_token = start_trace()
+    g.profile = profiler.start()
+
+@app.after_request
+def observe_request(response):
+    route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    REQUEST_SECONDS.observe(time.perf_counter() - g.trace.started_at, route=route, status=str(response.status_code))
+    return response
+
+@app.teardown_request
+def finish_trace(exc):
+    if 'deadline_token' in g:
+        end_deadline(g.pop('deadline_token'))
+    if 'trace_token' in g:
+        end_trace(g.pop('trace_token'))
+    if g.get('profile') is not None:
+        path = profiler.stop(g.pop('profile'), request.endpoint or 'unmatched')
+        logger.info(f"Wrote profile {path}")
 
 @app.route('/', methods=['GET', 'POST', 'OPTIONS'])
 def summarize():
@@ -224,35 +568,389 @@ def summarize():
         data = request.json
         if not data:
             return jsonify({"error": "Invalid JSON format"}), 400
-        text = data.get('text', '')
-        given_url = data.get('url', '')
-        selected_length = data.get('selectedLength')
-        if not selected_length:
-            return jsonify({"error": "Missing required parameter: selectedLength"}), 400
-        if given_url:
-            text = get_newsfrom_url(given_url)
+        fields, error = summary_request_fields(data)
+        if error:
+            return jsonify({"error": error}), 400
+        selected_length = fields['selected_length']
+        reference_mode = fields['reference_mode']
+        profile = fields['profile']
+        deadline, g.deadline_token = start_deadline(fields['deadline'])
+        text = get_newsfrom_url(fields['url']) if fields['url'] else fields['text']
         formatted_text = format_paragraph(text)
         try:
-            reference_summary = geminiReferenceSummary(formatted_text)
-            if selected_length == 'short':
-                hypothesis_summary = mt5Summary(formatted_text, model, tokenizer)
-            elif selected_length == 'long':
-                hypothesis_summary = summary_nepali(formatted_text, model, tokenizer)
+            if uses_job_queue(selected_length):
+                model, tokenizer, batcher = None, None, None
+            else:
+                model, tokenizer, batcher = get_summarizer_state(selected_length)
+        except ModelNotReady as e:
+            return jsonify({"error": str(e)}), 503
+        except DeadlineExceeded as e:
+            body, status, headers = overload_error(e)
+            return jsonify(body), status, headers
+        try:
+            cache_key, cached, cache_status, signature, extra = lookup_summary(formatted_text, selected_length, profile)
+            if cached_answer(cached, reference_mode):
+                return jsonify(with_timings(dict(
+                    cached,
+                    formatted_text=formatted_text,
+                    processing_time=time.time() - start_time,
+                    cache=cache_status,
+                    **extra
+                ), fields))
+            # Rejected here, before Gemini is called, when the request cannot get a slot in time
+            lane = admission.lane_for(selected_length)
+            job_id = None
+            if cached is None and uses_job_queue(selected_length):
+                poll = fields['mode'] == 'poll'
+                job_id = enqueue_summary(formatted_text, selected_length, profile, cache_key,
+                                         None if poll else deadline, fields['callback'])
+                if poll:
+                    return jsonify(with_timings(queued_response(job_id, formatted_text, cache_status, start_time), fields)), 202
+            elif cached is None:
+                admission.check(lane, deadline)
+            reference_future = None
+            if reference_mode != 'none':
+                # Gemini runs in the background while mT5 generates
+                reference_future = reference_jobs.submit_reference(geminiReferenceSummary, formatted_text)
+            if cached is not None:
+                hypothesis_summary = cached['hypothesis_summary']
+            elif job_id is not None:
+                hypothesis_summary = queued_summary(job_id, deadline.remaining())
             else:
-                return jsonify({"error": "Invalid length"}), 400
-            rouge_scores = calculate_rouge_scores(reference_summary, hypothesis_summary)
+                with admission.slot(lane, deadline):
+                    deadline.check('summarize')
+                    hypothesis_summary = summarize_text(formatted_text, selected_length, model, tokenizer, batcher, profile)
+            reference_summary = None
+            rouge_scores = None
+            reference_job = None
+            if reference_mode == 'sync':
+                try:
+                    reference_summary = reference_future.result(timeout=deadline.remaining())
+                except FutureTimeout:
+                    raise DeadlineExceeded(f"Deadline of {deadline.seconds:g}s exceeded waiting for the reference summary")
+                rouge_scores = calculate_rouge_scores(reference_summary, hypothesis_summary)
+            store_summary(cache_key, cache_status, signature, reference_summary, hypothesis_summary, rouge_scores)
+            if reference_mode == 'async':
+                reference_job = track_reference(reference_future, cache_key, hypothesis_summary)
             end_time = time.time()  # End measuring time
             processing_time = end_time - start_time  # Calculate total time
-            return jsonify({
+            response = {
                 'reference_summary': reference_summary,
                 'hypothesis_summary': hypothesis_summary,
                 'formatted_text': formatted_text,
                 'rouge_scores': rouge_scores,
-                'processing_time': processing_time  # Include processing time in response
-            })
+                'processing_time': processing_time,  # Include processing time in response
+                'cache': cache_status,
+                **extra
+            }
+            if reference_job is not None:
+                response['reference_job'] = reference_job
+            return jsonify(with_timings(response, fields))
+        except (Overloaded, DeadlineExceeded) as e:
+            body, status, headers = overload_error(e)
+            return jsonify(body), status, headers
         except Exception as e:
             logger.error(f"Error during processing: {str(e)}")
             return jsonify({"error": f"Error during processing: {str(e)}"}), 500
+
+# Summarize many articles in one request. Each item is {"text" | "url", "selectedLength"};
+# the chunks of all items go through the batcher together so they share padded generate calls.
+# Results come back per item, and a failing item only sets that item's "error". The whole batch
+# shares one "deadline" and, when it has uncached items, one admission slot in the lane of its
+# longest item; the model is only waited for when an uncached item needs mT5.
+@app.route('/batch', methods=['POST'])
+def summarize_batch():
+    start_time = time.time()
+    data = request.json
+    if not data or not isinstance(data.get('items'), list):
+        return jsonify({"error": "Expected a JSON body with an 'items' list"}), 400
+    items = data['items']
+    if len(items) > BATCH_MAX_ITEMS:
+        return jsonify({"error": f"Too many items, the limit is {BATCH_MAX_ITEMS}"}), 400
+    seconds, error = request_deadline(data)
+    if error:
+        return jsonify({"error": error}), 400
+    deadline, g.deadline_token = start_deadline(seconds)
+
+    results = [{'index': index} for index in range(len(items))]
+    texts = [None] * len(items)
+    url_futures = {}
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            results[index]['error'] = "Item must be an object"
+        elif item.get('selectedLength') not in SELECTED_LENGTHS:
+            results[index]['error'] = "Invalid length"
+        elif profile_error(item.get('profile', GENERATION_PROFILE)):
+            results[index]['error'] = profile_error(item.get('profile', GENERATION_PROFILE))
+        elif item.get('url'):
+            url_futures[index] = fetch_executor.submit(run_in_context(get_newsfrom_url), item['url'])
+        else:
+            texts[index] = item.get('text', '')
+    # A portal that does not answer in time fails its own item, not the whole batch
+    for index, future in url_futures.items():
+        try:
+            texts[index] = future.result(timeout=deadline.remaining())
+        except FutureTimeout:
+            future.cancel()
+            results[index]['error'] = f"Deadline of {deadline.seconds:g}s exceeded while fetching the article"
+        except Exception as e:
+            results[index]['error'] = f"Error fetching the article: {str(e)}"
+
+    # Answer the cached items first; the rest decide whether the model and a slot are needed
+    uncached = []
+    for index, text in enumerate(texts):
+        if text is None:
+            continue
+        result = results[index]
+        selected_length = items[index]['selectedLength']
+        profile = items[index].get('profile', GENERATION_PROFILE)
+        formatted_text = format_paragraph(text)
+        result['formatted_text'] = formatted_text
+        cache_key, cached, cache_status, signature, extra = lookup_summary(formatted_text, selected_length, profile)
+        if cached is not None:
+            result['hypothesis_summary'] = cached['hypothesis_summary']
+            result['cache'] = cache_status
+            result.update(extra)
+        else:
+            uncached.append((index, formatted_text, selected_length, profile, cache_key, signature))
+    if not uncached:
+        return jsonify({'results': results, 'processing_time': time.time() - start_time})
+
+    model, tokenizer, batcher = None, None, None
+    try:
+        if job_queue is None and any(selected_length != 'extractive' for _, _, selected_length, _, _, _ in uncached):
+            model, tokenizer = model_holder.get(timeout=clamp_timeout(MODEL_LOAD_TIMEOUT, 'model load'))
+            batcher = get_batcher(model, tokenizer)
+        lane = 'long' if any(selected_length == 'long' for _, _, selected_length, _, _, _ in uncached) else 'short'
+        if job_queue is None:
+            with admission.slot(lane, deadline):
+                deadline.check('summarize')
+                summarize_batch_items(uncached, results, model, tokenizer, batcher, deadline)
+        else:
+            summarize_batch_items(uncached, results, model, tokenizer, batcher, deadline)
+    except ModelNotReady as e:
+        return jsonify({"error": str(e)}), 503
+    except (Overloaded, DeadlineExceeded) as e:
+        body, status, headers = overload_error(e)
+        return jsonify(body), status, headers
+
+    return jsonify({'results': results, 'processing_time': time.time() - start_time})
+
+# Function to summarize the uncached items of a /batch request into their results. Every item is
+# queued before any is waited on so the batcher can group them, and queued jobs expire with the request.
+def summarize_batch_items(uncached, results, model, tokenizer, batcher, deadline):
+    pending = {}
+    for index, formatted_text, selected_length, profile, cache_key, signature in uncached:
+        result = results[index]
+        try:
+            if selected_length == 'extractive':
+                result['hypothesis_summary'] = summarize_text(formatted_text, selected_length, model, tokenizer, batcher)
+                result['cache'] = 'miss'
+                store_summary(cache_key, 'miss', signature, None, result['hypothesis_summary'], None)
+            elif job_queue is not None:
+                # Every item is its own job, so the workers can spread them over their batches
+                pending[index] = (cache_key, signature, enqueue_summary(formatted_text, selected_length, profile, cache_key, deadline))
+            elif SUMMARY_STRATEGY == 'hierarchical':
+                # Levels depend on the previous one, so each item runs in its own thread; their
+                # chunks still meet in the batcher
+                pending[index] = (cache_key, signature, [fetch_executor.submit(run_in_context(summarize_text),
+                    formatted_text, selected_length, model, tokenizer, batcher, profile
+                )])
+            elif selected_length == 'short':
+                pending[index] = (cache_key, signature, [
+                    submit_mt5Summary(short_input(formatted_text, tokenizer), batcher, profile=profile)
+                ])
+            else:
+                pending[index] = (cache_key, signature, submit_summary_nepali(
+                    formatted_text, batcher, token_budget=CHUNK_TOKEN_BUDGET, profile=profile
+                ))
+        except Exception as e:
+            result['error'] = f"Error during processing: {str(e)}"
+
+    for index, (cache_key, signature, futures) in pending.items():
+        result = results[index]
+        try:
+            if job_queue is not None:
+                result['hypothesis_summary'] = queued_summary(futures, deadline.remaining())
+            else:
+                result['hypothesis_summary'] = join_summaries(futures)
+            result['cache'] = 'miss'
+            store_summary(cache_key, 'miss', signature, None, result['hypothesis_summary'], None)
+        except Exception as e:
+            logger.error(f"Error during batch item {index}: {str(e)}")
+            result['error'] = f"Error during processing: {str(e)}"
+
+# Function to format one Server-Sent Event
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+# Streaming variant of '/': long mode emits a 'chunk' event per chunk summary, short mode
+# emits 'token' events from greedy (or sampled, with "decoding": "sample") generation.
+# The stream starts with a 'meta' event and ends with 'done' or 'error'.
+@app.route('/stream', methods=['POST'])
+def summarize_stream():
+    start_time = time.time()
+    data = request.json
+    if not data:
+        return jsonify({"error": "Invalid JSON format"}), 400
+    text = data.get('text', '')
+    given_url = data.get('url', '')
+    selected_length = data.get('selectedLength')
+    if selected_length not in SELECTED_LENGTHS:
+        return jsonify({"error": "Invalid length"}), 400
+    decoding = data.get('decoding', 'greedy')
+    if decoding not in ('greedy', 'sample'):
+        return jsonify({"error": "Invalid decoding, expected greedy or sample"}), 400
+    profile = data.get('profile', GENERATION_PROFILE)
+    error = profile_error(profile)
+    if error:
+        return jsonify({"error": error}), 400
+    seconds, error = request_deadline(data)
+    if error:
+        return jsonify({"error": error}), 400
+    if uses_job_queue(selected_length):
+        return jsonify({"error": "Streaming needs the model in the web process, unset JOB_QUEUE or use mode poll on '/'"}), 503
+    deadline, g.deadline_token = start_deadline(seconds)
+    lane = admission.lane_for(selected_length)
+    try:
+        # Rejected before the article is fetched when the request cannot get a slot in time
+        admission.check(lane, deadline)
+        if given_url:
+            text = get_newsfrom_url(given_url)
+        formatted_text = format_paragraph(text)
+        model, tokenizer, batcher = get_summarizer_state(selected_length)
+    except ModelNotReady as e:
+        return jsonify({"error": str(e)}), 503
+    except (Overloaded, DeadlineExceeded) as e:
+        body, status, headers = overload_error(e)
+        return jsonify(body), status, headers
+
+    def events():
+        yield sse_event('meta', {'formatted_text': formatted_text, 'selectedLength': selected_length})
+        # The request context is torn down before the stream is read, so the deadline is set again here
+        deadline_token = resume_deadline(deadline)
+        try:
+            with admission.slot(lane, deadline):
+                deadline.check('summarize')
+                if SUMMARY_STRATEGY == 'hierarchical' or selected_length == 'extractive':
+                    # Only the final level is the summary, so it arrives as a single chunk
+                    cache_key = summary_cache_key(formatted_text, selected_length, profile)
+                    cached = summary_cache.get(cache_key)
+                    if cached is not None:
+                        hypothesis_summary = cached['hypothesis_summary']
+                    else:
+                        hypothesis_summary = summarize_text(formatted_text, selected_length, model, tokenizer, batcher, profile)
+                        summary_cache.set(cache_key, {
+                            'reference_summary': None,
+                            'hypothesis_summary': hypothesis_summary,
+                            'rouge_scores': None
+                        })
+                    yield sse_event('chunk', {'index': 0, 'summary': hypothesis_summary})
+                elif selected_length == 'long':
+                    # Long mode uses the same beam search as '/', so it shares its cache entries
+                    cache_key = summary_cache_key(formatted_text, selected_length, profile)
+                    cached = summary_cache.get(cache_key)
+                    if cached is not None:
+                        hypothesis_summary = cached['hypothesis_summary']
+                        yield sse_event('chunk', {'index': 0, 'summary': hypothesis_summary})
+                    else:
+                        summaries = []
+                        for index, chunk_summary in enumerate(
+                            stream_summary_nepali(
+                                formatted_text, model, tokenizer, batcher=batcher, token_budget=CHUNK_TOKEN_BUDGET, profile=profile
+                            )
+                        ):
+                            summaries.append(chunk_summary)
+                            yield sse_event('chunk', {'index': index, 'summary': chunk_summary})
+                        hypothesis_summary = ' '.join(summaries)
+                        summary_cache.set(cache_key, {
+                            'reference_summary': None,
+                            'hypothesis_summary': hypothesis_summary,
+                            'rouge_scores': None
+                        })
+                else:
+                    pieces = []
+                    short_text = short_input(formatted_text, tokenizer)
+                    # closing() stops generate as soon as the client disconnects and this generator is closed
+                    with closing(stream_mt5Summary(short_text, model, tokenizer, do_sample=(decoding == 'sample'),
+                                                   profile=profile)) as token_stream:
+                        for piece in token_stream:
+                            pieces.append(piece)
+                            yield sse_event('token', {'text': piece})
+                    hypothesis_summary = ''.join(pieces).strip()
+            yield sse_event('done', {
+                'hypothesis_summary': hypothesis_summary,
+                'processing_time': time.time() - start_time
+            })
+        except (Overloaded, DeadlineExceeded) as e:
+            yield sse_event('error', {'error': str(e)})
+        except Exception as e:
+            logger.error(f"Error during streaming: {str(e)}")
+            yield sse_event('error', {'error': f"Error during processing: {str(e)}"})
+        finally:
+            end_deadline(deadline_token)
+
+    response = Response(stream_with_context(events()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # Stop proxies from buffering the stream
+    return response
+
+# Status of a background reference summary / ROUGE job (reference mode 'async')
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_reference_job(job_id):
+    job = reference_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job id"}), 404
+    return jsonify(dict(job, job_id=job_id))
+
+# Status of a summary queued with mode poll; once it is done the summary is cached like a sync one
+@app.route('/summaries/<job_id>', methods=['GET'])
+def get_summary_job(job_id):
+    job = job_queue.get(job_id) if job_queue is not None else None
+    if job is None:
+        return jsonify({"error": "Unknown job id"}), 404
+    if job['status'] == 'done' and summary_cache.peek(job['payload']['cache_key']) is None:
+        summary_cache.set(job['payload']['cache_key'], {
+            'reference_summary': None,
+            'hypothesis_summary': job['result']['hypothesis_summary'],
+            'rouge_scores': None
+        })
+    return jsonify(public_job(job))
+
+# Batcher and cache metrics, used to tune BATCH_MAX_SIZE / BATCH_WINDOW_MS and the cache size
+@app.route('/stats', methods=['GET'])
+def stats():
+    return jsonify({
+        "batcher": batcher.stats() if batcher is not None else None,
+        "cache": summary_cache.stats(),
+        "dedup": dedup_index.stats(),
+        "admission": admission.stats(),
+        "jobs": job_queue.stats() if job_queue is not None else None,
+        "tokens": get_token_cache(model_holder.tokenizer).stats() if model_holder.tokenizer is not None else None
+    })
+
+# Prometheus metrics of this worker process: per-stage and per-route latency histograms,
+# chunks and generated tokens per summary, generate batch sizes and the /stats gauges
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(metrics_text(), mimetype='text/plain; version=0.0.4')
+
+# Liveness: the worker process is up and serving HTTP
+@app.route('/healthz', methods=['GET'])
+def healthz():
+    return jsonify({"status": "alive", "pid": os.getpid()})
+
+# Readiness: the model is loaded and warmed up in this worker, or with a JOB_QUEUE the queue is reachable
+@app.route('/readyz', methods=['GET'])
+def readyz():
+    if job_queue is not None:
+        try:
+            return jsonify({"ready": True, "jobs": job_queue.stats()})
+        except Exception as e:
+            return jsonify({"ready": False, "error": f"Job queue unreachable: {e}"}), 503
+    status = model_holder.status()
+    return jsonify(status), 200 if status["ready"] else 503
+
 # @app.route('/', methods=['GET', 'POST', 'OPTIONS'])
 # def summarize():
 #     if request.method == 'OPTIONS':
@@ -0,0 +1,250 @@
+# ASGI entry point: '/' runs on the event loop so portal fetches, the extractor API and the
+# Gemini reference call are awaited instead of holding a worker thread, and only generation
+# goes to a bounded thread pool. Every other route is the Flask app, served through a2wsgi.
+#
+#   uvicorn asgi:app --host 0.0.0.0 --port 5000
+import asyncio
+import contextlib
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Mount, Route
+
+from Scrapper import get_scraper_class
+from Scrapper.async_fetch import AsyncFetcher
+from app import (
+    API_KEY, BATCH_MAX_SIZE, admission, app as flask_app, cached_answer, overload_error, extract_portal_name, format_paragraph,
+    get_summarizer_state, lookup_summary, profiler, reference_client, reference_jobs, geminiReferenceSummary,
+    store_summary, summarize_text, summary_request_fields, track_reference, calculate_rouge_scores, with_timings,
+    enqueue_summary, queued_response, queued_summary, uses_job_queue
+)
+from admission import Overloaded
+from deadline import DeadlineExceeded, end_deadline, start_deadline
+from inference import ModelNotReady
+from tracing import REQUEST_SECONDS, end_trace, run_in_context, span, start_trace
+
+logger = logging.getLogger(__name__)
+
+# Threads that run summarize_text; each one waits on the batcher while it generates, so this
+# bounds the summaries in flight. Threads rather than processes because the model and the
+# batcher live in this process and torch releases the GIL while it computes.
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", str(BATCH_MAX_SIZE)))
+inference_executor = ThreadPoolExecutor(max_workers=INFERENCE_WORKERS, thread_name_prefix="inference")
+
+async_fetcher = AsyncFetcher(
+    connect_timeout=float(os.getenv("SCRAPER_CONNECT_TIMEOUT", "3.05")),
+    read_timeout=float(os.getenv("SCRAPER_READ_TIMEOUT", "10")),
+    retries=int(os.getenv("SCRAPER_RETRIES", "2")),
+    per_host_limit=int(os.getenv("SCRAPER_PER_HOST_LIMIT", "4"))
+)
+
+
+# Function to run a blocking call on the inference pool without blocking the event loop;
+# it runs in the request's context so its spans land in the request's trace
+async def run_inference(fn, *args):
+    return await asyncio.get_running_loop().run_in_executor(inference_executor, run_in_context(fn), *args)
+
+
+# Function to extract news from the API without blocking
+async def get_newsfrom_api_async(url):
+    endpoint = "https://extractorapi.com/api/v1/extractor"
+    params = {"apikey": API_KEY, "url": url}
+    try:
+        resp = await async_fetcher.get_json(endpoint, params=params)
+        news = resp.get('text', 'Error')
+    except Exception as e:
+        logger.error(f"Error in get_newsfrom_api_async: {e}")
+        news = f"Error: {e}"
+    return {"portal_name": extract_portal_name(url), "news_content": news}
+
+
+# Function to scrape news from the portals without blocking, like app.get_newsfrom_url
+async def get_newsfrom_url_async(url):
+    news = "Couldn't find url"
+    try:
+        scraper_class = get_scraper_class(url)
+        with span('scrape', portal=extract_portal_name(url)):
+            if scraper_class is not None:
+                news_json = await scraper_class(url).get_news_json_async(async_fetcher)
+                news = news_json.get("news_content", "News content not found")
+            else:
+                news_data = await get_newsfrom_api_async(url)
+                news = news_data.get("news_content", "News content not found")
+    except Exception as e:
+        logger.error(f"Error in get_newsfrom_url_async: {e}")
+        news = f"Error: {e}"
+    return news
+
+
+# Function to get the reference summary through the client's asyncio API when it has one
+async def reference_summary_async(text):
+    if not hasattr(reference_client, 'summarize_async'):
+        return await asyncio.to_thread(geminiReferenceSummary, text)
+    try:
+        with span('reference'):
+            return await reference_client.summarize_async(text)
+    except Exception as e:
+        logger.error(f"Error with Gemini API: {str(e)}")
+        raise Exception(f"Error with Gemini API: {str(e)}")
+
+
+def error_response(message, status_code):
+    return JSONResponse({"error": message}, status_code=status_code)
+
+
+def overload_response(error):
+    body, status_code, headers = overload_error(error)
+    return JSONResponse(body, status_code=status_code, headers=headers)
+
+
+# Same request/response contract as the Flask '/' route, traced and profiled like the Flask routes
+async def summarize(request):
+    trace, token = start_trace()
+    profile = profiler.start()
+    status_code = 500
+    try:
+        response = await _summarize(request)
+        status_code = response.status_code
+        return response
+    finally:
+        REQUEST_SECONDS.observe(time.perf_counter() - trace.started_at, route='/', status=str(status_code))
+        if getattr(request.state, 'deadline_token', None) is not None:
+            end_deadline(request.state.deadline_token)
+        end_trace(token)
+        if profile is not None:
+            logger.info(f"Wrote profile {profiler.stop(profile, 'summarize')}")
+
+
+async def _summarize(request):
+    if request.method == 'OPTIONS':
+        return Response(status_code=204, headers={
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Allow-Methods': 'GET, POST, OPTIONS',
+            'Access-Control-Allow-Headers': 'Content-Type'
+        })
+    if request.method == 'GET':
+        return error_response("This endpoint only supports POST requests.", 405)
+
+    start_time = time.time()
+    try:
+        data = await request.json()
+    except ValueError:
+        data = None
+    if not data or not isinstance(data, dict):
+        return error_response("Invalid JSON format", 400)
+    fields, error = summary_request_fields(data)
+    if error:
+        return error_response(error, 400)
+    selected_length = fields['selected_length']
+    reference_mode = fields['reference_mode']
+    profile = fields['profile']
+    deadline, request.state.deadline_token = start_deadline(fields['deadline'])
+    text = await get_newsfrom_url_async(fields['url']) if fields['url'] else fields['text']
+    formatted_text = format_paragraph(text)
+    try:
+        # Returns at once when the model is loaded; waits up to MODEL_LOAD_TIMEOUT otherwise
+        if uses_job_queue(selected_length):
+            model, tokenizer, batcher = None, None, None
+        else:
+            model, tokenizer, batcher = await asyncio.to_thread(get_summarizer_state, selected_length)
+    except ModelNotReady as e:
+        return error_response(str(e), 503)
+    except DeadlineExceeded as e:
+        return overload_response(e)
+    reference_task = None
+    try:
+        cache_key, cached, cache_status, signature, extra = lookup_summary(formatted_text, selected_length, profile)
+        if cached_answer(cached, reference_mode):
+            return JSONResponse(with_timings(dict(
+                cached,
+                formatted_text=formatted_text,
+                processing_time=time.time() - start_time,
+                cache=cache_status,
+                **extra
+            ), fields))
+        # Rejected here, before Gemini is called, when the request cannot get a slot in time
+        lane = admission.lane_for(selected_length)
+        job_id = None
+        if cached is None and uses_job_queue(selected_length):
+            poll = fields['mode'] == 'poll'
+            job_id = await asyncio.to_thread(
+                enqueue_summary, formatted_text, selected_length, profile, cache_key,
+                None if poll else deadline, fields['callback']
+            )
+            if poll:
+                return JSONResponse(with_timings(queued_response(job_id, formatted_text, cache_status, start_time), fields), 202)
+        elif cached is None:
+            admission.check(lane, deadline)
+        reference_future = None
+        if reference_mode == 'sync':
+            # Gemini is awaited on the loop while mT5 generates
+            reference_task = asyncio.ensure_future(reference_summary_async(formatted_text))
+        elif reference_mode == 'async':
+            # The job outlives the request, so it runs on the reference pool as in the Flask app
+            reference_future = reference_jobs.submit_reference(geminiReferenceSummary, formatted_text)
+        if cached is not None:
+            hypothesis_summary = cached['hypothesis_summary']
+        elif job_id is not None:
+            hypothesis_summary = await asyncio.to_thread(queued_summary, job_id, deadline.remaining())
+        else:
+            async with admission.slot_async(lane, deadline):
+                deadline.check('summarize')
+                hypothesis_summary = await run_inference(
+                    summarize_text, formatted_text, selected_length, model, tokenizer, batcher, profile
+                )
+        reference_summary = None
+        rouge_scores = None
+        reference_job = None
+        if reference_task is not None:
+            try:
+                reference_summary = await asyncio.wait_for(reference_task, deadline.remaining())
+            except asyncio.TimeoutError:
+                raise DeadlineExceeded(f"Deadline of {deadline.seconds:g}s exceeded waiting for the reference summary")
+            rouge_scores = calculate_rouge_scores(reference_summary, hypothesis_summary)
+        store_summary(cache_key, cache_status, signature, reference_summary, hypothesis_summary, rouge_scores)
+        if reference_future is not None:
+            reference_job = track_reference(reference_future, cache_key, hypothesis_summary)
+        response = {
+            'reference_summary': reference_summary,
+            'hypothesis_summary': hypothesis_summary,
+            'formatted_text': formatted_text,
+            'rouge_scores': rouge_scores,
+            'processing_time': time.time() - start_time,
+            'cache': cache_status,
+            **extra
+        }
+        if reference_job is not None:
+            response['reference_job'] = reference_job
+        return JSONResponse(with_timings(response, fields))
+    except (Overloaded, DeadlineExceeded) as e:
+        return overload_response(e)
+    except Exception as e:
+        logger.error(f"Error during processing: {str(e)}")
+        return error_response(f"Error during processing: {str(e)}", 500)
+    finally:
+        if reference_task is not None and not reference_task.done():
+            reference_task.cancel()
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    yield
+    await async_fetcher.close()
+    inference_executor.shutdown(wait=False)
+
+
+app = Starlette(
+    routes=[
+        Route('/', summarize, methods=['GET', 'POST', 'OPTIONS']),
+        Mount('/', app=WSGIMiddleware(flask_app)),
+    ],
+    middleware=[Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'])],
+    lifespan=lifespan
+)
@@ -0,0 +1,298 @@
+import threading
+import time
+import logging
+from collections import Counter, deque
+from concurrent.futures import Future
+
+from deadline import DeadlineExceeded, current_deadline
+from tracing import BATCH_SIZE, GENERATED_TOKENS, current_trace, record_count, span
+
+logger = logging.getLogger(__name__)
+
+# Number of recent queue-wait samples kept for the latency percentiles in stats()
+WAIT_SAMPLE_SIZE = 1024
+
+# Width in seconds of the deadline buckets: only requests expiring in the same bucket share a
+# batch, so one urgent request never cuts short the generation of requests with more time left
+DEADLINE_BUCKET_SECONDS = 5.0
+
+
+# Function to pad a batch of prompts into tensors; prompts are either strings or
+# lists of token ids that were already tokenized (and budgeted) by the chunker
+def encode_prompts(tokenizer, prompts, max_input_length):
+    if isinstance(prompts[0], str):
+        return tokenizer(prompts, return_tensors="pt", max_length=max_input_length, truncation=True, padding=True)
+    return tokenizer.pad({"input_ids": [list(ids) for ids in prompts]}, return_tensors="pt")
+
+
+# Function to decode generated ids in one batch call; the fast and slow tokenizers differ only
+# in the spaces they leave around removed special tokens, so those are stripped
+def decode_summaries(tokenizer, summary_ids):
+    return [text.strip() for text in tokenizer.batch_decode(summary_ids, skip_special_tokens=True)]
+
+
+# Function to count the tokens generated for each sequence, leaving out padding and the decoder start token
+def count_generated_tokens(tokenizer, summary_ids):
+    return (summary_ids != tokenizer.pad_token_id).sum(dim=1).tolist()
+
+
+# Smaller model with the same vocabulary used for assisted (speculative) decoding, if configured
+_draft_model = None
+
+
+def get_draft_model():
+    return _draft_model
+
+
+# Function to set the draft model used when generate kwargs ask for assisted=True
+def set_draft_model(model):
+    global _draft_model
+    _draft_model = model
+
+
+# Function to run greedy generation with the draft model proposing tokens; transformers
+# only supports assisted generation one sequence at a time, so prompts run one by one
+def generate_assisted(model, tokenizer, prompts, max_input_length, **generate_kwargs):
+    draft_model = get_draft_model()
+    if draft_model is None:
+        raise ValueError("Assisted decoding needs a draft model, set DRAFT_MODEL_ID")
+    outputs = []
+    token_counts = []
+    for prompt in prompts:
+        inputs = encode_prompts(tokenizer, [prompt], max_input_length)
+        summary_ids = model.generate(
+            inputs.input_ids.to(model.device),
+            attention_mask=inputs.attention_mask.to(model.device),
+            assistant_model=draft_model,
+            **generate_kwargs
+        )
+        outputs.extend(decode_summaries(tokenizer, summary_ids))
+        token_counts.extend(count_generated_tokens(tokenizer, summary_ids))
+    return outputs, token_counts
+
+
+# Function to run one padded generate call over a list of prompts; returns the summaries
+# and the number of tokens generated for each
+def generate_with_counts(model, tokenizer, prompts, max_input_length, **generate_kwargs):
+    deadline = current_deadline()
+    if deadline is not None and 'max_time' not in generate_kwargs:
+        # Stop decoding when the request runs out of time and return what was generated so far
+        deadline.check('generate')
+        generate_kwargs['max_time'] = deadline.remaining()
+    BATCH_SIZE.observe(len(prompts))
+    with span('generate'):
+        if generate_kwargs.pop('assisted', False):
+            outputs, token_counts = generate_assisted(model, tokenizer, prompts, max_input_length, **generate_kwargs)
+        else:
+            inputs = encode_prompts(tokenizer, prompts, max_input_length)
+            summary_ids = model.generate(
+                inputs.input_ids.to(model.device),
+                attention_mask=inputs.attention_mask.to(model.device),
+                **generate_kwargs
+            )
+            outputs, token_counts = decode_summaries(tokenizer, summary_ids), count_generated_tokens(tokenizer, summary_ids)
+    for token_count in token_counts:
+        GENERATED_TOKENS.observe(token_count)
+    return outputs, token_counts
+
+
+# Function to run one padded generate call over a list of prompts
+def generate_batch(model, tokenizer, prompts, max_input_length, **generate_kwargs):
+    outputs, token_counts = generate_with_counts(model, tokenizer, prompts, max_input_length, **generate_kwargs)
+    record_count('generated_tokens', sum(token_counts))
+    return outputs
+
+
+def _percentile(samples, q):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(q / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+# Function to summarize queue-wait samples (ms) as the percentiles reported in stats()
+def wait_percentiles(samples):
+    return {"p50": _percentile(samples, 50), "p90": _percentile(samples, 90), "p99": _percentile(samples, 99)}
+
+
+class _PendingRequest:
+    __slots__ = ("prompt", "key", "future", "enqueued_at", "trace", "deadline")
+
+    def __init__(self, prompt, key):
+        self.prompt = prompt
+        self.key = key
+        self.future = Future()
+        self.enqueued_at = time.monotonic()
+        # The submitting request's trace, which gets this batch's queue wait, generate time and tokens
+        self.trace = current_trace()
+        self.deadline = current_deadline()
+
+
+# Collects prompts that arrive within a short window and runs them through
+# the model as one padded generate call. Only requests with the same input
+# length, generation settings and deadline bucket are grouped together. The
+# outputs match unbatched generation up to the small numeric differences that
+# padding introduces; a batch stops decoding at the latest deadline in it, so
+# its more urgent requests may overrun theirs by up to one bucket.
+class MicroBatcher:
+    def __init__(self, model, tokenizer, max_batch_size=8, max_wait_ms=10):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.model = model
+        self.tokenizer = tokenizer
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._pending = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._batch_sizes = Counter()
+        self._wait_ms = deque(maxlen=WAIT_SAMPLE_SIZE)
+        self._max_queue_depth = 0
+        self._batches = 0
+        self._requests = 0
+        self._expired = 0
+        self._thread = threading.Thread(target=self._run, name="mt5-batcher", daemon=True)
+        self._thread.start()
+
+    @staticmethod
+    def _make_key(prompts, max_input_length, generate_kwargs):
+        # Strings and pre-tokenized ids are encoded differently, so they never share a batch
+        kind = 'text' if not prompts or isinstance(prompts[0], str) else 'ids'
+        deadline = current_deadline()
+        bucket = int(deadline.expires_at // DEADLINE_BUCKET_SECONDS) if deadline is not None else None
+        return (kind, max_input_length, tuple(sorted(generate_kwargs.items())), bucket)
+
+    def submit_many(self, prompts, max_input_length, **generate_kwargs):
+        key = self._make_key(prompts, max_input_length, generate_kwargs)
+        requests = [_PendingRequest(prompt, key) for prompt in prompts]
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("MicroBatcher is closed")
+            self._pending.extend(requests)
+            self._max_queue_depth = max(self._max_queue_depth, len(self._pending))
+            self._cond.notify_all()
+        return [req.future for req in requests]
+
+    def submit(self, prompt, max_input_length, **generate_kwargs):
+        return self.submit_many([prompt], max_input_length, **generate_kwargs)[0]
+
+    def summarize(self, prompt, max_input_length, **generate_kwargs):
+        return self.submit(prompt, max_input_length, **generate_kwargs).result()
+
+    def summarize_many(self, prompts, max_input_length, **generate_kwargs):
+        futures = self.submit_many(prompts, max_input_length, **generate_kwargs)
+        return [future.result() for future in futures]
+
+    def _count_key(self, key):
+        return sum(1 for req in self._pending if req.key == key)
+
+    # Function to block until a batch is ready: either max_batch_size compatible
+    # requests are queued or the oldest one has waited max_wait seconds
+    def _take_batch(self):
+        with self._cond:
+            while not self._pending and not self._closed:
+                self._cond.wait()
+            if not self._pending:
+                return None
+            first = self._pending[0]
+            deadline = first.enqueued_at + self.max_wait
+            while not self._closed and self._count_key(first.key) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch = []
+            remaining_requests = deque()
+            for req in self._pending:
+                if req.key == first.key and len(batch) < self.max_batch_size:
+                    batch.append(req)
+                else:
+                    remaining_requests.append(req)
+            self._pending = remaining_requests
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            if batch is None:
+                return
+            batch = self._drop_expired(batch)
+            if not batch:
+                continue
+            started = time.monotonic()
+            _, max_input_length, generate_kwargs, _ = batch[0].key
+            generate_kwargs = dict(generate_kwargs)
+            deadlines = [req.deadline.remaining() for req in batch if req.deadline is not None]
+            if deadlines:
+                # The batch stops decoding when the last of its requests runs out of time
+                generate_kwargs.setdefault('max_time', max(deadlines))
+            try:
+                outputs, token_counts = generate_with_counts(
+                    self.model, self.tokenizer, [req.prompt for req in batch],
+                    max_input_length, **generate_kwargs
+                )
+            except Exception as e:
+                logger.error(f"Error in batched generate: {e}")
+                for req in batch:
+                    req.future.set_exception(e)
+                outputs = None
+            with self._cond:
+                self._batches += 1
+                self._requests += len(batch)
+                self._batch_sizes[len(batch)] += 1
+                for req in batch:
+                    self._wait_ms.append((started - req.enqueued_at) * 1000.0)
+            if outputs is not None:
+                self._trace_batch(batch, started, time.monotonic() - started, token_counts)
+                for req, output in zip(batch, outputs):
+                    req.future.set_result(output)
+
+    # Function to fail the requests whose deadline passed while they were queued instead of generating for them
+    def _drop_expired(self, batch):
+        live = []
+        for req in batch:
+            if req.deadline is not None and req.deadline.expired():
+                req.future.set_exception(DeadlineExceeded("Deadline exceeded while waiting for the batcher"))
+                with self._cond:
+                    self._expired += 1
+            else:
+                live.append(req)
+        return live
+
+    # Function to add the batch to the traces of the requests in it: each request counts the
+    # generate call once, however many of its chunks the batch held, and its longest queue wait
+    @staticmethod
+    def _trace_batch(batch, started, generate_seconds, token_counts):
+        traces = {}
+        for req, token_count in zip(batch, token_counts):
+            if req.trace is None:
+                continue
+            wait, tokens = traces.get(req.trace, (0.0, 0))
+            traces[req.trace] = (max(wait, started - req.enqueued_at), tokens + token_count)
+        for trace, (wait, tokens) in traces.items():
+            trace.add_span('queue_wait', wait)
+            trace.add_span('generate', generate_seconds)
+            trace.add_count('generated_tokens', tokens)
+
+    def stats(self):
+        with self._cond:
+            waits = list(self._wait_ms)
+            return {
+                "queue_depth": len(self._pending),
+                "max_queue_depth": self._max_queue_depth,
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000.0,
+                "batches": self._batches,
+                "requests": self._requests,
+                "expired": self._expired,
+                "mean_batch_size": (self._requests / self._batches) if self._batches else 0.0,
+                "batch_size_histogram": {str(size): count for size, count in sorted(self._batch_sizes.items())},
+                "queue_wait_ms": wait_percentiles(waits),
+            }
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
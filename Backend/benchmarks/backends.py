@@ -0,0 +1,77 @@
+# Compare inference backends on the bundled dataset: throughput, peak RSS and
+# ROUGE parity against the fp32 torch baseline.
+#
+#   cd Backend && python -m benchmarks.backends --backends torch int8 onnx --limit 20
+import argparse
+import json
+import logging
+import multiprocessing
+import time
+
+from inference import INFERENCE_BACKENDS, load_model, load_tokenizer
+from summarizer import format_paragraph, mt5Summary, summary_nepali
+from benchmarks.common import DATASET, MODEL_ID, load_pairs, mean_rouge, peak_rss_mb
+
+
+# Function to summarize every article with one backend; runs in its own process so RSS is per backend
+def run_backend(backend, articles, mode, onnx_dir):
+    tokenizer = load_tokenizer(MODEL_ID)
+    load_start = time.perf_counter()
+    model = load_model(MODEL_ID, backend, onnx_dir=onnx_dir)
+    load_seconds = time.perf_counter() - load_start
+    summarize_fn = mt5Summary if mode == 'short' else summary_nepali
+    summaries = []
+    generated_tokens = 0
+    start = time.perf_counter()
+    for article in articles:
+        hypothesis = summarize_fn(format_paragraph(article), model, tokenizer)
+        generated_tokens += len(tokenizer(hypothesis).input_ids)
+        summaries.append(hypothesis)
+    seconds = time.perf_counter() - start
+    return {
+        "backend": backend,
+        "load_seconds": load_seconds,
+        "seconds": seconds,
+        "articles_per_sec": len(articles) / seconds if seconds else 0.0,
+        "tokens_per_sec": generated_tokens / seconds if seconds else 0.0,
+        "peak_rss_mb": peak_rss_mb(),
+        "summaries": summaries,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare mT5 inference backends")
+    parser.add_argument('--backends', nargs='+', default=['torch', 'int8'], choices=INFERENCE_BACKENDS)
+    parser.add_argument('--dataset', default=DATASET)
+    parser.add_argument('--limit', type=int, default=20)
+    parser.add_argument('--mode', choices=['short', 'long'], default='short')
+    parser.add_argument('--onnx-dir', default=None)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    pairs = load_pairs(args.dataset, args.limit)
+    articles = [article for article, _ in pairs]
+    gold = [summary for _, summary in pairs]
+    backends = list(args.backends)
+    if 'torch' not in backends:
+        backends.insert(0, 'torch')
+
+    ctx = multiprocessing.get_context('spawn')
+    results = {}
+    for backend in backends:
+        with ctx.Pool(1) as pool:
+            results[backend] = pool.apply(run_backend, (backend, articles, args.mode, args.onnx_dir))
+
+    baseline = results['torch']["summaries"]
+    report = []
+    for backend in backends:
+        result = results[backend]
+        summaries = result.pop("summaries")
+        result["rouge_vs_gold"] = mean_rouge(gold, summaries)
+        result["rouge_vs_fp32"] = mean_rouge(baseline, summaries)
+        report.append(result)
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+# Helpers shared by the benchmark scripts
+import csv
+import os
+import resource
+
+from scoring import corpus_scores, score_batch
+
+MODEL_ID = "Saurav20/mt5_old_train"
+DATASET = os.path.join(os.path.dirname(__file__), '..', '..', 'Dataset', 'merged_data.csv')
+
+
+# Function to stream (article, gold summary) pairs from the dataset
+def iter_pairs(path, limit=None):
+    with open(path, newline='', encoding='utf-8') as f:
+        for count, row in enumerate(csv.DictReader(f)):
+            if limit and count >= limit:
+                break
+            yield row['article'], row['summary']
+
+
+def load_pairs(path, limit=None):
+    return list(iter_pairs(path, limit))
+
+
+def peak_rss_mb():
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def percentile(samples, q):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(q / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+# Function to compute corpus ROUGE over pairs, scored in a process pool
+def mean_rouge(references, hypotheses, processes=None):
+    scores = score_batch(references, hypotheses, processes=processes or os.cpu_count())
+    return {name: values["fmeasure"] for name, values in corpus_scores(scores).items()}
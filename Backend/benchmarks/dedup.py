@@ -0,0 +1,92 @@
+# Insertion and query throughput of the MinHash/LSH near-duplicate index on synthetic
+# articles drawn from the Dataset vocabulary, with recall on edited copies, false
+# positives on unrelated texts, and save/load time of the persisted index.
+#
+#   cd Backend && python -m benchmarks.dedup --docs 1000000 --queries 10000
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.common import DATASET, load_pairs, peak_rss_mb
+from dedup import MinHashIndex
+from scoring import TOKEN_PATTERN
+
+
+def synthetic_docs(vocabulary, count, length, seed):
+    rng = random.Random(seed)
+    for _ in range(count):
+        yield ' '.join(rng.choices(vocabulary, k=length))
+
+
+# Function to change one word in every edit_every words, keeping the text near-identical
+def edit(text, edit_every, vocabulary, rng):
+    words = text.split()
+    for position in range(rng.randrange(edit_every), len(words), edit_every):
+        words[position] = rng.choice(vocabulary)
+    return ' '.join(words)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the near-duplicate index")
+    parser.add_argument('--docs', type=int, default=1000000)
+    parser.add_argument('--queries', type=int, default=10000)
+    parser.add_argument('--length', type=int, default=300, help="Words per synthetic article")
+    parser.add_argument('--edit-every', type=int, default=100, help="Edited copies change one word in this many")
+    parser.add_argument('--num-perm', type=int, default=64)
+    parser.add_argument('--threshold', type=float, default=0.9)
+    args = parser.parse_args()
+
+    vocabulary = sorted({token for article, _ in load_pairs(DATASET) for token in TOKEN_PATTERN.findall(article)})
+    index = MinHashIndex(num_perm=args.num_perm, threshold=args.threshold)
+    samples = []
+    sample_every = max(1, args.docs // args.queries)
+    # Only add() is timed; generating the synthetic text is not part of the index cost
+    insert_seconds = 0.0
+    for doc_id, text in enumerate(synthetic_docs(vocabulary, args.docs, args.length, seed=1)):
+        start = time.perf_counter()
+        index.add(doc_id, text)
+        insert_seconds += time.perf_counter() - start
+        if doc_id % sample_every == 0 and len(samples) < args.queries:
+            samples.append((doc_id, text))
+
+    rng = random.Random(2)
+    edited = [(doc_id, edit(text, args.edit_every, vocabulary, rng)) for doc_id, text in samples]
+    start = time.perf_counter()
+    found = sum(1 for doc_id, text in edited if any(key == doc_id for key, _ in index.query(text)))
+    duplicate_query_seconds = time.perf_counter() - start
+    unrelated = list(synthetic_docs(vocabulary, len(samples), args.length, seed=3))
+    start = time.perf_counter()
+    false_positives = sum(1 for text in unrelated if index.query(text))
+    unrelated_query_seconds = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'index.npz')
+        start = time.perf_counter()
+        index.save(path)
+        save_seconds = time.perf_counter() - start
+        size_mb = os.path.getsize(path) / (1024.0 * 1024.0)
+        start = time.perf_counter()
+        MinHashIndex.load(path)
+        load_seconds = time.perf_counter() - start
+
+    print(json.dumps({
+        "index": index.stats(),
+        "inserts_per_sec": args.docs / insert_seconds,
+        "queries_per_sec": {
+            "edited_copies": len(edited) / duplicate_query_seconds,
+            "unrelated": len(unrelated) / unrelated_query_seconds,
+        },
+        "recall_edited_copies": found / len(edited),
+        "false_positive_rate": false_positives / len(unrelated),
+        "save_seconds": save_seconds,
+        "load_seconds": load_seconds,
+        "index_file_mb": size_mb,
+        "peak_rss_mb": peak_rss_mb(),
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+# Offline evaluation of the serving pipeline over Dataset/merged_data.csv.
+# Streams article/summary pairs through format_paragraph, the chunker and mT5
+# generation and reports per-stage latency percentiles, tokens/sec, peak RSS
+# and corpus ROUGE against the gold summaries for every combination of
+# backend, batch size and decoding setting.
+#
+#   cd Backend && python -m benchmarks.evaluate --backends torch int8 --batch-sizes 1 8 \
+#       --num-beams 1 4 --mode long --limit 50 --output eval.json
+import argparse
+import itertools
+import json
+import logging
+import multiprocessing
+import time
+from collections import defaultdict
+
+from batching import generate_batch
+from inference import INFERENCE_BACKENDS, load_model, load_tokenizer
+from chunking import chunk_token_ids, prompt_token_ids
+from summarizer import LONG_GENERATE_KWARGS, SHORT_GENERATE_KWARGS, format_paragraph
+from benchmarks.common import DATASET, MODEL_ID, iter_pairs, mean_rouge, peak_rss_mb, percentile
+
+
+class StageTimer:
+    def __init__(self):
+        self.samples = defaultdict(list)
+
+    def add(self, stage, seconds):
+        self.samples[stage].append(seconds * 1000.0)
+
+    def report(self):
+        return {
+            stage: {
+                "count": len(samples),
+                "mean_ms": sum(samples) / len(samples),
+                "p50_ms": percentile(samples, 50),
+                "p90_ms": percentile(samples, 90),
+                "p99_ms": percentile(samples, 99),
+            }
+            for stage, samples in self.samples.items()
+        }
+
+
+# Function to turn a formatted article into the prompts the serving path would generate for it
+def article_prompts(formatted_text, mode, tokenizer, token_budget, max_length):
+    if mode == 'short':
+        return [prompt_token_ids(formatted_text, tokenizer, max_length)]
+    return chunk_token_ids(formatted_text, tokenizer, token_budget)
+
+
+# Function to run one configuration: prompts from several articles are generated in
+# shared batches of batch_size, exactly like the batcher does in the server
+def run_config(model, tokenizer, dataset, limit, mode, batch_size, num_beams, max_length, token_budget):
+    base_kwargs = SHORT_GENERATE_KWARGS if mode == 'short' else LONG_GENERATE_KWARGS
+    generate_kwargs = dict(base_kwargs, num_beams=num_beams, max_length=max_length)
+    max_input_length = max_length if mode == 'short' else token_budget
+    timer = StageTimer()
+    gold = []
+    chunk_counts = []
+    queue = []  # (article index, prompt) waiting for a batch
+    outputs = defaultdict(list)
+    generated_tokens = 0
+    article_count = 0
+
+    def flush():
+        nonlocal generated_tokens
+        start = time.perf_counter()
+        summaries = generate_batch(model, tokenizer, [prompt for _, prompt in queue], max_input_length, **generate_kwargs)
+        timer.add('generate_batch', time.perf_counter() - start)
+        for (index, _), text in zip(queue, summaries):
+            outputs[index].append(text)
+            generated_tokens += len(tokenizer(text).input_ids)
+        queue.clear()
+
+    run_start = time.perf_counter()
+    for index, (article, summary) in enumerate(iter_pairs(dataset, limit)):
+        start = time.perf_counter()
+        formatted_text = format_paragraph(article)
+        timer.add('format', time.perf_counter() - start)
+        start = time.perf_counter()
+        prompts = article_prompts(formatted_text, mode, tokenizer, token_budget, max_length)
+        timer.add('chunk', time.perf_counter() - start)
+        chunk_counts.append(len(prompts))
+        gold.append(summary)
+        outputs[index] = []
+        for prompt in prompts:
+            queue.append((index, prompt))
+            if len(queue) >= batch_size:
+                flush()
+        article_count += 1
+    if queue:
+        flush()
+    seconds = time.perf_counter() - run_start
+
+    hypotheses = [' '.join(outputs[index]) for index in range(article_count)]
+    start = time.perf_counter()
+    rouge = mean_rouge(gold, hypotheses)
+    timer.add('rouge_corpus', time.perf_counter() - start)
+    return {
+        "articles": article_count,
+        "seconds": seconds,
+        "articles_per_sec": article_count / seconds if seconds else 0.0,
+        "tokens_per_sec": generated_tokens / seconds if seconds else 0.0,
+        "generated_tokens": generated_tokens,
+        "chunks_per_article": {
+            "mean": sum(chunk_counts) / len(chunk_counts) if chunk_counts else 0.0,
+            "max": max(chunk_counts, default=0),
+        },
+        "stages": timer.report(),
+        "rouge": rouge,
+    }
+
+
+# Function to evaluate every batch size / decoding combination for one backend in its own process
+def run_backend(backend, args):
+    logging.basicConfig(level=logging.WARNING)
+    start = time.perf_counter()
+    tokenizer = load_tokenizer(MODEL_ID)
+    model = load_model(MODEL_ID, backend, onnx_dir=args.onnx_dir)
+    load_seconds = time.perf_counter() - start
+    results = []
+    for batch_size, num_beams in itertools.product(args.batch_sizes, args.num_beams):
+        metrics = run_config(
+            model, tokenizer, args.dataset, args.limit, args.mode, batch_size, num_beams, args.max_length, args.token_budget
+        )
+        results.append(dict(
+            config={"backend": backend, "mode": args.mode, "batch_size": batch_size, "num_beams": num_beams,
+                    "max_length": args.max_length, "token_budget": args.token_budget},
+            load_seconds=load_seconds,
+            peak_rss_mb=peak_rss_mb(),
+            **metrics
+        ))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline evaluation of the summarization pipeline")
+    parser.add_argument('--dataset', default=DATASET)
+    parser.add_argument('--limit', type=int, default=None)
+    parser.add_argument('--mode', choices=['short', 'long'], default='long')
+    parser.add_argument('--backends', nargs='+', default=['torch'], choices=INFERENCE_BACKENDS)
+    parser.add_argument('--batch-sizes', nargs='+', type=int, default=[1])
+    parser.add_argument('--num-beams', nargs='+', type=int, default=[4])
+    parser.add_argument('--max-length', type=int, default=512)
+    parser.add_argument('--token-budget', type=int, default=512, help="Input tokens per long-mode chunk")
+    parser.add_argument('--onnx-dir', default=None)
+    parser.add_argument('--output', default=None, help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context('spawn')
+    report = []
+    for backend in args.backends:
+        with ctx.Pool(1) as pool:
+            report.extend(pool.apply(run_backend, (backend, args)))
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
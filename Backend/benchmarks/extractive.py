@@ -0,0 +1,63 @@
+# Latency and ROUGE of the extractive summarizer against a lead-sentences baseline
+# on Dataset/merged_data.csv. No model is loaded.
+#
+#   cd Backend && python -m benchmarks.extractive --words 60 120
+import argparse
+import json
+import time
+
+from benchmarks.common import DATASET, load_pairs, mean_rouge, percentile
+from chunking import split_sentences
+from extractive import get_extractive_summarizer
+from summarizer import format_paragraph
+
+
+# Function to take the first sentences that fit in max_words
+def lead_sentences(text, max_words):
+    kept = []
+    used = 0
+    for sentence in split_sentences(text):
+        words = len(sentence.split())
+        if kept and used + words > max_words:
+            break
+        kept.append(sentence)
+        used += words
+    return ' '.join(kept)
+
+
+def run(fn, articles, references):
+    latencies = []
+    hypotheses = []
+    for article in articles:
+        start = time.perf_counter()
+        hypotheses.append(fn(article))
+        latencies.append((time.perf_counter() - start) * 1000.0)
+    return {
+        "latency_ms": {"p50": percentile(latencies, 50), "p99": percentile(latencies, 99)},
+        "rouge": mean_rouge(references, hypotheses),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the extractive summarizer")
+    parser.add_argument('--dataset', default=DATASET)
+    parser.add_argument('--limit', type=int, default=None)
+    parser.add_argument('--words', type=int, nargs='+', default=[60, 120])
+    args = parser.parse_args()
+
+    pairs = load_pairs(args.dataset, args.limit)
+    articles = [format_paragraph(article) for article, _ in pairs]
+    references = [reference for _, reference in pairs]
+    summarizer = get_extractive_summarizer()
+    report = []
+    for words in args.words:
+        report.append({
+            "max_words": words,
+            "textrank": run(lambda text: summarizer.extract(text, words), articles, references),
+            "lead": run(lambda text: lead_sentences(text, words), articles, references),
+        })
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
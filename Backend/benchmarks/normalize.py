@@ -0,0 +1,66 @@
+# Throughput of the text normalizer against the old regex-per-call format_paragraph.
+#
+#   cd Backend && python -m benchmarks.normalize --repeat 5
+import argparse
+import csv
+import json
+import os
+import re
+import time
+
+from normalize import NepaliNormalizer
+
+DATASETS = [
+    os.path.join(os.path.dirname(__file__), '..', '..', 'Dataset', 'ok-political.csv'),
+    os.path.join(os.path.dirname(__file__), '..', '..', 'Dataset', 'merged_data.csv'),
+]
+
+
+# format_paragraph as it was before normalize.py, kept for comparison
+def legacy_format_paragraph(text):
+    pattern = r'[a-zA-Z0-9!#@_$%^&*]'
+    text_without_chars = re.sub(pattern, '', text)
+    lines = [line.strip() for line in text_without_chars.splitlines() if line.strip()]
+    return ' '.join(lines)
+
+
+def load_articles(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        column = 'Article' if 'Article' in reader.fieldnames else 'article'
+        return [row[column] for row in reader if row[column]]
+
+
+def throughput(fn, articles, repeat):
+    size_mb = sum(len(article.encode('utf-8')) for article in articles) / (1024.0 * 1024.0)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for article in articles:
+            fn(article)
+    seconds = time.perf_counter() - start
+    return {"mb_per_sec": size_mb * repeat / seconds, "articles_per_sec": len(articles) * repeat / seconds}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Nepali text normalization")
+    parser.add_argument('--datasets', nargs='+', default=DATASETS)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    normalizer = NepaliNormalizer()
+    report = []
+    for path in args.datasets:
+        articles = load_articles(path)
+        report.append({
+            "dataset": os.path.basename(path),
+            "articles": len(articles),
+            "legacy_format_paragraph": throughput(legacy_format_paragraph, articles, args.repeat),
+            "normalizer": throughput(normalizer.normalize, articles, args.repeat),
+            # What the chunker sees: the sentence offsets come with the normalized text
+            "normalizer_with_sentences": throughput(lambda text: normalizer.normalize(text).sentence_spans, articles, args.repeat),
+        })
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
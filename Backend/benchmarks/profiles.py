@@ -0,0 +1,71 @@
+# Per-article latency and corpus ROUGE of each decoding profile over Dataset/merged_data.csv,
+# using the same summary functions as the server (without the batcher).
+#
+#   cd Backend && python -m benchmarks.profiles --profiles fast balanced quality --mode long --limit 20
+#   cd Backend && python -m benchmarks.profiles --profiles fast assisted --draft-model google/mt5-small
+import argparse
+import json
+import logging
+import time
+
+from batching import set_draft_model
+from inference import INFERENCE_BACKENDS, load_model, load_tokenizer
+from summarizer import GENERATION_PROFILES, format_paragraph, mt5Summary, summary_nepali
+from benchmarks.common import DATASET, MODEL_ID, load_pairs, mean_rouge, peak_rss_mb, percentile
+
+
+def run_profile(model, tokenizer, pairs, mode, profile, token_budget):
+    latencies = []
+    hypotheses = []
+    for article, _ in pairs:
+        formatted_text = format_paragraph(article)
+        start = time.perf_counter()
+        if mode == 'short':
+            hypotheses.append(mt5Summary(formatted_text, model, tokenizer, profile=profile))
+        else:
+            hypotheses.append(summary_nepali(formatted_text, model, tokenizer, token_budget=token_budget, profile=profile))
+        latencies.append(time.perf_counter() - start)
+    seconds = sum(latencies)
+    return {
+        "articles": len(pairs),
+        "articles_per_sec": len(pairs) / seconds if seconds else 0.0,
+        "latency_ms": {
+            "p50": percentile(latencies, 50) * 1000.0,
+            "p90": percentile(latencies, 90) * 1000.0,
+            "p99": percentile(latencies, 99) * 1000.0,
+        },
+        "rouge": mean_rouge([reference for _, reference in pairs], hypotheses),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the decoding profiles")
+    parser.add_argument('--dataset', default=DATASET)
+    parser.add_argument('--limit', type=int, default=20)
+    parser.add_argument('--mode', choices=['short', 'long'], default='long')
+    parser.add_argument('--profiles', nargs='+', default=['fast', 'balanced', 'quality'], choices=list(GENERATION_PROFILES))
+    parser.add_argument('--backend', default='torch', choices=INFERENCE_BACKENDS)
+    parser.add_argument('--draft-model', default=None, help="Draft model id for the assisted profile")
+    parser.add_argument('--token-budget', type=int, default=512)
+    args = parser.parse_args()
+    if 'assisted' in args.profiles and not args.draft_model:
+        parser.error("the assisted profile needs --draft-model")
+
+    logging.basicConfig(level=logging.WARNING)
+    tokenizer = load_tokenizer(MODEL_ID)
+    model = load_model(MODEL_ID, args.backend)
+    if args.draft_model:
+        set_draft_model(load_model(args.draft_model, 'torch'))
+    pairs = load_pairs(args.dataset, args.limit)
+    report = []
+    for profile in args.profiles:
+        report.append(dict(
+            config={"profile": profile, "mode": args.mode, "backend": args.backend, "draft_model": args.draft_model},
+            peak_rss_mb=peak_rss_mb(),
+            **run_profile(model, tokenizer, pairs, args.mode, profile, args.token_budget)
+        ))
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# Parse time per page for every registered portal scraper over saved HTML
+# fixtures, comparing the lxml fast path with the old full BeautifulSoup tree.
+#
+#   cd Backend && python -m benchmarks.scrapers --repeat 200
+import argparse
+import json
+import os
+import time
+
+from bs4 import BeautifulSoup
+
+from Scrapper import SCRAPERS_BY_PORTAL
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+# The div class each scraper looked up with BeautifulSoup before the registry
+LEGACY_SELECTORS = {
+    'onlinekhabar': 'ok18-single-post-content-wrap',
+    'ekantipur': 'description current-news-block',
+    'nayapatrikadaily': 'col-md-9',
+    'ratopati': 'the-content',
+    'setopati': 'editor-box',
+    'gorkhapatra': 'blog-details',
+}
+
+
+# Serves fixture bytes in place of the network
+class FixtureFetcher:
+    def __init__(self, content):
+        self.content = content
+
+    def get_content(self, url, params=None, timeout=None):
+        return self.content
+
+
+def legacy_parse(content, class_name):
+    soup = BeautifulSoup(content, 'lxml')
+    news = soup.find('div', class_=class_name)
+    if not news:
+        return ''
+    return ' '.join(p.text.strip() for p in news.find_all('p') if p.text.strip())
+
+
+def time_per_page(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat * 1000.0, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark portal HTML extraction")
+    parser.add_argument('--fixtures', default=FIXTURES)
+    parser.add_argument('--repeat', type=int, default=100)
+    args = parser.parse_args()
+
+    report = []
+    for portal, scraper_class in sorted(SCRAPERS_BY_PORTAL.items()):
+        path = os.path.join(args.fixtures, f'{portal}.html')
+        if not os.path.exists(path):
+            continue
+        with open(path, 'rb') as f:
+            content = f.read()
+        scraper = scraper_class(f'https://{scraper_class.domain}/news', fetcher=FixtureFetcher(content))
+        fast_ms, fast_text = time_per_page(scraper.get_news, args.repeat)
+        legacy_ms, legacy_text = time_per_page(lambda: legacy_parse(content, LEGACY_SELECTORS[portal]), args.repeat)
+        report.append({
+            "portal": portal,
+            "page_kb": len(content) / 1024.0,
+            "lxml_ms_per_page": fast_ms,
+            "bs4_ms_per_page": legacy_ms,
+            "speedup": legacy_ms / fast_ms if fast_ms else None,
+            "same_text": fast_text == legacy_text,
+        })
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+# Load comparison of the gunicorn setup from docker-compose.yml with the ASGI entry point.
+# Each server is started in turn with the same environment. Two groups of clients then post to
+# '/' for --duration seconds: "url" clients send portal URLs that a local proxy answers after
+# --portal-delay seconds, and "text" clients send article text directly. Every response is unique,
+# so nothing is served from the summary cache. REFERENCE_CLIENT=stub with --reference-delay
+# stands in for Gemini. The report gives throughput and latency percentiles per group, so it
+# shows how much slow fetches hold up requests that need no network, and error_statuses counts
+# the requests shed by admission control (429/503) or cut off by their --deadline (504).
+#
+#   cd Backend && python -m benchmarks.serving --servers gunicorn asgi --length short --duration 60
+#   (--length extractive needs no model and isolates the I/O effect)
+import argparse
+import asyncio
+import html
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import aiohttp
+
+from benchmarks.common import DATASET, load_pairs, percentile
+
+BACKEND_DIR = os.path.join(os.path.dirname(__file__), '..')
+
+# The docker-compose.yml command, with the bind address filled in
+SERVER_COMMANDS = {
+    'gunicorn': lambda bind: ["gunicorn", "--bind", bind, "--timeout", "120", "--threads", "8", "--preload", "app:app"],
+    'asgi': lambda bind: [sys.executable, "-m", "uvicorn", "asgi:app", "--host", bind.split(':')[0],
+                          "--port", bind.split(':')[1]],
+}
+
+
+# Function to build a unique page with the onlinekhabar content markup around a dataset article
+def portal_page(article, number):
+    paragraphs = ''.join(f"<p>{html.escape(line)}</p>" for line in article.split('।') if line.strip())
+    return (f"<html><body><div class='ok18-single-post-content-wrap'><p>लेख {number} ।</p>{paragraphs}"
+            f"</div></body></html>").encode('utf-8')
+
+
+# HTTP proxy standing in for the portals: every GET is answered after delay seconds
+def start_portal_proxy(articles, delay):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(delay)
+            number = sum(map(ord, self.path))
+            body = portal_page(articles[number % len(articles)], self.path.rsplit('/', 1)[-1])
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+# Function to wait until the server answers /readyz (or /healthz when the model is not needed)
+def wait_ready(base_url, path, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(base_url + path, timeout=2) as response:
+                if response.status == 200:
+                    return
+        except OSError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"{base_url} did not become ready in {timeout}s")
+
+
+async def client_loop(session, base_url, make_body, deadline, samples, errors):
+    while time.monotonic() < deadline:
+        body = make_body()
+        start = time.perf_counter()
+        try:
+            async with session.post(base_url + '/', json=body) as response:
+                await response.read()
+                status = response.status
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            status = 'connection'
+        if status == 200:
+            samples.append((time.perf_counter() - start) * 1000.0)
+        else:
+            errors.append(status)
+            if status in (429, 503):
+                # Shed by admission control: back off as a well-behaved client would
+                await asyncio.sleep(1.0)
+
+
+async def run_load(base_url, args, articles):
+    counter = iter(range(10 ** 9))
+    deadline = time.monotonic() + args.duration
+    settings = {'selectedLength': args.length, 'reference': args.reference}
+    if args.deadline:
+        settings['deadline'] = args.deadline
+    groups = {
+        'url': (args.url_clients, lambda: dict(settings, url=f"http://onlinekhabar.com/news/{next(counter)}")),
+        'text': (args.text_clients, lambda: dict(settings, text=f"लेख {next(counter)} । " + random.choice(articles))),
+    }
+    results = {name: ([], []) for name in groups}
+    timeout = aiohttp.ClientTimeout(total=300)
+    connector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+        await asyncio.gather(*(
+            client_loop(session, base_url, make_body, deadline, *results[name])
+            for name, (clients, make_body) in groups.items()
+            for _ in range(clients)
+        ))
+    return {
+        name: {
+            "clients": groups[name][0],
+            "completed": len(samples),
+            "errors": len(errors),
+            "error_statuses": {str(status): errors.count(status) for status in sorted(set(errors), key=str)},
+            "requests_per_sec": len(samples) / args.duration,
+            "p50_ms": percentile(samples, 50),
+            "p90_ms": percentile(samples, 90),
+            "p99_ms": percentile(samples, 99),
+        }
+        for name, (samples, errors) in results.items()
+    }
+
+
+def run_server(name, args, articles, proxy_url):
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    env = dict(
+        os.environ,
+        API_KEY=os.environ.get('API_KEY', 'benchmark'),
+        REFERENCE_CLIENT='stub',
+        REFERENCE_STUB_DELAY=str(args.reference_delay),
+        HTTP_PROXY=proxy_url,
+        NO_PROXY='127.0.0.1,localhost',
+        # Room for every url client at once, so the per-host limit does not hide the server's own limits
+        SCRAPER_PER_HOST_LIMIT=str(max(4, args.url_clients)),
+        DEDUP_ENABLED='0',
+        MODEL_LOAD_MODE='eager' if args.length != 'extractive' else 'lazy'
+    )
+    process = subprocess.Popen(
+        SERVER_COMMANDS[name](f"127.0.0.1:{port}"), cwd=BACKEND_DIR, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        wait_ready(base_url, '/healthz' if args.length == 'extractive' else '/readyz', args.start_timeout)
+        return asyncio.run(run_load(base_url, args, articles))
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare gunicorn and ASGI serving under mixed load")
+    parser.add_argument('--servers', nargs='+', choices=sorted(SERVER_COMMANDS), default=['gunicorn', 'asgi'])
+    parser.add_argument('--length', choices=['short', 'long', 'extractive'], default='short')
+    parser.add_argument('--reference', choices=['sync', 'async', 'none'], default='sync')
+    parser.add_argument('--duration', type=float, default=60)
+    parser.add_argument('--url-clients', type=int, default=16)
+    parser.add_argument('--text-clients', type=int, default=4)
+    parser.add_argument('--portal-delay', type=float, default=2.0, help="Seconds the fake portal takes per page")
+    parser.add_argument('--reference-delay', type=float, default=1.0, help="Seconds the stub reference takes")
+    parser.add_argument('--deadline', type=float, default=None, help="Seconds sent as each request's deadline")
+    parser.add_argument('--start-timeout', type=float, default=300)
+    args = parser.parse_args()
+
+    articles = [article for article, _ in load_pairs(DATASET)]
+    proxy = start_portal_proxy(articles, args.portal_delay)
+    proxy_url = f"http://127.0.0.1:{proxy.server_address[1]}"
+    report = {"settings": vars(args)}
+    for name in args.servers:
+        report[name] = run_server(name, args, articles, proxy_url)
+    proxy.shutdown()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
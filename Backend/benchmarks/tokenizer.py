@@ -0,0 +1,117 @@
+# Parity and speed of the fast tokenizer against the slow SentencePiece one on the bundled
+# datasets. Every sentence must get identical ids from both, the short-mode prompt built from
+# cached sentence ids must equal tokenizing "summarize: " + text in one piece, and decoding (as
+# the batcher does it) must agree on the chunk ids; the script exits with status 1 otherwise.
+# Per-article time is reported for the slow tokenizer, the fast one and a token-cache hit.
+#
+#   cd Backend && python -m benchmarks.tokenizer --limit 500
+import argparse
+import csv
+import json
+import logging
+import sys
+import time
+
+from batching import decode_summaries
+from chunking import TokenCache, chunk_token_ids, prompt_token_ids, split_sentences
+from inference import load_tokenizer
+from summarizer import format_paragraph
+from benchmarks.common import MODEL_ID, percentile
+from benchmarks.normalize import DATASETS
+
+
+def load_articles(path, limit=None):
+    with open(path, newline='', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        column = 'Article' if 'Article' in reader.fieldnames else 'article'
+        articles = [row[column] for row in reader if row[column]]
+    return articles[:limit] if limit else articles
+
+
+def latency(samples):
+    return {
+        "mean_ms": sum(samples) / len(samples),
+        "p50_ms": percentile(samples, 50),
+        "p90_ms": percentile(samples, 90),
+        "p99_ms": percentile(samples, 99),
+    }
+
+
+# Function to time tokenizing each article's sentences in one call, in milliseconds per article
+def time_articles(encode, texts):
+    samples = []
+    for text in texts:
+        start = time.perf_counter()
+        encode(text)
+        samples.append((time.perf_counter() - start) * 1000.0)
+    return latency(samples)
+
+
+def check_dataset(path, slow, fast, limit, max_length, token_budget):
+    texts = [format_paragraph(article) for article in load_articles(path, limit)]
+    sentence_mismatches = []
+    prompt_mismatches = 0
+    decode_mismatches = 0
+    sentences_checked = 0
+    for index, text in enumerate(texts):
+        sentences = split_sentences(text)
+        if sentences:
+            slow_ids = slow(sentences, add_special_tokens=False).input_ids
+            fast_ids = fast(sentences, add_special_tokens=False).input_ids
+            sentences_checked += len(sentences)
+            for sentence, expected, got in zip(sentences, slow_ids, fast_ids):
+                if expected != got:
+                    sentence_mismatches.append({"article": index, "sentence": sentence[:80]})
+        expected_prompt = slow("summarize: " + str(text), max_length=max_length, truncation=True).input_ids
+        if prompt_token_ids(text, fast, max_length) != expected_prompt:
+            prompt_mismatches += 1
+        chunk_ids = chunk_token_ids(text, fast, token_budget)
+        if decode_summaries(slow, chunk_ids) != decode_summaries(fast, chunk_ids):
+            decode_mismatches += 1
+
+    # Warm both tokenizers up so the first article does not pay for lazy initialization
+    slow(texts[:1], add_special_tokens=False)
+    fast(texts[:1], add_special_tokens=False)
+    slow_cache = TokenCache(slow, max_entries=len(texts) + 1)
+    fast_cache = TokenCache(fast, max_entries=len(texts) + 1)
+    slow_ms = time_articles(slow_cache.sentence_ids, texts)
+    fast_ms = time_articles(fast_cache.sentence_ids, texts)
+    cached_ms = time_articles(fast_cache.sentence_ids, texts)
+    return {
+        "articles": len(texts),
+        "sentences": sentences_checked,
+        "sentence_mismatches": len(sentence_mismatches),
+        "sentence_mismatch_examples": sentence_mismatches[:5],
+        "short_prompt_mismatches": prompt_mismatches,
+        "decode_mismatches": decode_mismatches,
+        "per_article": {"slow": slow_ms, "fast": fast_ms, "cached": cached_ms},
+        "speedup_fast_vs_slow": slow_ms["mean_ms"] / fast_ms["mean_ms"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check and time the fast mT5 tokenizer")
+    parser.add_argument('--model', default=MODEL_ID)
+    parser.add_argument('--datasets', nargs='+', default=DATASETS)
+    parser.add_argument('--limit', type=int, default=None, help="Articles per dataset")
+    parser.add_argument('--max-length', type=int, default=512, help="Short-mode prompt length")
+    parser.add_argument('--token-budget', type=int, default=512)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    slow = load_tokenizer(args.model, fast=False)
+    fast = load_tokenizer(args.model, fast=True)
+    if not fast.is_fast:
+        sys.exit("The fast tokenizer could not be loaded")
+    report = {
+        path: check_dataset(path, slow, fast, args.limit, args.max_length, args.token_budget)
+        for path in args.datasets
+    }
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    if any(result["sentence_mismatches"] or result["short_prompt_mismatches"] or result["decode_mismatches"]
+           for result in report.values()):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Writes between two sweeps of expired rows out of the sqlite tier
+PURGE_EVERY_WRITES = 256
+
+
+# Function to normalize text before hashing so whitespace/Unicode variants share a key
+def normalize_for_key(text):
+    return ' '.join(unicodedata.normalize('NFC', text).split())
+
+
+# Function to build a content-addressed key from the text and everything that affects the output
+def make_cache_key(formatted_text, selected_length, model_id, generation_params):
+    text_hash = hashlib.sha256(normalize_for_key(formatted_text).encode('utf-8')).hexdigest()
+    params = json.dumps(generation_params, sort_keys=True, default=str)
+    meta = f"{selected_length}|{model_id}|{params}"
+    return f"{text_hash}:{hashlib.sha256(meta.encode('utf-8')).hexdigest()[:16]}"
+
+
+# Optional persistent tier shared by all gunicorn workers on the same host
+class SqliteTier:
+    def __init__(self, path):
+        self.path = path
+        self._connect()
+        # A sqlite connection must not be shared with a forked worker (gunicorn --preload)
+        os.register_at_fork(after_in_child=self._connect)
+
+    def _connect(self):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS summaries (key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+
+    def get(self, key, ttl):
+        with self._lock:
+            row = self._conn.execute("SELECT value, created_at FROM summaries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None, None
+        value, created_at = row
+        if ttl is not None and time.time() - created_at > ttl:
+            self.delete(key)
+            return None, None
+        return json.loads(value), created_at
+
+    def set(self, key, value, created_at):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO summaries (key, value, created_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), created_at)
+            )
+
+    def delete(self, key):
+        with self._lock:
+            self._conn.execute("DELETE FROM summaries WHERE key = ?", (key,))
+
+    # Function to delete the rows older than ttl seconds; returns how many were deleted
+    def purge_expired(self, ttl):
+        with self._lock:
+            return self._conn.execute("DELETE FROM summaries WHERE created_at < ?", (time.time() - ttl,)).rowcount
+
+
+# Bounded in-memory LRU with a TTL, optionally backed by a SqliteTier
+class SummaryCache:
+    def __init__(self, max_entries=1024, ttl_seconds=24 * 3600, disk_path=None):
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.disk = SqliteTier(disk_path) if disk_path else None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._writes_since_purge = 0
+
+    def _expired(self, created_at):
+        return self.ttl is not None and time.time() - created_at > self.ttl
+
+    def get(self, key):
+        return self._lookup(key, count=True)
+
+    # Function to look a key up like get() without counting a hit or a miss; a lookup that tries
+    # several keys peeks at each and counts its outcome once with record()
+    def peek(self, key):
+        return self._lookup(key, count=False)
+
+    def record(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def _lookup(self, key, count):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, created_at = entry
+                if not self._expired(created_at):
+                    self._entries.move_to_end(key)
+                    self.hits += count
+                    return value
+                del self._entries[key]
+        if self.disk is not None:
+            try:
+                value, created_at = self.disk.get(key, self.ttl)
+            except sqlite3.Error as e:
+                logger.error(f"Error reading summary cache: {e}")
+                value = None
+            if value is not None:
+                with self._lock:
+                    self._store(key, value, created_at)
+                    self.hits += count
+                    self.disk_hits += count
+                return value
+        with self._lock:
+            self.misses += count
+        return None
+
+    def _store(self, key, value, created_at):
+        self._entries[key] = (value, created_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def set(self, key, value):
+        created_at = time.time()
+        with self._lock:
+            self._store(key, value, created_at)
+        if self.disk is not None:
+            try:
+                self.disk.set(key, value, created_at)
+                self._purge_disk()
+            except sqlite3.Error as e:
+                logger.error(f"Error writing summary cache: {e}")
+
+    # Function to sweep expired rows out of the sqlite tier every PURGE_EVERY_WRITES writes, so the
+    # file does not keep rows that are only skipped on read
+    def _purge_disk(self):
+        with self._lock:
+            self._writes_since_purge += 1
+            if self.ttl is None or self._writes_since_purge < PURGE_EVERY_WRITES:
+                return
+            self._writes_since_purge = 0
+        purged = self.disk.purge_expired(self.ttl)
+        if purged:
+            logger.info(f"Purged {purged} expired summaries from {self.disk.path}")
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "persistent": self.disk is not None,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": (self.hits / lookups) if lookups else 0.0,
+            }
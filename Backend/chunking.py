@@ -0,0 +1,176 @@
+import bisect
+import hashlib
+import threading
+from collections import OrderedDict
+
+from normalize import NormalizedText, get_default_normalizer
+from tracing import CHUNKS, record_count, span
+
+PROMPT_PREFIX = "summarize:"
+
+# Default number of input tokens per chunk, including the prompt prefix and </s>
+DEFAULT_TOKEN_BUDGET = 512
+
+# Number of texts whose token ids are kept per tokenizer
+DEFAULT_TOKEN_CACHE_SIZE = 1024
+
+
+# Function to split already formatted text at danda/sentence boundaries
+def split_sentences(text):
+    return as_normalized(text).sentences
+
+
+def as_normalized(text):
+    if isinstance(text, NormalizedText):
+        return text
+    return NormalizedText(text, get_default_normalizer().sentence_end)
+
+
+# LRU cache of token ids keyed by a hash of the (already formatted) text. The chunker, the
+# short-mode prompt and the hierarchical length checks all read the per-sentence ids of a text
+# from here, so an article is tokenized once however many of them look at it. Ids are tuples
+# without special tokens shared between callers, so they must not be modified.
+class TokenCache:
+    def __init__(self, tokenizer, max_entries=DEFAULT_TOKEN_CACHE_SIZE):
+        self.tokenizer = tokenizer
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.prefix_ids = tuple(tokenizer(PROMPT_PREFIX, add_special_tokens=False).input_ids)
+
+    @staticmethod
+    def _key(text):
+        return hashlib.blake2b(str(text).encode('utf-8'), digest_size=16).digest()
+
+    def _get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def _set(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    # Function to get the ids of every sentence of a formatted text, tokenized in one batch call
+    def sentence_ids(self, text):
+        key = self._key(text)
+        sentence_ids = self._get(key)
+        if sentence_ids is None:
+            text = as_normalized(text)
+            with span('tokenize'):
+                if not text.sentence_spans:
+                    encoded = []
+                elif self.tokenizer.is_fast:
+                    encoded = self._encode_by_offsets(text)
+                else:
+                    # The slow tokenizer has no offsets, so its sentences are encoded one by one
+                    encoded = self.tokenizer(text.sentences, add_special_tokens=False).input_ids
+            sentence_ids = tuple(tuple(ids) for ids in encoded)
+            self._set(key, sentence_ids)
+        return sentence_ids
+
+    # Function to encode the whole text once and give each token to the sentence its offset falls
+    # in, so the sentences' ids join up to exactly the ids of the text. Encoding sentences one by one
+    # adds a '▁' wherever two of them meet without a space.
+    def _encode_by_offsets(self, text):
+        encoding = self.tokenizer(str(text), add_special_tokens=False, return_offsets_mapping=True)
+        starts = [start for start, _ in text.sentence_spans]
+        encoded = [[] for _ in starts]
+        for token, (start, _) in zip(encoding.input_ids, encoding.offset_mapping):
+            encoded[max(0, bisect.bisect_right(starts, start) - 1)].append(token)
+        return encoded
+
+    # Function to count the tokens of a formatted text, without the prefix and special tokens
+    def count(self, text):
+        return sum(len(ids) for ids in self.sentence_ids(text))
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": (self.hits / lookups) if lookups else 0.0,
+                "fast_tokenizer": bool(getattr(self.tokenizer, 'is_fast', False)),
+            }
+
+
+_token_caches = {}
+_token_caches_lock = threading.Lock()
+_token_cache_size = DEFAULT_TOKEN_CACHE_SIZE
+
+
+# Function to set how many texts the token caches created from now on keep
+def set_token_cache_size(size):
+    global _token_cache_size
+    _token_cache_size = size
+
+
+# Function to get the token cache of a tokenizer, created on first use
+def get_token_cache(tokenizer):
+    with _token_caches_lock:
+        cache = _token_caches.get(id(tokenizer))
+        if cache is None or cache.tokenizer is not tokenizer:
+            cache = _token_caches[id(tokenizer)] = TokenCache(tokenizer, _token_cache_size)
+        return cache
+
+
+# Function to greedily pack per-sentence token ids into chunks of at most budget tokens.
+# A sentence longer than the budget is cut into budget-sized pieces rather than truncated.
+def pack_sentences(sentence_ids, budget):
+    chunks = []
+    current = []
+    for ids in sentence_ids:
+        if len(ids) > budget:
+            if current:
+                chunks.append(current)
+                current = []
+            for start in range(0, len(ids), budget):
+                chunks.append(list(ids[start:start + budget]))
+            continue
+        if len(current) + len(ids) > budget:
+            chunks.append(current)
+            current = []
+        current.extend(ids)
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+# Function to turn a text into model-ready input ids: the sentence ids come from the
+# token cache and are packed up to token_budget so nothing is truncated later
+def chunk_token_ids(text, tokenizer, token_budget=DEFAULT_TOKEN_BUDGET):
+    token_cache = get_token_cache(tokenizer)
+    sentence_ids = token_cache.sentence_ids(text)
+    if not sentence_ids:
+        return []
+    prefix_ids = list(token_cache.prefix_ids)
+    body_budget = token_budget - len(prefix_ids) - 1  # room for the prefix and </s>
+    if body_budget < 1:
+        raise ValueError(f"token_budget {token_budget} is too small for the prompt prefix")
+    eos = [tokenizer.eos_token_id]
+    chunks = [prefix_ids + chunk + eos for chunk in pack_sentences(sentence_ids, body_budget)]
+    record_count('chunks', len(chunks), CHUNKS)
+    return chunks
+
+
+# Function to build the single "summarize: " prompt of a text (short mode) from the cached sentence
+# ids, truncated to max_length tokens including </s> like tokenizer(..., truncation=True) does
+def prompt_token_ids(text, tokenizer, max_length):
+    token_cache = get_token_cache(tokenizer)
+    body = [token for ids in token_cache.sentence_ids(text) for token in ids]
+    body_length = max(0, max_length - len(token_cache.prefix_ids) - 1)
+    record_count('chunks', 1, CHUNKS)
+    return list(token_cache.prefix_ids) + body[:body_length] + [tokenizer.eos_token_id]
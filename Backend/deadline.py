@@ -0,0 +1,63 @@
+import contextvars
+import time
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+# Time budget of one request, as a monotonic expiry. The scrapers clamp their timeouts to it,
+# generation stops at it (max_time) and the batcher drops prompts whose request has run out.
+class Deadline:
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self):
+        return time.monotonic() >= self.expires_at
+
+    # Function to raise DeadlineExceeded once the budget is spent, before starting the given stage
+    def check(self, stage):
+        if self.expired():
+            raise DeadlineExceeded(f"Deadline of {self.seconds:g}s exceeded before {stage}")
+
+
+_current_deadline = contextvars.ContextVar('deadline', default=None)
+
+
+def start_deadline(seconds):
+    deadline = Deadline(seconds)
+    return deadline, _current_deadline.set(deadline)
+
+
+# Function to make an existing deadline current again, e.g. in a streamed response that runs
+# after the request's own context was torn down; undo it with end_deadline
+def resume_deadline(deadline):
+    return _current_deadline.set(deadline)
+
+
+def end_deadline(token):
+    try:
+        _current_deadline.reset(token)
+    except ValueError:
+        _current_deadline.set(None)
+
+
+def current_deadline():
+    return _current_deadline.get()
+
+
+# Function to shorten a timeout (seconds, or a (connect, read) tuple) to what is left of the
+# current deadline; without a deadline the timeout is returned unchanged
+def clamp_timeout(timeout, stage='fetch'):
+    deadline = _current_deadline.get()
+    if deadline is None:
+        return timeout
+    deadline.check(stage)
+    remaining = deadline.remaining()
+    if isinstance(timeout, tuple):
+        return tuple(min(part, remaining) for part in timeout)
+    return remaining if timeout is None else min(timeout, remaining)
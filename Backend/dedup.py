@@ -0,0 +1,358 @@
+import argparse
+import csv
+import fcntl
+import json
+import os
+import sys
+import threading
+import time
+import unicodedata
+
+import numpy as np
+
+# Characters that separate words for shingling: whitespace and punctuation, including danda
+SEPARATORS = ' \t\n\r\f\v\u00a0\u200b.,;:!?\'"()[]{}<>|/\\-\u2013\u2014\u2018\u2019\u201c\u201d\u0964\u0965'
+_separator_table = np.zeros(0x10000, dtype=bool)
+_separator_table[[ord(char) for char in SEPARATORS]] = True
+
+# Odd base of the polynomial word hash, so its powers are invertible modulo 2**64
+WORD_BASE = 1000003
+HASH_MASK = np.uint64(0xFFFFFFFF)
+HASH_SHIFT = np.uint64(32)
+
+
+# Function to pick the LSH banding (bands * rows <= num_perm) whose S-curve threshold
+# (1 / bands) ** (1 / rows) is closest to the requested Jaccard threshold
+def choose_bands(num_perm, threshold):
+    best = None
+    for rows in range(1, num_perm + 1):
+        bands = num_perm // rows
+        error = abs((1.0 / bands) ** (1.0 / rows) - threshold)
+        if best is None or error < best[0]:
+            best = (error, bands, rows)
+    return best[1], best[2]
+
+
+# MinHash signatures of word shingles with an LSH index over them. Band hashes live in
+# sorted numpy arrays (searched with searchsorted) plus a small dict of recent inserts
+# that is merged into the arrays in bulk, so a million documents need no per-entry objects.
+# With max_entries the oldest documents are dropped past that many, and with ttl_seconds
+# documents stop matching once they are older; removed documents are only marked dead and
+# the arrays are rebuilt without them once they make up half of the index.
+class MinHashIndex:
+    def __init__(self, num_perm=64, threshold=0.9, shingle_size=3, seed=1, merge_size=50000,
+                 max_entries=None, ttl_seconds=None):
+        self.num_perm = num_perm
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        self.seed = seed
+        self.merge_size = merge_size
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self.bands, self.rows = choose_bands(num_perm, threshold)
+        rng = np.random.RandomState(seed)
+        # Multiply-shift hashing: (a * h + b) >> 32 with odd 64-bit a is a universal family
+        # for 32-bit h and avoids a modulo per shingle and permutation
+        self._a = (rng.randint(0, 1 << 62, size=(num_perm, 1), dtype=np.int64).astype(np.uint64) << np.uint64(1)) \
+            | np.uint64(1)
+        self._b = rng.randint(0, 1 << 62, size=(num_perm, 1), dtype=np.int64).astype(np.uint64)
+        self._shingle_mix = rng.randint(1, 1 << 31, size=shingle_size, dtype=np.int64).astype(np.uint64)
+        self._band_mix = rng.randint(1, 1 << 31, size=self.rows, dtype=np.int64).astype(np.uint64)
+        self._powers = (np.ones(1, dtype=np.uint64), np.ones(1, dtype=np.uint64))
+        self._lock = threading.RLock()
+        # Whether this process added documents that are not in the file it was loaded from or saved to
+        self.dirty = False
+        self._reset(0)
+
+    def _reset(self, capacity):
+        self.keys = []
+        self._doc_ids = {}
+        self._signatures = np.zeros((max(1024, capacity), self.num_perm), dtype=np.uint32)
+        self._added_at = np.zeros(len(self._signatures), dtype=np.float64)
+        self._live = np.zeros(len(self._signatures), dtype=bool)
+        self._oldest = 0
+        self._dead = 0
+        self._band_keys = [np.zeros(0, dtype=np.uint64) for _ in range(self.bands)]
+        self._band_ids = [np.zeros(0, dtype=np.int64) for _ in range(self.bands)]
+        self._pending = [{} for _ in range(self.bands)]
+        self._pending_count = 0
+
+    def __len__(self):
+        return len(self._doc_ids)
+
+    # Powers of WORD_BASE and of its inverse modulo 2**64, grown on demand
+    def _word_powers(self, length):
+        powers, inverse_powers = self._powers
+        if len(powers) < length:
+            size = max(length, 2 * len(powers))
+            powers = np.cumprod(np.full(size, WORD_BASE, dtype=np.uint64))
+            powers = np.concatenate([np.ones(1, dtype=np.uint64), powers[:-1]])
+            inverse_powers = np.cumprod(np.full(size, pow(WORD_BASE, -1, 1 << 64), dtype=np.uint64))
+            inverse_powers = np.concatenate([np.ones(1, dtype=np.uint64), inverse_powers[:-1]])
+            self._powers = (powers, inverse_powers)
+        return powers, inverse_powers
+
+    # Function to hash every word of a text without building Python strings: the code points
+    # go into one array, words are the runs between separators, and each word's hash comes
+    # from prefix sums of a polynomial rolling hash
+    def word_hashes(self, text):
+        if not unicodedata.is_normalized('NFC', text):
+            text = unicodedata.normalize('NFC', text)
+        codes = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32).astype(np.uint64)
+        codes = np.where((codes >= 65) & (codes <= 90), codes + 32, codes)
+        is_separator = np.concatenate(([True], _separator_table[np.minimum(codes, 0xFFFF)], [True]))
+        boundaries = np.flatnonzero(is_separator[1:] != is_separator[:-1])
+        starts, ends = boundaries[0::2], boundaries[1::2]
+        powers, inverse_powers = self._word_powers(len(codes) + 1)
+        prefix = np.zeros(len(codes) + 1, dtype=np.uint64)
+        np.cumsum(codes * powers[:len(codes)], out=prefix[1:])
+        hashes = (prefix[ends] - prefix[starts]) * inverse_powers[starts]
+        return (hashes ^ (hashes >> HASH_SHIFT)) & HASH_MASK
+
+    # Function to compute the MinHash signature of a text, or None if it has no words
+    def signature(self, text):
+        token_hashes = self.word_hashes(text)
+        if not len(token_hashes):
+            return None
+        k = min(self.shingle_size, len(token_hashes))
+        count = len(token_hashes) - k + 1
+        shingles = np.zeros(count, dtype=np.uint64)
+        for offset in range(k):
+            shingles += token_hashes[offset:offset + count] * self._shingle_mix[offset]
+        shingles &= HASH_MASK
+        permuted = (self._a * shingles + self._b) >> HASH_SHIFT
+        return permuted.min(axis=1).astype(np.uint32)
+
+    def _band_hashes(self, signature):
+        bands = signature[:self.bands * self.rows].astype(np.uint64).reshape(self.bands, self.rows)
+        return (bands * self._band_mix).sum(axis=1)
+
+    # Function to rebuild the index from (keys, signatures, added_at) with every band sorted at once
+    def _rebuild(self, keys, signatures, added_at):
+        self._reset(2 * len(keys))
+        count = len(keys)
+        self.keys = list(keys)
+        self._doc_ids = {key: doc_id for doc_id, key in enumerate(self.keys)}
+        self._signatures[:count] = signatures
+        self._added_at[:count] = added_at
+        self._live[:count] = True
+        bands = signatures[:, :self.bands * self.rows].astype(np.uint64).reshape(count, self.bands, self.rows)
+        band_hashes = (bands * self._band_mix).sum(axis=2)
+        for band in range(self.bands):
+            order = np.argsort(band_hashes[:, band], kind='stable')
+            self._band_keys[band] = band_hashes[order, band]
+            self._band_ids[band] = order.astype(np.int64)
+
+    # Function to get the keys, signatures and insertion times of the live documents, oldest first
+    def _live_entries(self):
+        ids = np.flatnonzero(self._live[:len(self.keys)])
+        if self.ttl is not None:
+            ids = ids[self._added_at[ids] >= time.time() - self.ttl]
+        return [self.keys[doc_id] for doc_id in ids.tolist()], self._signatures[ids], self._added_at[ids]
+
+    def _drop(self, doc_id):
+        self._live[doc_id] = False
+        del self._doc_ids[self.keys[doc_id]]
+        self._dead += 1
+
+    # Function to stop matching key, e.g. once its summary has left the cache; returns whether it was indexed
+    def discard(self, key):
+        with self._lock:
+            doc_id = self._doc_ids.get(key)
+            if doc_id is None:
+                return False
+            self._drop(doc_id)
+            self._compact_if_sparse()
+            return True
+
+    def _compact_if_sparse(self):
+        if self._dead > max(1024, len(self._doc_ids)):
+            self._rebuild(*self._live_entries())
+
+    def _merge_pending(self):
+        for band in range(self.bands):
+            pending = self._pending[band]
+            if not pending:
+                continue
+            new_keys = []
+            new_ids = []
+            for band_hash, ids in pending.items():
+                new_keys.extend([band_hash] * len(ids))
+                new_ids.extend(ids)
+            keys = np.concatenate([self._band_keys[band], np.array(new_keys, dtype=np.uint64)])
+            ids = np.concatenate([self._band_ids[band], np.array(new_ids, dtype=np.int64)])
+            order = np.argsort(keys, kind='stable')
+            self._band_keys[band] = keys[order]
+            self._band_ids[band] = ids[order]
+            self._pending[band] = {}
+        self._pending_count = 0
+
+    # Function to index a text (or a precomputed signature) under key; returns False for empty text
+    def add(self, key, text=None, signature=None):
+        if signature is None:
+            signature = self.signature(text)
+        if signature is None:
+            return False
+        band_hashes = self._band_hashes(signature)
+        with self._lock:
+            if key in self._doc_ids:
+                self._drop(self._doc_ids[key])
+            doc_id = len(self.keys)
+            if doc_id == len(self._signatures):
+                self._signatures = np.concatenate([self._signatures, np.zeros_like(self._signatures)])
+                self._added_at = np.concatenate([self._added_at, np.zeros_like(self._added_at)])
+                self._live = np.concatenate([self._live, np.zeros_like(self._live)])
+            self._signatures[doc_id] = signature
+            self._added_at[doc_id] = time.time()
+            self._live[doc_id] = True
+            self.keys.append(key)
+            self._doc_ids[key] = doc_id
+            self.dirty = True
+            for band, band_hash in enumerate(band_hashes.tolist()):
+                self._pending[band].setdefault(band_hash, []).append(doc_id)
+            self._pending_count += 1
+            if self.max_entries is not None:
+                while len(self._doc_ids) > self.max_entries:
+                    while not self._live[self._oldest]:
+                        self._oldest += 1
+                    self._drop(self._oldest)
+            if self._pending_count >= max(self.merge_size, len(self.keys) // 10):
+                self._merge_pending()
+            self._compact_if_sparse()
+        return True
+
+    # Function to find indexed keys whose estimated Jaccard similarity is at least threshold,
+    # most similar first, as (key, similarity) pairs
+    def query(self, text=None, signature=None, threshold=None):
+        if signature is None:
+            signature = self.signature(text)
+        if signature is None:
+            return []
+        threshold = self.threshold if threshold is None else threshold
+        band_hashes = self._band_hashes(signature)
+        with self._lock:
+            candidates = set()
+            # band_hash stays a numpy uint64 here: a Python int would make searchsorted
+            # compare the whole array as float64
+            for band, band_hash in enumerate(band_hashes):
+                keys = self._band_keys[band]
+                start = keys.searchsorted(band_hash, side='left')
+                end = keys.searchsorted(band_hash, side='right')
+                candidates.update(self._band_ids[band][start:end].tolist())
+                candidates.update(self._pending[band].get(int(band_hash), ()))
+            if not candidates:
+                return []
+            ids = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+            alive = self._live[ids]
+            if self.ttl is not None:
+                alive &= self._added_at[ids] >= time.time() - self.ttl
+            ids = ids[alive]
+            similarities = (self._signatures[ids] == signature).mean(axis=1)
+            matches = [(self.keys[doc_id], float(similarity)) for doc_id, similarity in zip(ids.tolist(), similarities)
+                       if similarity >= threshold]
+        matches.sort(key=lambda match: -match[1])
+        return matches
+
+    # Function to write the index to path (.npz). Several processes (e.g. gunicorn workers forked
+    # from one preloaded index) may save to the same file: each merges its live documents into
+    # what is on disk under a lock, newest first within max_entries, and a process that added
+    # nothing since it loaded or last saved leaves the file alone.
+    def save(self, path):
+        with open(path + '.lock', 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            with self._lock:
+                if not self.dirty and os.path.exists(path):
+                    return False
+                keys, signatures, added_at = self._live_entries()
+                if os.path.exists(path):
+                    disk = MinHashIndex.load(path, max_entries=self.max_entries, ttl_seconds=self.ttl,
+                                             threshold=self.threshold)
+                    disk_keys, disk_signatures, disk_added_at = disk._live_entries()
+                    own = set(keys)
+                    kept = [index for index, key in enumerate(disk_keys) if key not in own]
+                    keys = [disk_keys[index] for index in kept] + keys
+                    signatures = np.concatenate([disk_signatures[kept], signatures])
+                    added_at = np.concatenate([disk_added_at[kept], added_at])
+                order = np.argsort(added_at, kind='stable')
+                if self.max_entries is not None:
+                    order = order[-self.max_entries:]
+                arrays = {
+                    'params': np.array([self.num_perm, self.shingle_size, self.seed]),
+                    'threshold': np.array([self.threshold]),
+                    'keys': np.array(json.dumps([keys[index] for index in order.tolist()], ensure_ascii=False)),
+                    'signatures': signatures[order],
+                    'added_at': added_at[order],
+                }
+                self.dirty = False
+            tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+            np.savez(tmp_path, **arrays)
+            os.replace(tmp_path, path)
+        return True
+
+    # Function to read an index written by save(). Signatures do not depend on the threshold, so a
+    # different threshold than the file's only changes the bands, which are rebuilt here anyway.
+    @classmethod
+    def load(cls, path, merge_size=50000, max_entries=None, ttl_seconds=None, threshold=None):
+        with np.load(path) as data:
+            num_perm, shingle_size, seed = (int(value) for value in data['params'])
+            threshold = float(data['threshold'][0]) if threshold is None else threshold
+            index = cls(num_perm, threshold, shingle_size, seed, merge_size, max_entries, ttl_seconds)
+            keys = json.loads(str(data['keys']))
+            # Files written before documents had insertion times count as added now
+            added_at = data['added_at'] if 'added_at' in data else np.full(len(keys), time.time())
+            index._rebuild(keys, data['signatures'], added_at)
+        if max_entries is not None and len(index) > max_entries:
+            index._rebuild(*(entries[-max_entries:] for entries in index._live_entries()))
+        return index
+
+    def stats(self):
+        with self._lock:
+            return {
+                "documents": len(self._doc_ids),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "num_perm": self.num_perm,
+                "bands": self.bands,
+                "rows": self.rows,
+                "threshold": self.threshold,
+                "pending": self._pending_count,
+            }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drop near-duplicate articles from a CSV")
+    parser.add_argument('input')
+    parser.add_argument('output')
+    parser.add_argument('--column', default=None, help="Article column (default: Article or article)")
+    parser.add_argument('--threshold', type=float, default=0.9)
+    parser.add_argument('--index', default=None, help="Persistent index (.npz) shared by successive runs")
+    args = parser.parse_args()
+
+    if args.index and os.path.exists(args.index):
+        index = MinHashIndex.load(args.index, threshold=args.threshold)
+    else:
+        index = MinHashIndex(threshold=args.threshold)
+    csv.field_size_limit(sys.maxsize)
+    kept = dropped = 0
+    with open(args.input, newline='', encoding='utf-8') as source, \
+            open(args.output, 'w', newline='', encoding='utf-8') as target:
+        reader = csv.DictReader(source)
+        column = args.column or ('Article' if 'Article' in reader.fieldnames else 'article')
+        writer = csv.DictWriter(target, fieldnames=reader.fieldnames)
+        writer.writeheader()
+        for row_number, row in enumerate(reader):
+            signature = index.signature(row[column] or '')
+            if signature is not None and index.query(signature=signature, threshold=args.threshold):
+                dropped += 1
+                continue
+            writer.writerow(row)
+            kept += 1
+            if signature is not None:
+                index.add(f"{os.path.basename(args.input)}:{row_number}", signature=signature)
+    if args.index:
+        index.save(args.index)
+    print(json.dumps({"kept": kept, "dropped": dropped, "indexed": len(index)}))
+
+
+if __name__ == '__main__':
+    main()
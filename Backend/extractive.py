@@ -0,0 +1,157 @@
+import argparse
+import csv
+import gzip
+import json
+import math
+import os
+import sys
+from collections import Counter
+
+import numpy as np
+
+from chunking import get_token_cache, split_sentences
+from scoring import TOKEN_PATTERN
+
+DEFAULT_IDF_PATH = os.path.join(os.path.dirname(__file__), 'artifacts', 'idf.json.gz')
+DEFAULT_IDF_DATASET = os.path.join(os.path.dirname(__file__), '..', 'Dataset', 'merged_data.csv')
+
+
+# Function to split a sentence into lowercased word tokens (the same tokens ROUGE scores)
+def word_tokens(text):
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+# Document frequencies of word tokens over a news corpus. Tokens seen in fewer than
+# min_df documents are dropped from the artifact and get the highest IDF.
+class IdfTable:
+    def __init__(self, document_frequencies, documents):
+        self.document_frequencies = document_frequencies
+        self.documents = documents
+
+    def idf(self, token):
+        return math.log((1 + self.documents) / (1 + self.document_frequencies.get(token, 0))) + 1
+
+    @classmethod
+    def build(cls, texts, min_df=2):
+        counts = Counter()
+        documents = 0
+        for text in texts:
+            counts.update(set(word_tokens(text)))
+            documents += 1
+        return cls({token: count for token, count in counts.items() if count >= min_df}, documents)
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with gzip.open(path, 'wt', encoding='utf-8') as f:
+            json.dump({"documents": self.documents, "df": self.document_frequencies}, f, ensure_ascii=False,
+                      separators=(',', ':'))
+
+    @classmethod
+    def load(cls, path):
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(data["df"], data["documents"])
+
+
+# Function to rank sentences with TextRank: PageRank over the cosine similarities
+# of their TF-IDF rows
+def textrank(matrix, damping=0.85, iterations=50, tolerance=1e-6):
+    count = matrix.shape[0]
+    similarity = matrix @ matrix.T
+    np.fill_diagonal(similarity, 0.0)
+    row_sums = similarity.sum(axis=1, keepdims=True)
+    transition = np.divide(similarity, row_sums, out=np.zeros_like(similarity), where=row_sums > 0)
+    scores = np.full(count, 1.0 / count)
+    for _ in range(iterations):
+        updated = (1 - damping) / count + damping * (transition.T @ scores)
+        converged = np.abs(updated - scores).sum() < tolerance
+        scores = updated
+        if converged:
+            break
+    return scores
+
+
+# Sentence-level extractive summarizer. The TF-IDF matrix only has columns for the
+# words of the article being summarized, so it stays small and needs no sparse library.
+class ExtractiveSummarizer:
+    def __init__(self, idf, damping=0.85, iterations=50):
+        self.idf = idf
+        self.damping = damping
+        self.iterations = iterations
+
+    # Function to score each sentence of an already formatted text
+    def score_sentences(self, sentences):
+        columns = {}
+        rows = []
+        for sentence in sentences:
+            rows.append([columns.setdefault(token, len(columns)) for token in word_tokens(sentence)])
+        matrix = np.zeros((len(sentences), max(len(columns), 1)))
+        for row, column_ids in enumerate(rows):
+            np.add.at(matrix[row], column_ids, 1.0)
+        idf = np.ones(matrix.shape[1])
+        for token, column in columns.items():
+            idf[column] = self.idf.idf(token)
+        matrix *= idf
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix = np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+        return textrank(matrix, self.damping, self.iterations)
+
+    # Function to keep the best sentences that fit in budget, in their original order.
+    # Lengths are mT5 tokens when a tokenizer is given, otherwise words.
+    def extract(self, text, budget, tokenizer=None):
+        sentences = split_sentences(text)
+        if not sentences:
+            return ''
+        if tokenizer is not None:
+            lengths = [len(ids) for ids in get_token_cache(tokenizer).sentence_ids(text)]
+        else:
+            lengths = [len(sentence.split()) for sentence in sentences]
+        if sum(lengths) <= budget:
+            return ' '.join(sentences)
+        scores = self.score_sentences(sentences)
+        kept = []
+        used = 0
+        for index in np.argsort(-scores, kind='stable'):
+            if used + lengths[index] <= budget:
+                kept.append(index)
+                used += lengths[index]
+        if not kept:
+            kept = [int(np.argmax(scores))]
+        return ' '.join(sentences[index] for index in sorted(kept))
+
+
+_default_summarizer = None
+
+
+# Function to get the summarizer backed by the shipped IDF artifact, loaded on first use
+def get_extractive_summarizer(path=DEFAULT_IDF_PATH):
+    global _default_summarizer
+    if _default_summarizer is None:
+        _default_summarizer = ExtractiveSummarizer(IdfTable.load(path))
+    return _default_summarizer
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the IDF artifact used by the extractive summarizer")
+    parser.add_argument('--dataset', default=DEFAULT_IDF_DATASET)
+    parser.add_argument('--column', default='article')
+    parser.add_argument('--min-df', type=int, default=2)
+    parser.add_argument('--out', default=DEFAULT_IDF_PATH)
+    args = parser.parse_args()
+
+    from normalize import get_default_normalizer
+    normalizer = get_default_normalizer()
+    csv.field_size_limit(sys.maxsize)
+    with open(args.dataset, newline='', encoding='utf-8') as f:
+        texts = (normalizer.normalize(row[args.column]).text for row in csv.DictReader(f) if row[args.column])
+        table = IdfTable.build(texts, min_df=args.min_df)
+    table.save(args.out)
+    print(json.dumps({
+        "documents": table.documents,
+        "tokens": len(table.document_frequencies),
+        "bytes": os.path.getsize(args.out)
+    }))
+
+
+if __name__ == '__main__':
+    main()
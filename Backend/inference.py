@@ -0,0 +1,174 @@
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Selectable with INFERENCE_BACKEND:
+#   torch - the fp32 PyTorch model as published
+#   int8  - PyTorch with dynamic int8 quantization of every nn.Linear
+#   onnx  - ONNX Runtime encoder/decoder with KV-cache (needs optimum[onnxruntime])
+INFERENCE_BACKENDS = ('torch', 'int8', 'onnx')
+
+
+# Function to load the fp32 PyTorch model; with safetensors_dir the weights are converted once to a
+# local safetensors file that later starts load from. With share_memory the parameters are moved
+# into shared memory (/dev/shm, which must be large enough), so processes forked afterwards
+# (gunicorn --preload) map the same pages instead of each holding a copy once copy-on-write pages
+# get touched. It does nothing useful in a process that never forks.
+def load_torch_model(model_id, safetensors_dir=None, share_memory=False):
+    from transformers import MT5ForConditionalGeneration
+    if safetensors_dir:
+        if not os.path.isdir(safetensors_dir):
+            logger.info(f"Saving {model_id} as safetensors to {safetensors_dir}")
+            MT5ForConditionalGeneration.from_pretrained(model_id).save_pretrained(safetensors_dir, safe_serialization=True)
+        model = MT5ForConditionalGeneration.from_pretrained(safetensors_dir, use_safetensors=True, low_cpu_mem_usage=True)
+    else:
+        model = MT5ForConditionalGeneration.from_pretrained(model_id)
+    model.eval()
+    if share_memory:
+        model.share_memory()
+    return model
+
+
+# Function to quantize the Linear layers of the model to int8 for CPU inference
+def load_int8_model(model_id, safetensors_dir=None):
+    import torch
+    model = load_torch_model(model_id, safetensors_dir)
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+# Function to load (exporting on first use) the ONNX Runtime seq2seq model;
+# the export is saved to onnx_dir so later workers skip it
+def load_onnx_model(model_id, onnx_dir=None):
+    try:
+        from optimum.onnxruntime import ORTModelForSeq2SeqLM
+    except ImportError:
+        raise ImportError("The onnx backend needs optimum with onnxruntime: pip install optimum[onnxruntime]")
+    if onnx_dir and os.path.isdir(onnx_dir):
+        return ORTModelForSeq2SeqLM.from_pretrained(onnx_dir, use_cache=True)
+    logger.info(f"Exporting {model_id} to ONNX")
+    model = ORTModelForSeq2SeqLM.from_pretrained(model_id, export=True, use_cache=True)
+    if onnx_dir:
+        model.save_pretrained(onnx_dir)
+    return model
+
+
+# Function to load the model for the selected backend; every backend returns
+# an object with generate() and device, so batching.generate_batch works unchanged.
+# share_memory only applies to the torch backend; int8 and onnx models are private to each process.
+def load_model(model_id, backend='torch', onnx_dir=None, safetensors_dir=None, share_memory=False):
+    if backend == 'torch':
+        return load_torch_model(model_id, safetensors_dir, share_memory=share_memory)
+    if backend == 'int8':
+        return load_int8_model(model_id, safetensors_dir)
+    if backend == 'onnx':
+        return load_onnx_model(model_id, onnx_dir)
+    raise ValueError(f"Unknown inference backend: {backend}, expected one of {', '.join(INFERENCE_BACKENDS)}")
+
+
+# Function to load the Rust-backed fast tokenizer (converted from the SentencePiece model when the
+# repo has no tokenizer.json); fast=False, or a failed conversion, gives the slow SentencePiece one
+def load_tokenizer(model_id, fast=True):
+    from transformers import MT5Tokenizer, MT5TokenizerFast
+    if fast:
+        try:
+            return MT5TokenizerFast.from_pretrained(model_id)
+        except (ValueError, ImportError) as e:
+            logger.warning(f"Fast tokenizer unavailable for {model_id}, using the slow one: {e}")
+    return MT5Tokenizer.from_pretrained(model_id)
+
+
+# Function to read this process's resident set size (Linux only, None elsewhere)
+def current_rss_mb():
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    return None
+
+
+class ModelNotReady(Exception):
+    pass
+
+
+# Holds the (model, tokenizer) pair and tracks whether it is loaded and warm.
+# load() runs in the calling thread, e.g. at import under gunicorn --preload so
+# the model is loaded once before the fork; start() loads in a background
+# thread so the worker can answer health checks while the model warms up.
+class ModelHolder:
+    def __init__(self, load_fn, warmup_fn=None):
+        self.load_fn = load_fn
+        self.warmup_fn = warmup_fn
+        self._reset()
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def _reset(self):
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._thread = None
+        self.state = 'cold'
+        self.error = None
+        self.model = None
+        self.tokenizer = None
+        self.load_seconds = None
+        self.warmup_seconds = None
+
+    # A load thread does not survive fork, so a child restarts any unfinished load
+    def _after_fork(self):
+        if self.state == 'loading':
+            self._reset()
+            self.start()
+
+    def load(self):
+        with self._lock:
+            if self.state in ('ready', 'loading'):
+                return
+            self.state = 'loading'
+        try:
+            start = time.perf_counter()
+            model, tokenizer = self.load_fn()
+            self.load_seconds = time.perf_counter() - start
+            if self.warmup_fn is not None:
+                start = time.perf_counter()
+                self.warmup_fn(model, tokenizer)
+                self.warmup_seconds = time.perf_counter() - start
+            self.model, self.tokenizer = model, tokenizer
+            self.state = 'ready'
+            logger.info(f"Model ready in {self.load_seconds:.1f}s (pid {os.getpid()})")
+        except Exception as e:
+            logger.error(f"Error loading model: {e}")
+            self.error = str(e)
+            self.state = 'failed'
+        finally:
+            self._ready.set()
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None or self.state != 'cold':
+                return
+            self._thread = threading.Thread(target=self.load, name="model-loader", daemon=True)
+            self._thread.start()
+
+    def get(self, timeout=None):
+        self.start()
+        if not self._ready.wait(timeout):
+            raise ModelNotReady("Model is still loading")
+        if self.state != 'ready':
+            raise ModelNotReady(f"Model failed to load: {self.error}")
+        return self.model, self.tokenizer
+
+    def status(self):
+        return {
+            "state": self.state,
+            "ready": self.state == 'ready',
+            "pid": os.getpid(),
+            "load_seconds": self.load_seconds,
+            "warmup_seconds": self.warmup_seconds,
+            "rss_mb": current_rss_mb(),
+            "error": self.error,
+        }
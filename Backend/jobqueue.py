@@ -0,0 +1,376 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from urllib.parse import urlsplit
+
+from admission import LANES
+
+logger = logging.getLogger(__name__)
+
+# queued -> running -> done | failed | expired (the deadline passed before a worker got to it)
+FINISHED_STATUSES = ('done', 'failed', 'expired')
+
+
+def new_job_id():
+    return uuid.uuid4().hex
+
+
+# Function to turn a stored job into the JSON served to clients (without the article text)
+def public_job(job):
+    response = {key: job[key] for key in ("job_id", "status", "lane", "created_at", "claimed_at", "finished_at")}
+    if job["result"] is not None:
+        response.update(job["result"])
+    if job["error"] is not None:
+        response["error"] = job["error"]
+    return response
+
+
+# Function to check that a job callback is an http(s) URL on one of allowed_hosts (exact host names)
+def callback_allowed(url, allowed_hosts):
+    try:
+        parts = urlsplit(str(url))
+        host = parts.hostname
+    except ValueError:
+        return False
+    return parts.scheme in ('http', 'https') and host is not None and host.lower() in allowed_hosts
+
+
+# Job queue in a sqlite database: a file shared by the API and the workers on one host, or
+# ':memory:' for a single process (tests, benchmarks). Workers claim the oldest jobs of the first
+# lane that has any, so short summaries are not stuck behind long ones. Waiters are woken at once
+# in the same process and poll the database otherwise.
+class SqliteJobQueue:
+    def __init__(self, path=':memory:', claim_timeout=300, result_ttl=3600, poll_interval=0.05):
+        self.path = path
+        self.in_process = path == ':memory:'
+        self.claim_timeout = claim_timeout
+        self.result_ttl = result_ttl
+        self.poll_interval = poll_interval
+        self._changed = threading.Condition()
+        self._connect()
+        if path != ':memory:':
+            # A sqlite connection must not be shared with a forked worker (gunicorn --preload)
+            os.register_at_fork(after_in_child=self._connect)
+
+    def _connect(self):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False, isolation_level=None)
+        if self.path != ':memory:':
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, lane INTEGER NOT NULL, payload TEXT NOT NULL, "
+            "status TEXT NOT NULL, created_at REAL NOT NULL, deadline_at REAL, callback TEXT, worker TEXT, "
+            "claimed_at REAL, finished_at REAL, result TEXT, error TEXT)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_queued ON jobs (status, lane, created_at)")
+
+    def _notify(self):
+        with self._changed:
+            self._changed.notify_all()
+
+    def enqueue(self, payload, lane='short', deadline_at=None, callback=None):
+        job_id = new_job_id()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, lane, payload, status, created_at, deadline_at, callback) "
+                "VALUES (?, ?, ?, 'queued', ?, ?, ?)",
+                (job_id, LANES.index(lane), json.dumps(payload, ensure_ascii=False), time.time(), deadline_at, callback)
+            )
+        self._notify()
+        return job_id
+
+    def _claim_now(self, worker_id, max_jobs):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT id, lane, payload, deadline_at, callback FROM jobs WHERE status = 'queued' "
+                    "ORDER BY lane, created_at LIMIT ?", (max_jobs,)
+                ).fetchall()
+                self._conn.executemany(
+                    "UPDATE jobs SET status = 'running', worker = ?, claimed_at = ? WHERE id = ?",
+                    [(worker_id, time.time(), row[0]) for row in rows]
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return [
+            {"job_id": job_id, "lane": LANES[lane], "payload": json.loads(payload), "deadline_at": deadline_at,
+             "callback": callback}
+            for job_id, lane, payload, deadline_at, callback in rows
+        ]
+
+    # Function to take up to max_jobs queued jobs for a worker, waiting up to wait seconds for the first
+    def claim(self, worker_id, max_jobs=8, wait=1.0):
+        give_up_at = time.monotonic() + wait
+        while True:
+            jobs = self._claim_now(worker_id, max_jobs)
+            remaining = give_up_at - time.monotonic()
+            if jobs or remaining <= 0:
+                return jobs
+            with self._changed:
+                self._changed.wait(min(self.poll_interval, remaining))
+
+    def _finish(self, job_id, status, result=None, error=None):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ?",
+                (status, json.dumps(result, ensure_ascii=False) if result is not None else None, error,
+                 time.time(), job_id)
+            )
+        self._notify()
+
+    def complete(self, job_id, result):
+        self._finish(job_id, 'done', result=result)
+
+    def fail(self, job_id, error, status='failed'):
+        self._finish(job_id, status, error=error)
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT lane, payload, status, created_at, claimed_at, finished_at, result, error FROM jobs WHERE id = ?",
+                (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        lane, payload, status, created_at, claimed_at, finished_at, result, error = row
+        return {
+            "job_id": job_id, "lane": LANES[lane], "payload": json.loads(payload), "status": status,
+            "created_at": created_at, "claimed_at": claimed_at, "finished_at": finished_at,
+            "result": json.loads(result) if result is not None else None, "error": error,
+        }
+
+    # Function to wait up to timeout seconds for a job to finish; returns the job (finished or not)
+    def wait(self, job_id, timeout):
+        give_up_at = time.monotonic() + timeout
+        while True:
+            job = self.get(job_id)
+            remaining = give_up_at - time.monotonic()
+            if job is None or job["status"] in FINISHED_STATUSES or remaining <= 0:
+                return job
+            with self._changed:
+                self._changed.wait(min(self.poll_interval, remaining))
+
+    def depth(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+
+    # Function to put back the jobs of workers that died mid-job and drop finished jobs older than result_ttl
+    def maintain(self):
+        now = time.time()
+        with self._lock:
+            requeued = self._conn.execute(
+                "UPDATE jobs SET status = 'queued', worker = NULL, claimed_at = NULL "
+                "WHERE status = 'running' AND claimed_at < ?", (now - self.claim_timeout,)
+            ).rowcount
+            self._conn.execute(
+                "DELETE FROM jobs WHERE status IN ('done', 'failed', 'expired') AND finished_at < ?",
+                (now - self.result_ttl,)
+            )
+        if requeued:
+            logger.warning(f"Requeued {requeued} jobs claimed more than {self.claim_timeout}s ago")
+            self._notify()
+        return requeued
+
+    def stats(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT status, lane, COUNT(*) FROM jobs GROUP BY status, lane").fetchall()
+        counts = {}
+        for status, lane, count in rows:
+            counts.setdefault(status, {})[LANES[lane]] = count
+        return {"backend": "sqlite", "path": self.path, "jobs": counts}
+
+
+# Pops up to ARGV[1] job ids from the lane lists (KEYS but the last, in lane order) and leases them
+# in the running set (the last key) in the same step, so a job is always either queued or leased
+CLAIM_SCRIPT = """
+local running = KEYS[#KEYS]
+local claimed = {}
+for lane = 1, #KEYS - 1 do
+    while #claimed < tonumber(ARGV[1]) do
+        local job_id = redis.call('RPOP', KEYS[lane])
+        if not job_id then break end
+        redis.call('ZADD', running, ARGV[2], job_id)
+        redis.call('HSET', ARGV[4] .. job_id, 'status', 'running', 'worker', ARGV[3], 'claimed_at', ARGV[2])
+        claimed[#claimed + 1] = job_id
+    end
+end
+return claimed
+"""
+
+# Moves a job whose lease ran out (KEYS[1], the running set) back to its lane list, unless another
+# worker requeued it first or it finished meanwhile; returns 1 when it was requeued
+REQUEUE_SCRIPT = """
+if redis.call('ZREM', KEYS[1], ARGV[1]) == 0 then return 0 end
+local job = ARGV[2] .. ARGV[1]
+if redis.call('HGET', job, 'status') ~= 'running' then return 0 end
+redis.call('HSET', job, 'status', 'queued')
+redis.call('RPUSH', ARGV[3] .. redis.call('HGET', job, 'lane'), ARGV[1])
+return 1
+"""
+
+
+# Job queue on Redis (or anything speaking its protocol). Each lane is a list of job ids, each
+# job a hash that expires result_ttl seconds after it finishes, and running jobs sit in a sorted
+# set by claim time so maintain() can requeue them if their worker dies. Claims and requeues are
+# Lua scripts, so a worker dying mid-claim cannot drop a job. Idle workers block on a wakeup list
+# that enqueue pushes to. A finished job pushes to a per-job list that waiters block on, so sync
+# requests are answered without polling.
+class RedisJobQueue:
+    in_process = False
+    max_wakeups = 1024
+
+    def __init__(self, client, namespace='summarizer', claim_timeout=300, result_ttl=3600):
+        self.client = client
+        self.namespace = namespace
+        self.claim_timeout = claim_timeout
+        self.result_ttl = result_ttl
+        self._claim_script = client.register_script(CLAIM_SCRIPT)
+        self._requeue_script = client.register_script(REQUEUE_SCRIPT)
+
+    def _key(self, *parts):
+        return ':'.join((self.namespace,) + parts)
+
+    def enqueue(self, payload, lane='short', deadline_at=None, callback=None):
+        job_id = new_job_id()
+        job = {"lane": lane, "payload": json.dumps(payload, ensure_ascii=False), "status": "queued",
+               "created_at": time.time()}
+        if deadline_at is not None:
+            job["deadline_at"] = deadline_at
+        if callback:
+            job["callback"] = callback
+        pipe = self.client.pipeline()
+        pipe.hset(self._key('job', job_id), mapping=job)
+        pipe.lpush(self._key('queue', lane), job_id)
+        self._wake(pipe)
+        pipe.execute()
+        return job_id
+
+    # Function to signal idle workers that there is work; the signal carries no job, so a lost or
+    # stale one only costs a claim attempt
+    def _wake(self, pipe):
+        pipe.lpush(self._key('wakeup'), 1)
+        pipe.ltrim(self._key('wakeup'), 0, self.max_wakeups - 1)
+
+    def _claim_now(self, worker_id, max_jobs):
+        job_ids = self._claim_script(
+            keys=[self._key('queue', lane) for lane in LANES] + [self._key('running')],
+            args=[max_jobs, time.time(), worker_id, self._key('job', '')]
+        )
+        return [job_id.decode() if isinstance(job_id, bytes) else job_id for job_id in job_ids]
+
+    def claim(self, worker_id, max_jobs=8, wait=1.0):
+        give_up_at = time.monotonic() + wait
+        while True:
+            job_ids = self._claim_now(worker_id, max_jobs)
+            remaining = give_up_at - time.monotonic()
+            if job_ids or remaining <= 0:
+                break
+            self.client.brpop([self._key('wakeup')], timeout=max(remaining, 0.01))
+        pipe = self.client.pipeline()
+        for job_id in job_ids:
+            pipe.hgetall(self._key('job', job_id))
+        jobs = []
+        for job_id, job in zip(job_ids, pipe.execute()):
+            job = self._decode(job)
+            jobs.append({"job_id": job_id, "lane": job["lane"], "payload": json.loads(job["payload"]),
+                         "deadline_at": float(job["deadline_at"]) if "deadline_at" in job else None,
+                         "callback": job.get("callback")})
+        return jobs
+
+    @staticmethod
+    def _decode(mapping):
+        return {(key.decode() if isinstance(key, bytes) else key): (value.decode() if isinstance(value, bytes) else value)
+                for key, value in mapping.items()}
+
+    def _finish(self, job_id, status, result=None, error=None):
+        fields = {"status": status, "finished_at": time.time()}
+        if result is not None:
+            fields["result"] = json.dumps(result, ensure_ascii=False)
+        if error is not None:
+            fields["error"] = error
+        done_key = self._key('done', job_id)
+        pipe = self.client.pipeline()
+        pipe.hset(self._key('job', job_id), mapping=fields)
+        pipe.expire(self._key('job', job_id), self.result_ttl)
+        pipe.zrem(self._key('running'), job_id)
+        pipe.rpush(done_key, status)
+        pipe.expire(done_key, self.result_ttl)
+        pipe.execute()
+
+    def complete(self, job_id, result):
+        self._finish(job_id, 'done', result=result)
+
+    def fail(self, job_id, error, status='failed'):
+        self._finish(job_id, status, error=error)
+
+    def get(self, job_id):
+        job = self._decode(self.client.hgetall(self._key('job', job_id)))
+        if not job:
+            return None
+        return {
+            "job_id": job_id, "lane": job["lane"], "payload": json.loads(job["payload"]), "status": job["status"],
+            "created_at": float(job["created_at"]),
+            "claimed_at": float(job["claimed_at"]) if "claimed_at" in job else None,
+            "finished_at": float(job["finished_at"]) if "finished_at" in job else None,
+            "result": json.loads(job["result"]) if "result" in job else None, "error": job.get("error"),
+        }
+
+    def wait(self, job_id, timeout):
+        job = self.get(job_id)
+        if job is None or job["status"] in FINISHED_STATUSES:
+            return job
+        # The marker is pushed back so other waiters on the same job wake up too
+        marker = self.client.blpop([self._key('done', job_id)], timeout=max(timeout, 0.01))
+        if marker is not None:
+            self.client.rpush(self._key('done', job_id), marker[1])
+        return self.get(job_id)
+
+    def depth(self):
+        return sum(self.client.llen(self._key('queue', lane)) for lane in LANES)
+
+    # Function to put back the jobs of workers that died mid-job; finished jobs expire by themselves
+    def maintain(self):
+        stale = self.client.zrangebyscore(self._key('running'), 0, time.time() - self.claim_timeout)
+        requeued = 0
+        for job_id in stale:
+            requeued += self._requeue_script(
+                keys=[self._key('running')], args=[job_id, self._key('job', ''), self._key('queue', '')]
+            )
+        if requeued:
+            pipe = self.client.pipeline()
+            self._wake(pipe)
+            pipe.execute()
+            logger.warning(f"Requeued {requeued} jobs claimed more than {self.claim_timeout}s ago")
+        return requeued
+
+    def stats(self):
+        return {
+            "backend": "redis",
+            "queued": {lane: self.client.llen(self._key('queue', lane)) for lane in LANES},
+            "running": self.client.zcard(self._key('running')),
+        }
+
+
+# Function to build the job queue named by a JOB_QUEUE url:
+#   memory://                  - in this process only (tests, benchmarks)
+#   sqlite:///path/to/jobs.db  - a sqlite file shared by the processes on one host
+#   redis://host:6379/0        - Redis, shared across hosts (needs the redis package)
+def get_job_queue(url, claim_timeout=300, result_ttl=3600):
+    if url == 'memory://':
+        return SqliteJobQueue(':memory:', claim_timeout=claim_timeout, result_ttl=result_ttl)
+    if url.startswith('sqlite:///'):
+        return SqliteJobQueue(url[len('sqlite:///'):], claim_timeout=claim_timeout, result_ttl=result_ttl)
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        try:
+            import redis
+        except ImportError:
+            raise ImportError("A redis:// JOB_QUEUE needs the redis package: pip install redis")
+        return RedisJobQueue(redis.Redis.from_url(url), claim_timeout=claim_timeout, result_ttl=result_ttl)
+    raise ValueError(f"Unknown JOB_QUEUE: {url}, expected memory://, sqlite:///<path> or redis://<host>")
@@ -0,0 +1,163 @@
+import re
+import string
+import unicodedata
+
+DEVANAGARI_DIGITS = '०१२३४५६७८९'
+DANDA = '\u0964'
+DOUBLE_DANDA = '\u0965'
+
+# Zero-width joiner/non-joiner change how conjuncts render in Devanagari;
+# the others are invisible noise copied in from web pages
+JOINERS = '\u200c\u200d'
+INVISIBLES = '\u200b\u2060\ufeff\u00ad'
+
+# Symbols format_paragraph has always removed
+STRIPPED_SYMBOLS = '!#@_$%^&*'
+
+DIGIT_POLICIES = ('strip', 'keep', 'devanagari', 'ascii')
+ZERO_WIDTH_POLICIES = ('keep', 'strip')
+
+
+# Whitespace other than ' ' that str.splitlines() leaves inside a line (tab, no-break space, ...)
+INLINE_WHITESPACE = ''.join(
+    chr(code) for code in range(0x3001) if chr(code).isspace() and chr(code) != ' ' and len(f"a{chr(code)}b".splitlines()) == 1
+)
+
+
+# Characters looked at to tell mostly-ASCII text from Devanagari text
+ASCII_SAMPLE_SIZE = 256
+
+
+# Normalized text: a str, so it flows through the API unchanged, that keeps the sentence offsets
+# the chunker needs once they have been found
+class NormalizedText(str):
+    def __new__(cls, text, sentence_end):
+        self = super().__new__(cls, text)
+        self._sentence_end = sentence_end
+        self._spans = None
+        return self
+
+    # Pickled (e.g. for a process pool) as the plain string
+    def __reduce__(self):
+        return (str, (str(self),))
+
+    @property
+    def text(self):
+        return str(self)
+
+    # (start, end) offsets of each sentence in text, found on first use
+    @property
+    def sentence_spans(self):
+        if self._spans is None:
+            text = self.text
+            spans = []
+            start = 0
+            for match in self._sentence_end.finditer(text):
+                end = match.end()
+                if end > start:
+                    spans.append((start, end))
+                start = end + 1 if end < len(text) and text[end] == ' ' else end
+            if start < len(text):
+                spans.append((start, len(text)))
+            self._spans = spans
+        return self._spans
+
+    # Sentences as strings, each including its closing danda
+    @property
+    def sentences(self):
+        return [self.text[start:end] for start, end in self.sentence_spans]
+
+
+# Normalizer for Nepali news text, tuned for Devanagari input. Everything
+# character-level (including inline whitespace, which becomes ' ') is folded into
+# one table built at construction and applied in a single regex pass whose
+# callback only runs where a character has to change. The pattern matches single
+# characters so re scans untouched Devanagari runs at C speed. Text that is mostly
+# ASCII would call back on nearly every character, so there the deletions run as
+# a plain substitution first. The non-ASCII deletions join the patterns only
+# when the text holds one of them:
+#   digits      - 'strip' removes ASCII digits (the old format_paragraph behaviour),
+#                 'keep' leaves them, 'devanagari' maps 0-9 to ०-९, 'ascii' maps ०-९ to 0-9
+#   nfc         - apply Unicode NFC first so composed/decomposed nukta forms match
+#   zero_width  - 'keep' or 'strip' ZWJ/ZWNJ; other invisible characters are always removed
+#   pipe_as_danda - treat '|' typed in place of a danda as '।'
+# ASCII letters and the symbols in STRIPPED_SYMBOLS are removed as before.
+class NepaliNormalizer:
+    def __init__(self, digits='devanagari', nfc=True, zero_width='keep', pipe_as_danda=True,
+                 sentence_delimiters=DANDA + DOUBLE_DANDA + '?!'):
+        if digits not in DIGIT_POLICIES:
+            raise ValueError(f"Unknown digit policy: {digits}")
+        if zero_width not in ZERO_WIDTH_POLICIES:
+            raise ValueError(f"Unknown zero-width policy: {zero_width}")
+        self.digits = digits
+        self.nfc = nfc
+        self.zero_width = zero_width
+        self.pipe_as_danda = pipe_as_danda
+        self.table = self._build_table()
+        deleted = ''.join(chr(code) for code, value in self.table.items() if value is None)
+        mapped = {chr(code): value for code, value in self.table.items() if value is not None}
+        mapped.update((char, ' ') for char in INLINE_WHITESPACE)
+        self.rare_deleted = ''.join(char for char in deleted if not char.isascii())
+        ascii_deleted = ''.join(char for char in deleted if char.isascii())
+        self.replacements = dict(mapped, **{char: '' for char in deleted})
+        # Single characters, not runs: a '+' stops re from using its fast scan for the class
+        self.ascii_pattern = re.compile('[' + re.escape(''.join(mapped) + ascii_deleted) + ']')
+        self.pattern = re.compile('[' + re.escape(''.join(self.replacements)) + ']')
+        self.ascii_delete_pattern = re.compile('[' + re.escape(ascii_deleted) + ']')
+        self.delete_pattern = re.compile('[' + re.escape(deleted) + ']')
+        self.map_pattern = re.compile('[' + re.escape(''.join(mapped)) + ']')
+        # A literal two-space prefix is found much faster than ' {2,}', which starts at every space
+        self.spaces = re.compile('  +')
+        self.sentence_end = re.compile(f"[{re.escape(sentence_delimiters)}]+")
+
+    def _build_table(self):
+        table = {}
+        for char in string.ascii_letters + STRIPPED_SYMBOLS + INVISIBLES:
+            table[ord(char)] = None
+        if self.zero_width == 'strip':
+            for char in JOINERS:
+                table[ord(char)] = None
+        if self.digits == 'strip':
+            for char in string.digits:
+                table[ord(char)] = None
+        elif self.digits == 'devanagari':
+            for ascii_digit, devanagari_digit in zip(string.digits, DEVANAGARI_DIGITS):
+                table[ord(ascii_digit)] = devanagari_digit
+        elif self.digits == 'ascii':
+            for ascii_digit, devanagari_digit in zip(string.digits, DEVANAGARI_DIGITS):
+                table[ord(devanagari_digit)] = ascii_digit
+        if self.pipe_as_danda:
+            table[ord('|')] = DANDA
+        return table
+
+    def _replace(self, match):
+        return self.replacements[match.group()]
+
+    def normalize(self, text):
+        if self.nfc and not unicodedata.is_normalized('NFC', text):
+            text = unicodedata.normalize('NFC', text)
+        rare = any(char in text for char in self.rare_deleted)
+        sample = text[:ASCII_SAMPLE_SIZE]
+        if len(sample.encode('utf-8')) < 2 * len(sample):
+            # Mostly ASCII (Devanagari letters are three bytes in UTF-8)
+            delete_pattern = self.delete_pattern if rare else self.ascii_delete_pattern
+            text = self.map_pattern.sub(self._replace, delete_pattern.sub('', text))
+        else:
+            text = (self.pattern if rare else self.ascii_pattern).sub(self._replace, text)
+        text = ' '.join(line.strip() for line in text.splitlines() if line and not line.isspace())
+        if '  ' in text:
+            text = self.spaces.sub(' ', text)
+        return NormalizedText(text, self.sentence_end)
+
+
+_default_normalizer = NepaliNormalizer()
+
+
+def get_default_normalizer():
+    return _default_normalizer
+
+
+# Function to replace the normalizer used by format_paragraph, e.g. with policies from the environment
+def set_default_normalizer(normalizer):
+    global _default_normalizer
+    _default_normalizer = normalizer
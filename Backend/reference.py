@@ -0,0 +1,114 @@
+import asyncio
+import logging
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from tracing import run_in_context
+
+logger = logging.getLogger(__name__)
+
+REFERENCE_PROMPT = "तपाईं एक पेशेवर पाठ संक्षेपक हुनुहुन्छ। तपाईंलाई दिइएको पाठको संक्षिप्त सारांश प्रदान गर्नुहोस्।\n\n"
+
+# How the reference summary is produced for a request:
+#   sync  - Gemini runs alongside mT5 and the response waits for both
+#   async - the mT5 summary is returned at once, reference/ROUGE are fetched via /jobs/<id>
+#   none  - no reference summary or ROUGE scores
+REFERENCE_MODES = ('sync', 'async', 'none')
+
+
+# Reference summaries from the Gemini API
+class GeminiReferenceClient:
+    def __init__(self, api_key, model_name="gemini-1.5-pro"):
+        import google.generativeai as genai
+        genai.configure(api_key=api_key)
+        self._genai = genai
+        self.model_name = model_name
+
+    def summarize(self, text):
+        model = self._genai.GenerativeModel(self.model_name)
+        response = model.generate_content(REFERENCE_PROMPT + text)
+        return response.text
+
+    # Same request through the library's asyncio client, for the ASGI server
+    async def summarize_async(self, text):
+        model = self._genai.GenerativeModel(self.model_name)
+        response = await model.generate_content_async(REFERENCE_PROMPT + text)
+        return response.text
+
+
+# Offline stand-in for Gemini: returns the leading sentences of the text
+class StubReferenceClient:
+    def __init__(self, num_sentences=3, delay=0.0):
+        self.num_sentences = num_sentences
+        self.delay = delay
+
+    def lead(self, text):
+        sentences = [s.strip() for s in re.split(r'(?<=[।?!])\s+', text) if s.strip()]
+        return ' '.join(sentences[:self.num_sentences])
+
+    def summarize(self, text):
+        if self.delay:
+            time.sleep(self.delay)
+        return self.lead(text)
+
+    async def summarize_async(self, text):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return self.lead(text)
+
+
+# Function to build the reference client named by REFERENCE_CLIENT
+def get_reference_client(name, api_key=None, delay=0.0):
+    if name == 'gemini':
+        return GeminiReferenceClient(api_key)
+    if name == 'stub':
+        return StubReferenceClient(delay=delay)
+    raise ValueError(f"Unknown reference client: {name}")
+
+
+# Background reference/ROUGE jobs, looked up by id from the /jobs endpoint
+class ReferenceJobStore:
+    def __init__(self, max_workers=4, max_jobs=1000):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="reference")
+        self.max_jobs = max_jobs
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit_reference(self, fn, text):
+        # In the caller's context so the reference call shows up in the request's trace
+        return self.executor.submit(run_in_context(fn), text)
+
+    # Function to register a job that scores hypothesis once reference_future resolves;
+    # on_complete(reference_summary, rouge_scores) is called when it succeeds
+    def track(self, reference_future, hypothesis, score_fn, on_complete=None):
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._jobs[job_id] = {"status": "pending", "created_at": time.time()}
+            while len(self._jobs) > self.max_jobs:
+                self._jobs.popitem(last=False)
+
+        def _finish(future):
+            try:
+                reference_summary = future.result()
+                rouge_scores = score_fn(reference_summary, hypothesis)
+                result = {"status": "done", "reference_summary": reference_summary, "rouge_scores": rouge_scores}
+                if on_complete is not None:
+                    on_complete(reference_summary, rouge_scores)
+            except Exception as e:
+                logger.error(f"Error in reference job {job_id}: {e}")
+                result = {"status": "error", "error": str(e)}
+            with self._lock:
+                if job_id in self._jobs:
+                    self._jobs[job_id].update(result)
+
+        reference_future.add_done_callback(_finish)
+        return job_id
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
@@ -0,0 +1,94 @@
+import re
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+# Devanagari letters, vowel signs and digits plus ASCII/Unicode word characters.
+# Danda (U+0964) and double danda (U+0965) are sentence punctuation, not tokens.
+TOKEN_PATTERN = re.compile(r"[\u0900-\u0963\u0966-\u097F\w]+")
+
+# Function to split text into tokens and intern them as integer ids in vocab; ids only need to
+# be consistent within one pair, so each pair gets its own vocab
+def tokenize_ids(text, vocab):
+    ids = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        token_id = vocab.get(token)
+        if token_id is None:
+            token_id = vocab[token] = len(vocab)
+        ids.append(token_id)
+    return ids
+
+
+def _ngrams(ids, n):
+    if n == 1:
+        return Counter(ids)
+    return Counter(zip(*[ids[i:] for i in range(n)]))
+
+
+# Function to compute the LCS length with the bit-parallel algorithm (Allison-Dix / Hyyrö):
+# one big-int update per token of b instead of a len(a) x len(b) table
+def lcs_length(a, b):
+    if not a or not b:
+        return 0
+    masks = {}
+    for index, token in enumerate(a):
+        masks[token] = masks.get(token, 0) | (1 << index)
+    full = (1 << len(a)) - 1
+    v = full
+    for token in b:
+        u = v & masks.get(token, 0)
+        v = ((v + u) | (v - u)) & full
+    return len(a) - bin(v).count('1')
+
+
+def _prf(overlap, hyp_count, ref_count):
+    precision = overlap / hyp_count if hyp_count else 0.0
+    recall = overlap / ref_count if ref_count else 0.0
+    fmeasure = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {"precision": precision, "recall": recall, "fmeasure": fmeasure}
+
+
+# Function to score one hypothesis against one reference; returns the same
+# rouge1/rouge2/rougeL precision/recall/fmeasure shape the API has always returned
+def score_pair(reference, hypothesis):
+    vocab = {}
+    ref_ids = tokenize_ids(reference, vocab)
+    hyp_ids = tokenize_ids(hypothesis, vocab)
+    scores = {}
+    for name, n in (("rouge1", 1), ("rouge2", 2)):
+        ref_ngrams = _ngrams(ref_ids, n)
+        hyp_ngrams = _ngrams(hyp_ids, n)
+        overlap = sum((ref_ngrams & hyp_ngrams).values())
+        scores[name] = _prf(overlap, max(len(hyp_ids) - n + 1, 0), max(len(ref_ids) - n + 1, 0))
+    scores["rougeL"] = _prf(lcs_length(ref_ids, hyp_ids), len(hyp_ids), len(ref_ids))
+    return scores
+
+
+def _score_pairs(pairs):
+    return [score_pair(reference, hypothesis) for reference, hypothesis in pairs]
+
+
+# Function to score many pairs; with processes > 1 the pairs are split across a process pool
+def score_batch(references, hypotheses, processes=None, chunk_size=256):
+    pairs = list(zip(references, hypotheses))
+    if not processes or processes <= 1 or len(pairs) <= chunk_size:
+        return _score_pairs(pairs)
+    chunks = [pairs[start:start + chunk_size] for start in range(0, len(pairs), chunk_size)]
+    scores = []
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        for chunk_scores in executor.map(_score_pairs, chunks):
+            scores.extend(chunk_scores)
+    return scores
+
+
+# Function to average per-pair scores into corpus-level ROUGE
+def corpus_scores(scores):
+    totals = {name: {"precision": 0.0, "recall": 0.0, "fmeasure": 0.0} for name in ("rouge1", "rouge2", "rougeL")}
+    for pair_scores in scores:
+        for name, values in pair_scores.items():
+            for key, value in values.items():
+                totals[name][key] += value
+    count = len(scores)
+    return {
+        name: {key: (value / count if count else 0.0) for key, value in values.items()}
+        for name, values in totals.items()
+    }
@@ -0,0 +1,226 @@
+import logging
+import queue
+import threading
+from scoring import score_pair
+from cache import make_cache_key
+from normalize import get_default_normalizer
+from chunking import DEFAULT_TOKEN_BUDGET, chunk_token_ids, get_token_cache, prompt_token_ids
+from batching import encode_prompts, generate_batch, get_draft_model
+from deadline import DeadlineExceeded, current_deadline
+from tracing import run_in_context, span
+
+logger = logging.getLogger(__name__)
+
+# Generation settings for each summary length (also part of the cache key)
+LONG_GENERATE_KWARGS = dict(num_beams=4, length_penalty=0.1, early_stopping=True)
+SHORT_GENERATE_KWARGS = dict(num_beams=5, length_penalty=0.1, early_stopping=True)
+
+# Named decoding presets selectable per request. 'quality' is the beam search above that each
+# length has always used; the others trade ROUGE for latency and cap the summary at max_length.
+# 'assisted' is greedy decoding checked against a draft model (see batching.set_draft_model).
+GENERATION_PROFILES = {
+    'fast': dict(num_beams=1, do_sample=False, max_length=128),
+    'balanced': dict(num_beams=2, length_penalty=0.1, early_stopping=True, max_length=256),
+    'quality': {},
+    'assisted': dict(num_beams=1, do_sample=False, max_length=512, assisted=True),
+}
+DEFAULT_PROFILE = 'quality'
+
+# Chunks per generate call when summarizing without a batcher
+DEFAULT_BATCH_SIZE = 8
+
+# Hierarchical mode: summary length of each chunk in the map stage and the maximum number of levels
+DEFAULT_MAP_LENGTH = 128
+DEFAULT_MAX_DEPTH = 3
+
+# Function to build the generate kwargs of one call from the length's defaults and a profile
+def decoding_kwargs(base_kwargs, max_summary_length, profile=None):
+    profile_kwargs = GENERATION_PROFILES[profile or DEFAULT_PROFILE]
+    if not profile_kwargs:
+        return dict(base_kwargs, max_length=max_summary_length)
+    return dict(profile_kwargs, max_length=min(profile_kwargs['max_length'], max_summary_length))
+
+# Function to format the input paragraph (see normalize.py for the policies); the result is a
+# NormalizedText, so the chunker reuses its sentence offsets instead of splitting again
+def format_paragraph(text, normalizer=None):
+    with span('format'):
+        return (normalizer or get_default_normalizer()).normalize(text)
+
+# Function to summarize pre-tokenized chunks (from chunking.chunk_token_ids) in padded batches
+def summary_chunks(chunk_ids, model, tokenizer, max_summary_length, batcher=None,
+                   token_budget=DEFAULT_TOKEN_BUDGET, max_batch_size=DEFAULT_BATCH_SIZE, profile=None):
+    generate_kwargs = decoding_kwargs(LONG_GENERATE_KWARGS, max_summary_length, profile)
+    if batcher is not None:
+        return batcher.summarize_many(chunk_ids, token_budget, **generate_kwargs)
+    summaries = []
+    for start in range(0, len(chunk_ids), max_batch_size):
+        summaries.extend(generate_batch(
+            model, tokenizer, chunk_ids[start:start + max_batch_size], token_budget, **generate_kwargs
+        ))
+    return summaries
+
+# Function to generate long summaries with mT5; the text is packed into chunks of
+# at most token_budget tokens at sentence boundaries
+def summary_nepali(text, model, tokenizer, max_summary_length=512, batcher=None, token_budget=DEFAULT_TOKEN_BUDGET,
+                   profile=None):
+    chunk_ids = chunk_token_ids(text, tokenizer, token_budget)
+    summaries = summary_chunks(
+        chunk_ids, model, tokenizer, max_summary_length, batcher=batcher, token_budget=token_budget, profile=profile
+    )
+    return ' '.join(summaries)
+
+# Function to summarize one level of the hierarchy: every chunk of the text at map_length tokens.
+# Levels are cached by their input text, so a later request with another target reuses them.
+def summary_level(text, chunk_ids, model, tokenizer, map_length, batcher=None, token_budget=DEFAULT_TOKEN_BUDGET,
+                  map_cache=None, cache_namespace='', profile=None):
+    cache_key = None
+    if map_cache is not None:
+        map_params = dict(decoding_kwargs(LONG_GENERATE_KWARGS, map_length, profile), token_budget=token_budget)
+        cache_key = make_cache_key(text, 'map', cache_namespace, map_params)
+        cached = map_cache.get(cache_key)
+        if cached is not None:
+            return cached['summaries']
+    summaries = summary_chunks(
+        chunk_ids, model, tokenizer, map_length, batcher=batcher, token_budget=token_budget, profile=profile
+    )
+    if cache_key is not None:
+        map_cache.set(cache_key, {'summaries': summaries})
+    return summaries
+
+# Function to generate a summary of at most target_length tokens with map-reduce: the chunks are
+# summarized in batches, their joined summaries are summarized again level by level until they
+# fit, and a final generate call (with final_kwargs) condenses whatever is left after max_depth levels
+def summary_hierarchical(text, model, tokenizer, target_length, final_kwargs=LONG_GENERATE_KWARGS, batcher=None,
+                         token_budget=DEFAULT_TOKEN_BUDGET, map_length=DEFAULT_MAP_LENGTH,
+                         max_depth=DEFAULT_MAX_DEPTH, map_cache=None, cache_namespace='', profile=None):
+    level_text = text
+    for _ in range(max_depth):
+        chunk_ids = chunk_token_ids(level_text, tokenizer, token_budget)
+        if len(chunk_ids) <= 1:
+            break
+        summaries = summary_level(
+            level_text, chunk_ids, model, tokenizer, map_length, batcher=batcher, token_budget=token_budget,
+            map_cache=map_cache, cache_namespace=cache_namespace, profile=profile
+        )
+        level_text = ' '.join(summaries)
+        if get_token_cache(tokenizer).count(level_text) <= target_length:
+            return level_text
+    generate_kwargs = decoding_kwargs(final_kwargs, target_length, profile)
+    prompt = prompt_token_ids(level_text, tokenizer, token_budget)
+    if batcher is not None:
+        return batcher.summarize(prompt, token_budget, **generate_kwargs)
+    return generate_batch(model, tokenizer, [prompt], token_budget, **generate_kwargs)[0]
+
+# Function to generate short summaries using mT5; the prompt ids come from the token cache
+def mt5Summary(text, model, tokenizer, max_summary_length=512, batcher=None, profile=None):
+    generate_kwargs = decoding_kwargs(SHORT_GENERATE_KWARGS, max_summary_length, profile)
+    prompt = prompt_token_ids(text, tokenizer, max_summary_length)
+    if batcher is not None:
+        return batcher.summarize(prompt, max_summary_length, **generate_kwargs)
+    return generate_batch(model, tokenizer, [prompt], max_summary_length, **generate_kwargs)[0]
+
+# Function to queue every chunk of a long text on the batcher without waiting;
+# join_summaries() turns the returned futures into the final summary
+def submit_summary_nepali(text, batcher, max_summary_length=512, token_budget=DEFAULT_TOKEN_BUDGET, profile=None):
+    chunk_ids = chunk_token_ids(text, batcher.tokenizer, token_budget)
+    generate_kwargs = decoding_kwargs(LONG_GENERATE_KWARGS, max_summary_length, profile)
+    return batcher.submit_many(chunk_ids, token_budget, **generate_kwargs)
+
+def join_summaries(futures):
+    return ' '.join(future.result() for future in futures)
+
+# Function to queue a short summary on the batcher without waiting
+def submit_mt5Summary(text, batcher, max_summary_length=512, profile=None):
+    generate_kwargs = decoding_kwargs(SHORT_GENERATE_KWARGS, max_summary_length, profile)
+    prompt = prompt_token_ids(text, batcher.tokenizer, max_summary_length)
+    return batcher.submit(prompt, max_summary_length, **generate_kwargs)
+
+# Decoding for token streaming; transformers streamers do not support beam search
+STREAM_GREEDY_KWARGS = dict(num_beams=1, do_sample=False)
+STREAM_SAMPLE_KWARGS = dict(num_beams=1, do_sample=True, top_p=0.9, temperature=0.7)
+STREAM_STALL_SECONDS = 5.0
+
+# Function to yield each chunk's summary of a long text as soon as it is decoded.
+# The first chunk runs on its own so it reaches the client quickly; the rest share batches.
+def stream_summary_nepali(text, model, tokenizer, max_summary_length=512, batcher=None, token_budget=DEFAULT_TOKEN_BUDGET,
+                          profile=None):
+    chunk_ids = chunk_token_ids(text, tokenizer, token_budget)
+    if not chunk_ids:
+        return
+    yield summary_chunks(
+        chunk_ids[:1], model, tokenizer, max_summary_length, batcher=batcher, token_budget=token_budget, profile=profile
+    )[0]
+    rest = chunk_ids[1:]
+    if batcher is not None:
+        generate_kwargs = decoding_kwargs(LONG_GENERATE_KWARGS, max_summary_length, profile)
+        futures = batcher.submit_many(rest, token_budget, **generate_kwargs)
+        for future in futures:
+            yield future.result()
+    else:
+        for ids in rest:
+            yield summary_chunks([ids], model, tokenizer, max_summary_length, token_budget=token_budget, profile=profile)[0]
+
+# Function to yield decoded text pieces of a short summary while generate is still running. Beams
+# cannot be streamed, so a profile only contributes its length cap and, for 'assisted', the draft model.
+# Generation stops at the request's deadline (max_time) and as soon as the caller closes the generator.
+def stream_mt5Summary(text, model, tokenizer, max_summary_length=512, do_sample=False, profile=None):
+    from transformers import StoppingCriteria, StoppingCriteriaList, TextIteratorStreamer
+    inputs = encode_prompts(tokenizer, [prompt_token_ids(text, tokenizer, max_summary_length)], max_summary_length)
+    deadline = current_deadline()
+    stopped = threading.Event()
+
+    class ConsumerGone(StoppingCriteria):
+        def __call__(self, input_ids, scores, **kwargs):
+            return stopped.is_set()
+
+    # Waiting for a piece gives up a little after generate should have hit max_time
+    timeout = deadline.remaining() + STREAM_STALL_SECONDS if deadline is not None else None
+    streamer = TextIteratorStreamer(tokenizer, skip_prompt=True, skip_special_tokens=True, timeout=timeout)
+    profile_kwargs = GENERATION_PROFILES[profile or DEFAULT_PROFILE]
+    generate_kwargs = dict(STREAM_SAMPLE_KWARGS if do_sample else STREAM_GREEDY_KWARGS)
+    generate_kwargs['max_length'] = min(profile_kwargs.get('max_length', max_summary_length), max_summary_length)
+    if profile_kwargs.get('assisted'):
+        if do_sample or get_draft_model() is None:
+            raise ValueError("The assisted profile streams greedily and needs a draft model, set DRAFT_MODEL_ID")
+        generate_kwargs['assistant_model'] = get_draft_model()
+    if deadline is not None:
+        deadline.check('generate')
+        generate_kwargs['max_time'] = deadline.remaining()
+    generate_kwargs['stopping_criteria'] = StoppingCriteriaList([ConsumerGone()])
+    errors = []
+
+    def run():
+        try:
+            model.generate(
+                inputs.input_ids.to(model.device),
+                attention_mask=inputs.attention_mask.to(model.device),
+                streamer=streamer,
+                **generate_kwargs
+            )
+        except Exception as e:
+            errors.append(e)
+            streamer.end()
+
+    thread = threading.Thread(target=run_in_context(run), name="mt5-stream", daemon=True)
+    thread.start()
+    try:
+        for piece in streamer:
+            if piece:
+                yield piece
+    except queue.Empty:
+        raise DeadlineExceeded(f"Deadline of {deadline.seconds:g}s exceeded while streaming")
+    finally:
+        # Also reached when the client went away and the generator was closed early
+        stopped.set()
+    thread.join()
+    if errors:
+        raise errors[0]
+
+# ROUGE score calculator using the Devanagari-aware scorer in scoring.py
+def calculate_rouge_scores(reference, hypothesis):
+    logger.info("Gemini Reference: %s", reference)
+    logger.info("mT5 Hypothesis: %s", hypothesis)
+    with span('rouge'):
+        scores = score_pair(reference, hypothesis)
+    logger.info("ROUGE Scores: %s", scores)
+    return scores
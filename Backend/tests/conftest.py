@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The backend modules are flat files in Backend/, imported the way app.py imports them
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
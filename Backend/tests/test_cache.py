@@ -0,0 +1,45 @@
+import sqlite3
+import time
+
+import cache
+from cache import SummaryCache
+
+
+def count_rows(path):
+    with sqlite3.connect(path) as conn:
+        return conn.execute("SELECT COUNT(*) FROM summaries").fetchone()[0]
+
+
+def test_purge_expired_deletes_old_rows(tmp_path):
+    path = str(tmp_path / "summaries.db")
+    summary_cache = SummaryCache(max_entries=4, ttl_seconds=60, disk_path=path)
+    summary_cache.disk.set("old", {"hypothesis_summary": "a"}, time.time() - 120)
+    summary_cache.disk.set("new", {"hypothesis_summary": "b"}, time.time())
+
+    assert summary_cache.disk.purge_expired(60) == 1
+    assert count_rows(path) == 1
+    assert summary_cache.get("new") == {"hypothesis_summary": "b"}
+
+
+def test_writes_purge_expired_rows(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, "PURGE_EVERY_WRITES", 3)
+    path = str(tmp_path / "summaries.db")
+    summary_cache = SummaryCache(max_entries=4, ttl_seconds=60, disk_path=path)
+    for index in range(5):
+        summary_cache.disk.set(f"old-{index}", {"hypothesis_summary": "x"}, time.time() - 120)
+
+    summary_cache.set("a", {"hypothesis_summary": "a"})
+    summary_cache.set("b", {"hypothesis_summary": "b"})
+    assert count_rows(path) == 7
+    summary_cache.set("c", {"hypothesis_summary": "c"})
+    assert count_rows(path) == 3
+
+
+def test_peek_leaves_the_hit_ratio_to_record():
+    summary_cache = SummaryCache(max_entries=4, ttl_seconds=60)
+    summary_cache.set("a", {"hypothesis_summary": "a"})
+    assert summary_cache.peek("b") is None
+    assert summary_cache.peek("a") == {"hypothesis_summary": "a"}
+    summary_cache.record(True)
+    stats = summary_cache.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_ratio"]) == (1, 0, 1.0)
@@ -0,0 +1,69 @@
+import os
+
+from dedup import MinHashIndex
+
+
+def article(topic):
+    return " ".join(f"{topic} word{index}" for index in range(60))
+
+
+def test_forked_workers_merge_their_entries(tmp_path):
+    path = str(tmp_path / "index.npz")
+    index = MinHashIndex(threshold=0.8)
+    index.add("base", article("base"))
+    index.save(path)
+
+    # Like gunicorn --preload: the workers inherit the master's index and its atexit save
+    children = []
+    for name in ("first", "second"):
+        pid = os.fork()
+        if pid == 0:
+            index.add(name, article(name))
+            index.save(path)
+            os._exit(0)
+        children.append(pid)
+    for pid in children:
+        assert os.waitpid(pid, 0)[1] == 0
+    # The master added nothing after forking, so its save must not overwrite the workers' entries
+    assert index.save(path) is False
+
+    loaded = MinHashIndex.load(path)
+    assert len(loaded) == 3
+    for name in ("base", "first", "second"):
+        assert loaded.query(article(name))[0][0] == name
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp.npz")]
+
+
+def test_index_is_bounded_and_forgets_discarded_keys(tmp_path):
+    index = MinHashIndex(threshold=0.8, max_entries=2)
+    for name in ("a", "b", "c"):
+        index.add(name, article(name))
+    assert len(index) == 2
+    assert index.query(article("a")) == []
+    assert index.query(article("c"))[0][0] == "c"
+
+    assert index.discard("c")
+    assert index.query(article("c")) == []
+    path = str(tmp_path / "index.npz")
+    index.save(path)
+    assert MinHashIndex.load(path).keys == ["b"]
+
+
+def test_expired_entries_stop_matching():
+    index = MinHashIndex(threshold=0.8, ttl_seconds=60)
+    index.add("old", article("old"))
+    index._added_at[0] -= 120
+    assert index.query(article("old")) == []
+
+
+def test_load_takes_the_new_threshold(tmp_path):
+    path = str(tmp_path / "index.npz")
+    index = MinHashIndex(threshold=0.9)
+    index.add("a", article("a"))
+    index.save(path)
+
+    loaded = MinHashIndex.load(path, threshold=0.5)
+    assert loaded.threshold == 0.5
+    assert (loaded.bands, loaded.rows) == (MinHashIndex(threshold=0.5).bands, MinHashIndex(threshold=0.5).rows)
+    assert (loaded.bands, loaded.rows) != (index.bands, index.rows)
+    assert loaded.query(article("a"))[0][0] == "a"
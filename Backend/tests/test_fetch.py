@@ -0,0 +1,39 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from Scrapper.fetch import Fetcher
+from deadline import DeadlineExceeded, end_deadline, start_deadline
+
+
+class Unavailable(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(503)
+        self.send_header('Retry-After', '4')
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def unavailable_url():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Unavailable)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/"
+    server.shutdown()
+    server.server_close()
+
+
+def test_retry_after_does_not_outlast_the_deadline(unavailable_url):
+    _, token = start_deadline(1.0)
+    started = time.monotonic()
+    try:
+        with pytest.raises(DeadlineExceeded):
+            Fetcher(retries=2).get_content(unavailable_url)
+    finally:
+        end_deadline(token)
+    assert time.monotonic() - started < 2.0
@@ -0,0 +1,38 @@
+import threading
+
+import pytest
+
+from jobqueue import RedisJobQueue
+
+
+@pytest.fixture
+def redis_queue():
+    fakeredis = pytest.importorskip('fakeredis')
+    pytest.importorskip('lupa')  # fakeredis runs Lua scripts through lupa
+    return RedisJobQueue(fakeredis.FakeRedis(), claim_timeout=0)
+
+
+def test_claimed_jobs_are_leased_in_the_same_step(redis_queue):
+    short_id = redis_queue.enqueue({"text": "a"}, lane='short')
+    long_id = redis_queue.enqueue({"text": "b"}, lane='long')
+    jobs = redis_queue.claim("worker", max_jobs=8, wait=0)
+    assert [job["job_id"] for job in jobs] == [short_id, long_id]
+    assert redis_queue.stats()["running"] == 2
+    assert redis_queue.get(short_id)["status"] == 'running'
+
+
+def test_jobs_of_a_dead_worker_are_requeued(redis_queue):
+    job_id = redis_queue.enqueue({"text": "a"}, lane='long')
+    redis_queue.claim("dead-worker", max_jobs=1, wait=0)
+    assert redis_queue.depth() == 0
+    assert redis_queue.maintain() == 1
+    assert redis_queue.maintain() == 0
+    assert [job["job_id"] for job in redis_queue.claim("worker", wait=0)] == [job_id]
+
+
+def test_idle_claim_wakes_up_on_enqueue(redis_queue):
+    timer = threading.Timer(0.1, redis_queue.enqueue, args=({"text": "a"},))
+    timer.start()
+    jobs = redis_queue.claim("worker", wait=5)
+    timer.join()
+    assert len(jobs) == 1
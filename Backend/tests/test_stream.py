@@ -0,0 +1,58 @@
+import threading
+import types
+
+import numpy as np
+import pytest
+
+import summarizer
+from deadline import end_deadline, start_deadline
+
+
+class FakeTokenizer:
+    def decode(self, ids, **kwargs):
+        return ''.join(f"t{token} " for token in ids)
+
+
+# Generates one token every few milliseconds until a stopping criterion fires or max_length is reached
+class FakeModel:
+    device = 'cpu'
+
+    def __init__(self):
+        self.kwargs = None
+        self.steps = 0
+        self.finished = threading.Event()
+
+    def generate(self, input_ids, attention_mask=None, streamer=None, stopping_criteria=None, **kwargs):
+        self.kwargs = kwargs
+        streamer.put(np.array([[0]]))
+        for step in range(kwargs['max_length']):
+            if any(criterion(None, None) for criterion in stopping_criteria):
+                break
+            self.steps += 1
+            streamer.put(np.array([step + 1]))
+            threading.Event().wait(0.005)
+        streamer.end()
+        self.finished.set()
+
+
+def stub_inputs(monkeypatch):
+    tensor = types.SimpleNamespace(to=lambda device: None)
+    inputs = types.SimpleNamespace(input_ids=tensor, attention_mask=tensor)
+    monkeypatch.setattr(summarizer, 'prompt_token_ids', lambda text, tokenizer, max_length: [1])
+    monkeypatch.setattr(summarizer, 'encode_prompts', lambda tokenizer, prompts, max_length: inputs)
+
+
+def test_stream_generate_gets_the_deadline_and_stops_when_closed(monkeypatch):
+    pytest.importorskip('torch')
+    stub_inputs(monkeypatch)
+    model = FakeModel()
+    _, token = start_deadline(30)
+    try:
+        stream = summarizer.stream_mt5Summary("text", model, FakeTokenizer(), max_summary_length=500)
+        assert next(stream)
+        stream.close()
+    finally:
+        end_deadline(token)
+    assert model.finished.wait(2)
+    assert 0 < model.kwargs['max_time'] <= 30
+    assert model.steps < 500
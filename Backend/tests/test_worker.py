@@ -0,0 +1,42 @@
+import threading
+
+import worker
+from jobqueue import SqliteJobQueue, callback_allowed
+from worker import InferenceWorker
+
+
+def test_long_job_does_not_hold_back_the_next_claim():
+    job_queue = SqliteJobQueue()
+    release_long = threading.Event()
+
+    def summarize(payload):
+        if payload["name"] == "long":
+            release_long.wait(5)
+        return {"hypothesis_summary": payload["name"]}
+
+    inference_worker = InferenceWorker(job_queue, summarize, batch_size=2, claim_wait=0.05)
+    long_id = job_queue.enqueue({"name": "long"}, lane="long")
+    assert inference_worker.run_once() == 1
+    short_id = job_queue.enqueue({"name": "short"}, lane="short")
+    assert inference_worker.run_once() == 1
+    assert job_queue.wait(short_id, 2)["status"] == "done"
+    assert job_queue.get(long_id)["status"] == "running"
+    release_long.set()
+    assert job_queue.wait(long_id, 2)["status"] == "done"
+
+
+def test_callbacks_only_reach_allowed_hosts(monkeypatch):
+    assert callback_allowed("https://hooks.example.com/done", {"hooks.example.com"})
+    assert not callback_allowed("http://169.254.169.254/latest", {"hooks.example.com"})
+    assert not callback_allowed("file://hooks.example.com/x", {"hooks.example.com"})
+
+    posted = []
+    monkeypatch.setattr(worker.requests, "post", lambda url, **kwargs: posted.append(url))
+    job_queue = SqliteJobQueue()
+    job_id = job_queue.enqueue({"name": "a"}, lane="short", callback="http://127.0.0.1:6379/")
+    inference_worker = InferenceWorker(job_queue, lambda payload: {"hypothesis_summary": "a"},
+                                       claim_wait=0.05, callback_hosts={"hooks.example.com"})
+    inference_worker.run_once()
+    inference_worker.executor.shutdown(wait=True)
+    assert job_queue.get(job_id)["status"] == "done"
+    assert posted == []
@@ -0,0 +1,253 @@
+import bisect
+import contextlib
+import contextvars
+import itertools
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds in seconds of the latency histograms, from cache hits to long-mode generation
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+COUNT_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in labels)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(labels, escaped)) + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+# Prometheus histogram with free-form labels, kept per process
+class Histogram:
+    def __init__(self, name, description, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def exposition(self):
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {key: (list(counts), total, count) for key, (counts, total, count) in self._series.items()}
+        for key, (counts, total, count) in sorted(series.items()):
+            for bound, cumulative in zip(self.buckets, itertools.accumulate(counts)):
+                lines.append(f"{self.name}_bucket{_format_labels(key + (('le', _format_value(bound)),))} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(key + (('le', '+Inf'),))} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+        return lines
+
+
+# Prometheus counter with free-form labels, kept per process
+class Counter:
+    def __init__(self, name, description):
+        self.name = name
+        self.description = description
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def inc(self, value=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + value
+
+    def exposition(self):
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            series = dict(self._series)
+        for key, value in sorted(series.items()):
+            lines.append(f"{self.name}{_format_labels(key)} {value}")
+        return lines
+
+
+# Prometheus gauge whose value is read from a callback at scrape time
+class Gauge:
+    def __init__(self, name, description, read_fn):
+        self.name = name
+        self.description = description
+        self.read_fn = read_fn
+
+    def exposition(self):
+        try:
+            value = self.read_fn()
+        except Exception as e:
+            logger.warning(f"Gauge {self.name} failed: {e}")
+            value = None
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} gauge"]
+        if value is not None:
+            lines.append(f"{self.name} {value}")
+        return lines
+
+
+STAGE_SECONDS = Histogram("summarizer_stage_seconds", "Time spent in each stage of a request")
+REQUEST_SECONDS = Histogram("summarizer_request_seconds", "Time to answer a request, by route and status")
+CHUNKS = Histogram("summarizer_chunks", "Model input chunks per summarized text", COUNT_BUCKETS)
+GENERATED_TOKENS = Histogram("summarizer_generated_tokens", "Tokens generated per summary", COUNT_BUCKETS)
+BATCH_SIZE = Histogram("summarizer_generate_batch_size", "Sequences per generate call", COUNT_BUCKETS)
+
+_metrics = [STAGE_SECONDS, REQUEST_SECONDS, CHUNKS, GENERATED_TOKENS, BATCH_SIZE]
+
+
+# Function to add a metric (e.g. a Gauge over /stats values) to the /metrics output
+def register_metric(metric):
+    _metrics.append(metric)
+    return metric
+
+
+def metrics_text():
+    return '\n'.join(line for metric in _metrics for line in metric.exposition()) + '\n'
+
+
+# Stages and counts of one request. Spans from other threads land here too when the work was
+# submitted with the request's context (see run_in_context), so appends are locked.
+class Trace:
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.stages = {}
+        self.counts = {}
+        self._lock = threading.Lock()
+
+    def add_span(self, stage, seconds):
+        with self._lock:
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def add_count(self, name, value):
+        with self._lock:
+            self.counts[name] = self.counts.get(name, 0) + value
+
+    # Function to build the optional per-stage breakdown returned with a response
+    def breakdown(self):
+        with self._lock:
+            return dict(
+                {f"{stage}_ms": seconds * 1000.0 for stage, seconds in self.stages.items()},
+                total_ms=(time.perf_counter() - self.started_at) * 1000.0,
+                **self.counts
+            )
+
+
+_current_trace = contextvars.ContextVar('trace', default=None)
+
+
+def start_trace():
+    trace = Trace()
+    return trace, _current_trace.set(trace)
+
+
+def end_trace(token):
+    try:
+        _current_trace.reset(token)
+    except ValueError:
+        # Ended from another context, e.g. a streamed response finished by another thread
+        _current_trace.set(None)
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+# Function to time a stage: the duration goes to summarizer_stage_seconds with the given labels
+# and, inside a request, to the request's trace
+@contextlib.contextmanager
+def span(stage, **labels):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        STAGE_SECONDS.observe(seconds, stage=stage, **labels)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add_span(stage, seconds)
+
+
+# Function to record a per-request count (chunks, generated tokens) in its histogram and the trace
+def record_count(name, value, histogram=None):
+    if histogram is not None:
+        histogram.observe(value)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add_count(name, value)
+
+
+# Function to wrap fn so it runs in the caller's context (and trace) on an executor thread
+def run_in_context(fn):
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.run(fn, *args, **kwargs)
+
+
+# Profiles 1 in every sample_every requests and writes each profile to directory:
+# cProfile .prof files (open with pstats or snakeviz), or pyinstrument .html pages
+class SamplingProfiler:
+    def __init__(self, sample_every=0, directory='profiles', engine='cprofile'):
+        if engine not in ('cprofile', 'pyinstrument'):
+            raise ValueError(f"Unknown profiler: {engine}, expected cprofile or pyinstrument")
+        self.sample_every = sample_every
+        self.directory = directory
+        self.engine = engine
+        self._counter = itertools.count(1)
+
+    def _new_profiler(self):
+        if self.engine == 'pyinstrument':
+            try:
+                from pyinstrument import Profiler
+            except ImportError:
+                raise ImportError("PROFILER=pyinstrument needs pyinstrument: pip install pyinstrument")
+            profiler = Profiler(async_mode='enabled')
+            profiler.start()
+            return profiler
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+
+    # Function to start profiling this request if it is sampled; returns a handle for stop() or None
+    def start(self):
+        if self.sample_every <= 0:
+            return None
+        number = next(self._counter)
+        if number % self.sample_every:
+            return None
+        try:
+            return number, self._new_profiler()
+        except ValueError as e:
+            # Python 3.12+ allows one active cProfile at a time; skip this sample
+            logger.warning(f"Profiler not started: {e}")
+            return None
+
+    # Function to stop a sampled profile and write it; returns the file path
+    def stop(self, handle, name):
+        if handle is None:
+            return None
+        number, profiler = handle
+        os.makedirs(self.directory, exist_ok=True)
+        stem = os.path.join(self.directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{number}-{name}")
+        if self.engine == 'pyinstrument':
+            profiler.stop()
+            path = stem + '.html'
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(profiler.output_html())
+        else:
+            profiler.disable()
+            path = stem + '.prof'
+            profiler.dump_stats(path)
+        return path
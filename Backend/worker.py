@@ -0,0 +1,130 @@
+# Inference worker for the API's JOB_QUEUE mode: loads the model, claims summary jobs from JOB_QUEUE
+# in batches and writes the results back. Up to batch_size jobs are summarized side by side so
+# their chunks meet in the batcher, and a slot is refilled as soon as its job finishes. Run as
+# many workers as the hardware allows, on any host that reaches the queue; each one reads the
+# same environment as app.py.
+#
+#   cd Backend && JOB_QUEUE=redis://localhost:6379/0 python worker.py
+import argparse
+import logging
+import os
+import socket
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import requests
+
+from deadline import end_deadline, start_deadline
+from jobqueue import callback_allowed, public_job
+
+logger = logging.getLogger(__name__)
+
+
+class InferenceWorker:
+    def __init__(self, job_queue, summarize_fn, batch_size=8, worker_id=None, claim_wait=1.0,
+                 maintain_every=30.0, callback_timeout=5.0, callback_hosts=()):
+        self.job_queue = job_queue
+        self.summarize_fn = summarize_fn
+        self.batch_size = batch_size
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.claim_wait = claim_wait
+        self.maintain_every = maintain_every
+        self.callback_timeout = callback_timeout
+        self.callback_hosts = callback_hosts
+        self.executor = ThreadPoolExecutor(max_workers=batch_size, thread_name_prefix="job")
+        self._running = set()
+        self.processed = 0
+
+    # Function to summarize one job within what is left of its deadline and record the outcome
+    def _run_job(self, job):
+        deadline_token = None
+        remaining = job["deadline_at"] - time.time() if job["deadline_at"] is not None else None
+        try:
+            if remaining is not None and remaining <= 0:
+                self.job_queue.fail(job["job_id"], "Deadline passed while queued", status='expired')
+            else:
+                if remaining is not None:
+                    _, deadline_token = start_deadline(remaining)
+                self.job_queue.complete(job["job_id"], self.summarize_fn(job["payload"]))
+        except Exception as e:
+            logger.error(f"Error in job {job['job_id']}: {e}")
+            self.job_queue.fail(job["job_id"], f"Error during processing: {str(e)}")
+        finally:
+            if deadline_token is not None:
+                end_deadline(deadline_token)
+        if job["callback"]:
+            self._send_callback(job)
+
+    # Function to POST the finished job, as GET /summaries/<job_id> shows it, to its callback url.
+    # The url is checked against callback_hosts again, since anything may have written the queue,
+    # and redirects are not followed so they cannot lead elsewhere.
+    def _send_callback(self, job):
+        if not callback_allowed(job["callback"], self.callback_hosts):
+            logger.warning(f"Not calling back {job['callback']} for job {job['job_id']}: host not in JOB_CALLBACK_HOSTS")
+            return
+        try:
+            body = public_job(self.job_queue.get(job["job_id"]))
+            requests.post(job["callback"], json=body, timeout=self.callback_timeout,
+                          allow_redirects=False).raise_for_status()
+        except Exception as e:
+            logger.warning(f"Callback for job {job['job_id']} to {job['callback']} failed: {e}")
+
+    def _collect(self, finished):
+        self._running -= finished
+        self.processed += len(finished)
+
+    # Function to claim jobs for the free slots, or with every slot busy to wait for the first job
+    # to finish, so one long job never keeps the others from being claimed; returns the jobs claimed
+    def run_once(self):
+        self._collect({future for future in self._running if future.done()})
+        if len(self._running) >= self.batch_size:
+            finished, _ = wait(self._running, timeout=self.claim_wait, return_when=FIRST_COMPLETED)
+            self._collect(finished)
+            return 0
+        jobs = self.job_queue.claim(self.worker_id, max_jobs=self.batch_size - len(self._running), wait=self.claim_wait)
+        self._running.update(self.executor.submit(self._run_job, job) for job in jobs)
+        return len(jobs)
+
+    def run(self, stop_event=None):
+        stop_event = stop_event or threading.Event()
+        last_maintained = 0.0
+        logger.info(f"Worker {self.worker_id} taking up to {self.batch_size} jobs at a time")
+        while not stop_event.is_set():
+            if time.monotonic() - last_maintained > self.maintain_every:
+                self.job_queue.maintain()
+                last_maintained = time.monotonic()
+            self.run_once()
+        self._collect(wait(self._running)[0])
+        self.executor.shutdown(wait=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run summary jobs from JOB_QUEUE on this host's model")
+    parser.add_argument('--batch-size', type=int, default=int(os.getenv("WORKER_BATCH_SIZE", os.getenv("BATCH_MAX_SIZE", "8"))))
+    parser.add_argument('--claim-wait', type=float, default=1.0, help="Seconds to block waiting for jobs")
+    args = parser.parse_args()
+
+    # Imported here so the API settings (model, profiles, strategy, caches) come from the same environment
+    import app
+
+    if app.job_queue is None:
+        raise SystemExit("Set JOB_QUEUE to the queue the API enqueues to")
+    app.model_holder.load()
+    if app.model_holder.state != 'ready':
+        raise SystemExit(f"Model failed to load: {app.model_holder.error}")
+
+    def summarize_job(payload):
+        selected_length = payload["selected_length"]
+        model, tokenizer, batcher = app.get_summarizer_state(selected_length)
+        hypothesis_summary = app.summarize_text(
+            payload["text"], selected_length, model, tokenizer, batcher, payload["profile"]
+        )
+        return {"hypothesis_summary": hypothesis_summary}
+
+    InferenceWorker(app.job_queue, summarize_job, batch_size=args.batch_size, claim_wait=args.claim_wait,
+                    callback_hosts=app.JOB_CALLBACK_HOSTS).run()
+
+
+if __name__ == '__main__':
+    main()